@@ -0,0 +1,218 @@
+"""
+Adaptive (AIMD) limit on the number of Gemini requests in flight.
+
+A fixed concurrency level is either too timid or overruns the key's quota.
+The limiter starts at ADAPTIVE_CONCURRENCY_INITIAL and adjusts itself the way
+TCP congestion control does:
+- every healthy response adds 1/limit, i.e. about one more request in flight
+  per round trip, as long as the current limit is actually being used;
+- a 429, an overloaded server (503/504, timeouts) or a response much slower
+  than the moving average multiplies the limit by ADAPTIVE_CONCURRENCY_BACKOFF.
+Responses to requests sent before the last decrease do not cut the limit
+again, so one wave of 429s counts as one congestion event.
+
+The current limit is exposed through `limit`, stats() and summary().
+"""
+import time
+import threading
+from collections import deque
+from typing import Any, Dict, Optional
+
+from config import (
+    ADAPTIVE_CONCURRENCY_ENABLED,
+    ADAPTIVE_CONCURRENCY_INITIAL,
+    ADAPTIVE_CONCURRENCY_MIN,
+    ADAPTIVE_CONCURRENCY_MAX,
+    ADAPTIVE_CONCURRENCY_BACKOFF,
+    ADAPTIVE_CONCURRENCY_LATENCY_TOLERANCE
+)
+
+# Outcomes passed to AdaptiveConcurrencyLimiter.release
+OK = "ok"
+THROTTLED = "throttled"
+OVERLOADED = "overloaded"
+ERROR = "error"
+
+def outcome_for_status(status_code: int) -> str:
+    """
+    Classify an HTTP status for the limiter.
+
+    Args:
+        status_code (int): Response status
+
+    Returns:
+        str: OK for 200, THROTTLED for 429, OVERLOADED for 503 and 504, ERROR otherwise
+            (errors such as 400 say nothing about load and leave the limit alone)
+    """
+    if status_code == 200:
+        return OK
+    if status_code == 429:
+        return THROTTLED
+    if status_code in (503, 504):
+        return OVERLOADED
+    return ERROR
+
+class AdaptiveConcurrencyLimiter:
+    """Thread-safe gate whose number of slots follows an AIMD policy."""
+
+    def __init__(self, initial: float = ADAPTIVE_CONCURRENCY_INITIAL, min_limit: int = ADAPTIVE_CONCURRENCY_MIN,
+                 max_limit: int = ADAPTIVE_CONCURRENCY_MAX, backoff: float = ADAPTIVE_CONCURRENCY_BACKOFF,
+                 latency_tolerance: float = ADAPTIVE_CONCURRENCY_LATENCY_TOLERANCE, smoothing: float = 0.1,
+                 min_samples: int = 5):
+        """
+        Initialize the limiter.
+
+        Args:
+            initial (float): Starting limit
+            min_limit (int): The limit never drops below this
+            max_limit (int): The limit never grows beyond this
+            backoff (float): Factor applied to the limit on congestion (0 < backoff < 1)
+            latency_tolerance (float): A response slower than this multiple of the average latency counts as congestion
+            smoothing (float): Weight of a new sample in the exponential moving average of latency
+            min_samples (int): Latency samples needed before latency spikes are acted on
+        """
+        if not 0 < backoff < 1:
+            raise ValueError("backoff must be between 0 and 1")
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.backoff = backoff
+        self.latency_tolerance = latency_tolerance
+        self.smoothing = smoothing
+        self.min_samples = min_samples
+        self._limit = float(min(self.max_limit, max(self.min_limit, initial)))
+        self._in_flight = 0
+        self._latency = None
+        self._samples = 0
+        self._last_decrease = float("-inf")
+        self._condition = threading.Condition()
+        self.increases = 0
+        self.decreases = 0
+        self.throttled = 0
+        self.latency_spikes = 0
+        self.peak_in_flight = 0
+        # (time.time(), limit) after every change, for plotting a run
+        self.history = deque([(time.time(), self.limit)], maxlen=1000)
+
+    @property
+    def limit(self) -> int:
+        """Current number of requests allowed in flight."""
+        return int(self._limit)
+
+    @property
+    def in_flight(self) -> int:
+        """Requests currently holding a slot."""
+        return self._in_flight
+
+    def acquire(self) -> float:
+        """
+        Wait for a free slot.
+
+        Returns:
+            float: Start time to pass to release()
+        """
+        with self._condition:
+            while self._in_flight >= self.limit:
+                self._condition.wait()
+            self._in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self._in_flight)
+        return time.monotonic()
+
+    def release(self, started: float, outcome: str, latency: Optional[float] = None):
+        """
+        Free a slot and adjust the limit.
+
+        Args:
+            started (float): Value returned by acquire()
+            outcome (str): OK, THROTTLED, OVERLOADED or ERROR
+            latency (float, optional): Latency to record (default: time since acquire, e.g. the
+                time to the first byte of a streamed response can be passed instead)
+        """
+        if latency is None:
+            latency = time.monotonic() - started
+        with self._condition:
+            # The limit was in use if this request was one of `limit` in flight
+            saturated = self._in_flight >= self.limit
+            self._in_flight -= 1
+            if outcome == THROTTLED:
+                self.throttled += 1
+                self._decrease(started)
+            elif outcome == OVERLOADED:
+                self._decrease(started)
+            elif outcome == OK:
+                spike = (self._samples >= self.min_samples
+                         and latency > self.latency_tolerance * self._latency)
+                self._record_latency(latency)
+                if spike:
+                    self.latency_spikes += 1
+                    self._decrease(started)
+                elif saturated:
+                    self._increase()
+            self._condition.notify_all()
+
+    def _record_latency(self, latency: float):
+        if self._latency is None:
+            self._latency = latency
+        else:
+            self._latency += self.smoothing * (latency - self._latency)
+        self._samples += 1
+
+    def _increase(self):
+        if self._limit >= self.max_limit:
+            return
+        before = self.limit
+        self._limit = min(float(self.max_limit), self._limit + 1.0 / self._limit)
+        if self.limit != before:
+            self.increases += 1
+            self.history.append((time.time(), self.limit))
+
+    def _decrease(self, started: float):
+        if started < self._last_decrease:
+            return  # Sent before the last decrease: part of the same congestion event
+        self._last_decrease = time.monotonic()
+        before = self.limit
+        self._limit = max(float(self.min_limit), self._limit * self.backoff)
+        if self.limit != before:
+            self.decreases += 1
+            self.history.append((time.time(), self.limit))
+
+    def stats(self) -> Dict[str, Any]:
+        """Current limit, requests in flight, smoothed latency and adjustment counters."""
+        with self._condition:
+            return {
+                "limit": self.limit,
+                "in_flight": self._in_flight,
+                "peak_in_flight": self.peak_in_flight,
+                "latency": self._latency,
+                "increases": self.increases,
+                "decreases": self.decreases,
+                "throttled": self.throttled,
+                "latency_spikes": self.latency_spikes
+            }
+
+    def summary(self) -> str:
+        """One-line description of the limiter's state."""
+        stats = self.stats()
+        latency = f"{stats['latency']:.2f}s" if stats["latency"] is not None else "n/a"
+        return (f"Adaptive concurrency: limit {stats['limit']} (range {self.min_limit}-{self.max_limit}), "
+                f"peak {stats['peak_in_flight']} in flight, average latency {latency}, "
+                f"{stats['increases']} increases, {stats['decreases']} decreases "
+                f"({stats['throttled']} throttled responses, {stats['latency_spikes']} latency spikes)")
+
+_concurrency_limiter = None
+_concurrency_limiter_lock = threading.Lock()
+
+def get_concurrency_limiter() -> Optional[AdaptiveConcurrencyLimiter]:
+    """
+    Get the concurrency limiter shared by all Gemini callers of this process.
+
+    Returns:
+        Optional[AdaptiveConcurrencyLimiter]: Limiter configured from ADAPTIVE_CONCURRENCY_* in config,
+            or None if ADAPTIVE_CONCURRENCY_ENABLED is False
+    """
+    global _concurrency_limiter
+    if not ADAPTIVE_CONCURRENCY_ENABLED:
+        return None
+    with _concurrency_limiter_lock:
+        if _concurrency_limiter is None:
+            _concurrency_limiter = AdaptiveConcurrencyLimiter()
+        return _concurrency_limiter
@@ -0,0 +1,563 @@
+"""
+Offline bulk scoring through the Gemini Batch API.
+
+Pairs that are not in the result cache are written to JSONL input files
+({"key": ..., "request": GenerateContentRequest} per line), submitted as batch
+jobs, polled until they finish, and their responses are validated and stored
+in the result cache. The regular matching code then finds every pair in the
+cache, so a full-matrix run no longer depends on per-minute rate limits.
+
+Submitted jobs are recorded in a manifest per backend
+(BATCH_API_DIR/jobs-<backend>.json); an interrupted run picks them up again
+instead of submitting the same pairs twice. Jobs the service no longer knows,
+or whose status keeps failing, are dropped from it.
+LocalBatchBackend is a file-based fake of the service for tests.
+"""
+import os
+import json
+import time
+import uuid
+import shutil
+import hashlib
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from config import (
+    TEMPERATURE,
+    SKIP_NEAR_DUPLICATES,
+    BATCH_API_BACKEND,
+    BATCH_API_DIR,
+    BATCH_API_MAX_REQUESTS,
+    BATCH_API_POLL_INTERVAL,
+    BATCH_API_MAX_POLL_ERRORS,
+    BATCH_API_TIMEOUT
+)
+from gemini_transport import GeminiAPIError, GeminiTransport, response_text
+from near_duplicates import NearDuplicateIndex
+from scoring_backends import GeminiBackend
+from result_cache import ResultCache
+from usage_meter import TokenUsage
+
+# Batch job states (Gemini's BATCH_STATE_* without the prefix)
+PENDING = "PENDING"
+RUNNING = "RUNNING"
+SUCCEEDED = "SUCCEEDED"
+# The service does not know the job (deleted, or submitted with another backend or key)
+NOT_FOUND = "NOT_FOUND"
+FINISHED_STATES = {SUCCEEDED, "FAILED", "CANCELLED", "EXPIRED", NOT_FOUND}
+
+def get_base_dir():
+    """Get the base directory of the project."""
+    return os.path.dirname(os.path.abspath(__file__))
+
+class BatchBackend(ABC):
+    """Service that runs files of generateContent requests asynchronously."""
+
+    # Names the job manifest of this backend
+    name = "batch"
+
+    @abstractmethod
+    def submit(self, input_path: str, display_name: str) -> str:
+        """
+        Submit a JSONL file of requests.
+
+        Args:
+            input_path (str): File with one {"key": ..., "request": ...} object per line
+            display_name (str): Human-readable job name
+
+        Returns:
+            str: Job name used by status()
+        """
+
+    @abstractmethod
+    def status(self, job_name: str) -> Tuple[str, Optional[str]]:
+        """
+        Get the state of a job.
+
+        Args:
+            job_name (str): Name returned by submit()
+
+        Returns:
+            Tuple[str, Optional[str]]: State (PENDING, RUNNING, SUCCEEDED, FAILED, CANCELLED, EXPIRED
+                or NOT_FOUND), and the results reference to pass to download() once the job succeeded
+        """
+
+    @abstractmethod
+    def download(self, results_ref: str, output_path: str):
+        """
+        Save the results of a finished job.
+
+        Args:
+            results_ref (str): Reference returned by status()
+            output_path (str): File to write the {"key": ..., "response" or "error": ...} lines to
+        """
+
+class GeminiBatchBackend(BatchBackend):
+    """Batch backend using the Gemini Files and Batch APIs."""
+
+    name = "gemini"
+
+    def __init__(self, transport: GeminiTransport):
+        """
+        Initialize the backend.
+
+        Args:
+            transport (GeminiTransport): Transport providing the session, API key, model and base URL
+        """
+        self.transport = transport
+        parts = urlsplit(transport.base_url)
+        # e.g. https://generativelanguage.googleapis.com + /v1beta
+        self._root = f"{parts.scheme}://{parts.netloc}"
+        self._version_path = parts.path.rstrip("/")
+
+    def _upload(self, input_path: str, display_name: str) -> str:
+        """Upload a file with the resumable upload protocol; returns its files/... name."""
+        size = os.path.getsize(input_path)
+        start = self.transport.session.post(
+            f"{self._root}/upload{self._version_path}/files",
+            headers={
+                "X-Goog-Upload-Protocol": "resumable",
+                "X-Goog-Upload-Command": "start",
+                "X-Goog-Upload-Header-Content-Length": str(size),
+                "X-Goog-Upload-Header-Content-Type": "application/jsonl"
+            },
+            json={"file": {"display_name": display_name}},
+            timeout=self.transport.timeout
+        )
+        upload_url = start.headers.get("X-Goog-Upload-URL")
+        if start.status_code != 200 or not upload_url:
+            raise GeminiAPIError(f"Could not start upload: {start.status_code} - {start.text[:500]}",
+                                 status_code=start.status_code)
+
+        with open(input_path, "rb") as f:
+            response = self.transport.session.post(
+                upload_url,
+                headers={"X-Goog-Upload-Offset": "0", "X-Goog-Upload-Command": "upload, finalize",
+                         "Content-Length": str(size)},
+                data=f,
+                timeout=self.transport.timeout
+            )
+        if response.status_code != 200:
+            raise GeminiAPIError(f"Upload failed: {response.status_code} - {response.text[:500]}",
+                                 status_code=response.status_code)
+        return response.json()["file"]["name"]
+
+    def submit(self, input_path: str, display_name: str) -> str:
+        file_name = self._upload(input_path, display_name)
+        response = self.transport.post("batchGenerateContent", {
+            "batch": {
+                "display_name": display_name,
+                "input_config": {"file_name": file_name}
+            }
+        })
+        return response["name"]
+
+    def status(self, job_name: str) -> Tuple[str, Optional[str]]:
+        try:
+            operation = self.transport.request("GET", f"{self.transport.base_url}/{job_name}")
+        except GeminiAPIError as e:
+            if e.status_code == 404:
+                return NOT_FOUND, None
+            raise
+        metadata = operation.get("metadata", {})
+        state = metadata.get("state", PENDING)
+        for prefix in ("BATCH_STATE_", "JOB_STATE_"):
+            if state.startswith(prefix):
+                state = state[len(prefix):]
+        output = metadata.get("output") or operation.get("response") or {}
+        return state, output.get("responsesFile")
+
+    def download(self, results_ref: str, output_path: str):
+        response = self.transport.session.get(
+            f"{self._root}/download{self._version_path}/{results_ref}:download",
+            params={"alt": "media"}, stream=True, timeout=self.transport.timeout
+        )
+        if response.status_code != 200:
+            raise GeminiAPIError(f"Download failed: {response.status_code} - {response.text[:500]}",
+                                 status_code=response.status_code)
+        tmp_path = output_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            for chunk in response.iter_content(chunk_size=1 << 20):
+                f.write(chunk)
+        os.replace(tmp_path, output_path)
+
+def fake_response(request: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Deterministic stand-in for a model answer: scores derived from a hash of the request.
+
+    Args:
+        request (Dict[str, Any]): generateContent request
+
+    Returns:
+        Dict[str, Any]: generateContent response with a valid structured MatchResult
+    """
+    digest = hashlib.sha256(json.dumps(request, sort_keys=True).encode("utf-8")).digest()
+    industry, technical, description = (round(b / 255, 2) for b in digest[:3])
+    result = {
+        "industry_knowledge_score": industry,
+        "technical_skills_score": technical,
+        "job_description_match_score": description,
+        "total_score": round(0.1 * industry + 0.3 * technical + 0.6 * description, 2),
+        "reasoning": "Deterministic score from the local batch backend."
+    }
+    return {"candidates": [{"content": {"parts": [{"text": json.dumps(result)}], "role": "model"}}]}
+
+class LocalBatchBackend(BatchBackend):
+    """
+    File-based fake of the Batch API.
+
+    Jobs live in directories under root; a job reports RUNNING for the first
+    `polls_until_done` status calls and then answers every request with
+    `responder` (fake_response by default).
+    """
+
+    name = "local"
+
+    def __init__(self, root: str = None, responder: Callable[[Dict[str, Any]], Dict[str, Any]] = fake_response,
+                 polls_until_done: int = 1):
+        """
+        Initialize the backend.
+
+        Args:
+            root (str, optional): Directory for the fake jobs (default: BATCH_API_DIR/local)
+            responder (Callable, optional): Maps a request to a response; exceptions become error lines
+            polls_until_done (int): status() calls before a job completes
+        """
+        self.root = root or os.path.join(BATCH_API_DIR, "local")
+        if not os.path.isabs(self.root):
+            self.root = os.path.join(get_base_dir(), self.root)
+        self.responder = responder
+        self.polls_until_done = polls_until_done
+
+    def _job_dir(self, job_name: str) -> str:
+        return os.path.join(self.root, job_name.split("/", 1)[-1])
+
+    def _write_state(self, job_dir: str, state: Dict[str, Any]):
+        with open(os.path.join(job_dir, "state.json"), "w", encoding="utf-8") as f:
+            json.dump(state, f)
+
+    def submit(self, input_path: str, display_name: str) -> str:
+        job_id = uuid.uuid4().hex[:12]
+        job_dir = os.path.join(self.root, job_id)
+        os.makedirs(job_dir)
+        shutil.copyfile(input_path, os.path.join(job_dir, "input.jsonl"))
+        self._write_state(job_dir, {"display_name": display_name, "state": PENDING, "polls": 0})
+        return f"batches/{job_id}"
+
+    def status(self, job_name: str) -> Tuple[str, Optional[str]]:
+        job_dir = self._job_dir(job_name)
+        try:
+            with open(os.path.join(job_dir, "state.json"), encoding="utf-8") as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            return NOT_FOUND, None
+        if state["state"] not in FINISHED_STATES:
+            state["polls"] += 1
+            if state["polls"] <= self.polls_until_done:
+                state["state"] = RUNNING
+            else:
+                self._run(job_dir)
+                state["state"] = SUCCEEDED
+            self._write_state(job_dir, state)
+        output_path = os.path.join(job_dir, "output.jsonl")
+        return state["state"], output_path if state["state"] == SUCCEEDED else None
+
+    def _run(self, job_dir: str):
+        with open(os.path.join(job_dir, "input.jsonl"), encoding="utf-8") as source, \
+                open(os.path.join(job_dir, "output.jsonl"), "w", encoding="utf-8") as output:
+            for line in source:
+                if not line.strip():
+                    continue
+                item = json.loads(line)
+                try:
+                    answer = {"key": item["key"], "response": self.responder(item["request"])}
+                except Exception as e:
+                    answer = {"key": item["key"], "error": {"message": str(e)}}
+                output.write(json.dumps(answer, ensure_ascii=False) + "\n")
+
+    def download(self, results_ref: str, output_path: str):
+        shutil.copyfile(results_ref, output_path)
+
+def get_batch_backend(transport: GeminiTransport) -> BatchBackend:
+    """
+    Create the batch backend configured in config (BATCH_API_BACKEND).
+
+    Args:
+        transport (GeminiTransport): Transport used by the Gemini backend
+
+    Returns:
+        BatchBackend: GeminiBatchBackend, or LocalBatchBackend for "local"
+    """
+    if BATCH_API_BACKEND == "local":
+        return LocalBatchBackend()
+    return GeminiBatchBackend(transport)
+
+def matrix_pairs(cvs: Dict[str, str], job_descriptions: Dict[str, str],
+                 skip_near_duplicates: bool = SKIP_NEAR_DUPLICATES) -> Iterator[Tuple[str, str]]:
+    """
+    Yield every (CV content, job description) pair that match_all would score.
+
+    Args:
+        cvs (Dict[str, str]): CV IDs to content
+        job_descriptions (Dict[str, str]): Job IDs to content
+        skip_near_duplicates (bool): Leave out near duplicates, as match_all does
+
+    Returns:
+        Iterator[Tuple[str, str]]: Pairs of contents
+    """
+    def representatives(corpus):
+        if not skip_near_duplicates:
+            return list(corpus.values())
+        index = NearDuplicateIndex()
+        return [text for doc_id, text in corpus.items() if index.add(doc_id, text) == doc_id]
+
+    scored_jobs = representatives(job_descriptions)
+    for cv_content in representatives(cvs):
+        for job_description in scored_jobs:
+            yield cv_content, job_description
+
+class BatchRunner:
+    """Submits the pending pairs of a matcher as batch jobs and stores the results in its result cache."""
+
+    def __init__(self, matcher, backend: BatchBackend = None, work_dir: str = BATCH_API_DIR,
+                 max_requests: int = BATCH_API_MAX_REQUESTS, poll_interval: float = BATCH_API_POLL_INTERVAL,
+                 max_poll_errors: int = BATCH_API_MAX_POLL_ERRORS):
+        """
+        Initialize the runner.
+
+        Args:
+            matcher (CVJobMatcher): Matcher whose prompts, parsing and result cache are used
+            backend (BatchBackend, optional): Batch service (default: the one from config)
+            work_dir (str): Directory for input/output files and the job manifests
+            max_requests (int): Maximum number of requests per batch job
+            poll_interval (float): Seconds between status checks
+            max_poll_errors (int): Consecutive status or download errors after which a job is dropped
+        """
+        if matcher.result_cache is None:
+            raise ValueError("Batch scoring stores its results in the result cache; enable RESULT_CACHE_ENABLED")
+        if not isinstance(matcher.backend, GeminiBackend):
+            raise ValueError("Batch scoring needs the Gemini scoring backend (SCORING_BACKEND = \"gemini\")")
+        self.matcher = matcher
+        self.backend = backend or get_batch_backend(matcher.backend.transport)
+        if not os.path.isabs(work_dir):
+            work_dir = os.path.join(get_base_dir(), work_dir)
+        self.work_dir = work_dir
+        self.max_requests = max(1, max_requests)
+        self.poll_interval = poll_interval
+        self.max_poll_errors = max(1, max_poll_errors)
+        self.manifest_path = os.path.join(work_dir, f"jobs-{self.backend.name}.json")
+        self.jobs = self._load_manifest()
+        # Consecutive failed polls per job
+        self._poll_errors: Dict[str, int] = {}
+
+    def _load_manifest(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self.manifest_path, encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except ValueError as e:
+            print(f"Ignoring unreadable batch job manifest {self.manifest_path}: {e}")
+            return {}
+
+    def _save_manifest(self):
+        """Write the job manifest to disk (atomically)."""
+        os.makedirs(self.work_dir, exist_ok=True)
+        tmp_path = self.manifest_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.jobs, f, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+
+    def pending_requests(self, pairs: Iterable[Tuple[str, str]]) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Yield a (key, request) for every distinct pair that is not in the result cache.
+
+        Args:
+            pairs: Iterable of (CV content, job description) tuples
+
+        Returns:
+            Iterator[Tuple[str, Dict[str, Any]]]: Keys of the form "cv_hash:job_hash:prompt_version" and requests
+        """
+        seen = set()
+        for cv_content, job_description in pairs:
+            # Near duplicates are cached under their representatives' hashes, as online scoring does
+            cv_hash, job_hash = self.matcher.representative_pair(cv_content, job_description)
+            key = f"{cv_hash}:{job_hash}:{self.matcher.prompt_version}"
+            if key in seen:
+                continue
+            seen.add(key)
+            if self.matcher.cached_result(cv_content, job_description) is None:
+                yield key, self.matcher.request_payload(cv_content, job_description)
+
+    def submit(self, pairs: Iterable[Tuple[str, str]]) -> List[str]:
+        """
+        Write the pending pairs to input files of at most max_requests lines and submit them.
+
+        Args:
+            pairs: Iterable of (CV content, job description) tuples
+
+        Returns:
+            List[str]: Names of the submitted jobs
+        """
+        os.makedirs(self.work_dir, exist_ok=True)
+        submitted = []
+        chunk_path, chunk_file, count = None, None, 0
+
+        def flush():
+            chunk_file.close()
+            display_name = f"cv-job-matching-{time.strftime('%Y%m%d-%H%M%S')}-{len(submitted) + 1}"
+            try:
+                job_name = self.backend.submit(chunk_path, display_name)
+            except Exception as e:
+                print(f"Error submitting batch job ({count} requests); they will be scored online: {e}")
+                return
+            self.jobs[job_name] = {"input": chunk_path, "requests": count, "state": PENDING,
+                                   "submitted": time.time()}
+            self._save_manifest()
+            submitted.append(job_name)
+            print(f"Submitted batch job {job_name} with {count} requests")
+
+        for key, request in self.pending_requests(pairs):
+            if chunk_file is None:
+                chunk_path = os.path.join(self.work_dir, f"input-{uuid.uuid4().hex[:12]}.jsonl")
+                chunk_file = open(chunk_path, "w", encoding="utf-8")
+                count = 0
+            chunk_file.write(json.dumps({"key": key, "request": request}, ensure_ascii=False) + "\n")
+            count += 1
+            if count >= self.max_requests:
+                flush()
+                chunk_file = None
+        if chunk_file is not None:
+            flush()
+        return submitted
+
+    def wait(self, deadline: Optional[float] = None) -> int:
+        """
+        Poll the unfinished jobs of the manifest until they finish, ingesting the successful ones.
+
+        Args:
+            deadline (float, optional): time.monotonic() value after which to stop waiting;
+                jobs still running then stay in the manifest for the next run
+
+        Returns:
+            int: Number of results stored in the result cache
+        """
+        stored = 0
+        while True:
+            unfinished = list(self.jobs)
+            if not unfinished:
+                return stored
+            for job_name in unfinished:
+                try:
+                    state, results_ref = self.backend.status(job_name)
+                except Exception as e:
+                    self._poll_failed(job_name, f"Error checking batch job {job_name}: {e}")
+                    continue
+                job = self.jobs[job_name]
+                if state == SUCCEEDED:
+                    output_path = job["input"].replace("input-", "output-")
+                    try:
+                        self.backend.download(results_ref, output_path)
+                    except Exception as e:
+                        self._poll_failed(job_name, f"Error downloading results of batch job {job_name}: {e}")
+                        continue
+                    ok, failed = self.ingest(output_path)
+                    stored += ok
+                    print(f"Batch job {job_name} finished: {ok} results stored, {failed} failed")
+                    self._remove_files(job["input"], output_path)
+                elif state in FINISHED_STATES:
+                    print(f"Batch job {job_name} ended with state {state}; its pairs will be scored online")
+                    self._remove_files(job["input"])
+                self._poll_errors.pop(job_name, None)
+                if state in FINISHED_STATES:
+                    # The results are in the result cache now; forget the job
+                    self._forget(job_name)
+                elif state != job["state"]:
+                    job["state"] = state
+                    self._save_manifest()
+            if not self.jobs:
+                continue
+            if deadline is not None and time.monotonic() + self.poll_interval > deadline:
+                print(f"Stopped waiting for {len(self.jobs)} batch jobs; the next run picks them up again "
+                      f"(their pairs are scored online meanwhile)")
+                return stored
+            time.sleep(self.poll_interval)
+
+    def _poll_failed(self, job_name: str, message: str):
+        """Count a failed status check or download; drop the job after max_poll_errors in a row."""
+        errors = self._poll_errors.get(job_name, 0) + 1
+        self._poll_errors[job_name] = errors
+        print(f"{message} ({errors}/{self.max_poll_errors})")
+        if errors >= self.max_poll_errors:
+            print(f"Giving up on batch job {job_name}; its pairs will be scored online")
+            self._remove_files(self.jobs[job_name]["input"])
+            self._forget(job_name)
+
+    def _forget(self, job_name: str):
+        """Remove a job from the manifest."""
+        del self.jobs[job_name]
+        self._poll_errors.pop(job_name, None)
+        self._save_manifest()
+
+    @staticmethod
+    def _remove_files(*paths: str):
+        for path in paths:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def ingest(self, output_path: str) -> Tuple[int, int]:
+        """
+        Validate the responses of a results file and store them in the result cache.
+
+        Args:
+            output_path (str): Downloaded results file
+
+        Returns:
+            Tuple[int, int]: Numbers of stored and failed results
+        """
+        stored = failed = 0
+        with open(output_path, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    item = json.loads(line)
+                    cv_hash, job_hash, prompt_version = item["key"].split(":")
+                    if "response" not in item:
+                        raise GeminiAPIError(f"Request failed: {item.get('error')}")
+                    # Billed (at the batch rate) whether or not the answer is usable
+                    self.matcher.usage_meter.record(TokenUsage.from_gemini(item["response"].get("usageMetadata")),
+                                                    self.matcher.backend.model_id, [(cv_hash, job_hash)], batch=True)
+                    result, valid = self.matcher.parse_response(response_text(item["response"]))
+                    if not valid:
+                        raise ValueError("invalid structured output")
+                except Exception as e:
+                    print(f"Skipping batch result: {e}")
+                    failed += 1
+                    continue
+                key = ResultCache.key_from_hashes(cv_hash, job_hash, prompt_version, self.matcher.backend.model_id,
+                                                  TEMPERATURE)
+                self.matcher.result_cache.put(key, result.dict())
+                stored += 1
+        return stored, failed
+
+    def run(self, pairs: Iterable[Tuple[str, str]], timeout: Optional[float] = BATCH_API_TIMEOUT) -> int:
+        """
+        Finish jobs left by an earlier run, submit the pairs still pending and wait for them.
+
+        Args:
+            pairs: Iterable of (CV content, job description) tuples
+            timeout (float, optional): Seconds to wait for the jobs in total (None waits until they finish)
+
+        Returns:
+            int: Number of results stored in the result cache
+        """
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        stored = self.wait(deadline)
+        self.submit(pairs)
+        stored += self.wait(deadline)
+        print(f"Batch scoring stored {stored} results")
+        return stored
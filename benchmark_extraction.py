@@ -0,0 +1,59 @@
+import os
+import sys
+import time
+from document_processor import (
+    get_base_dir,
+    extract_text_from_docx_fast,
+    extract_text_from_docx_python_docx
+)
+
+def time_engine(extractor, file_paths, repeat=1):
+    """
+    Time an extraction function over a list of files.
+
+    Args:
+        extractor: Function taking a file path and returning its text
+        file_paths (list): Files to extract
+        repeat (int): Number of passes over the files (best pass is reported)
+
+    Returns:
+        tuple: Best wall time in seconds and total number of characters extracted
+    """
+    best = None
+    chars = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        chars = sum(len(extractor(path)) for path in file_paths)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, chars
+
+def benchmark_docx(directory=None, limit=None, repeat=3):
+    """
+    Compare the streaming .docx extractor with python-docx (text cache bypassed).
+
+    Args:
+        directory (str, optional): Folder with .docx files (default: DataSet/cv)
+        limit (int, optional): Only use the first N files
+        repeat (int): Number of passes per engine
+    """
+    if directory is None:
+        directory = os.path.join(get_base_dir(), "DataSet", "cv")
+    file_paths = sorted(os.path.join(directory, f) for f in os.listdir(directory) if f.endswith('.docx'))
+    if limit:
+        file_paths = file_paths[:limit]
+
+    size_mb = sum(os.path.getsize(p) for p in file_paths) / (1024 * 1024)
+    print(f"Benchmarking .docx extraction on {len(file_paths)} files ({size_mb:.1f} MB), best of {repeat}")
+
+    slow_time, slow_chars = time_engine(extract_text_from_docx_python_docx, file_paths, repeat)
+    fast_time, fast_chars = time_engine(extract_text_from_docx_fast, file_paths, repeat)
+
+    print(f"python-docx: {slow_time:.3f}s ({len(file_paths) / slow_time:.0f} files/s, {slow_chars} chars)")
+    print(f"fast:        {fast_time:.3f}s ({len(file_paths) / fast_time:.0f} files/s, {fast_chars} chars)")
+    print(f"Speedup:     {slow_time / fast_time:.1f}x")
+
+if __name__ == "__main__":
+    # Usage: python benchmark_extraction.py [limit]
+    limit = int(sys.argv[1]) if len(sys.argv) > 1 and sys.argv[1].isdigit() else None
+    benchmark_docx(limit=limit)
@@ -0,0 +1,124 @@
+import os
+import time
+import random
+import shutil
+import tempfile
+
+from mock_gemini_server import MockGeminiServer, LATENCY_DISTRIBUTIONS
+from matcher import CVJobMatcher
+from rate_limiter import RateLimiter
+from result_cache import ResultCache
+from context_cache import LocalContextCache, GeminiContextCache
+from scoring_backends import GeminiBackend
+
+WORDS = ("python", "java", "sql", "cloud", "kubernetes", "finance", "marketing", "sales", "logistics",
+         "leadership", "analytics", "design", "security", "support", "research", "healthcare",
+         "project", "management", "engineering", "operations", "customer", "data", "testing")
+
+def synthetic_corpus(prefix, count, words, seed):
+    """
+    Build reproducible fake documents.
+
+    Args:
+        prefix (str): ID prefix, e.g. "cv"
+        count (int): Number of documents
+        words (int): Words per document
+        seed (int): Random seed
+
+    Returns:
+        dict: Document IDs mapped to their text
+    """
+    rng = random.Random(seed)
+    return {f"{prefix}_{i:04d}": " ".join(rng.choice(WORDS) for _ in range(words)) + f" ({prefix} {i})"
+            for i in range(count)}
+
+def benchmark_scoring(cvs=20, jobs=10, concurrency=None, client_rpm=6000, burst=50, context_cache="local",
+                      words=400, **server_options):
+    """
+    Score a synthetic CV x job matrix against a local mock server and report throughput.
+
+    The result cache starts empty (a temporary database), so every pair goes to the mock.
+
+    Args:
+        cvs (int): Number of CVs
+        jobs (int): Number of job descriptions
+        concurrency (int, optional): Requests in flight (default: MAX_CONCURRENT_REQUESTS)
+        client_rpm (float): Client-side rate limit in requests per minute
+        burst (int): Client-side burst size
+        context_cache (str): "local", "server" (cachedContents on the mock) or "none"
+        words (int): Words per synthetic document
+        **server_options: Options for MockGeminiServer (latency, rpm, error rates, seed, ...)
+
+    Returns:
+        dict: Wall time, throughput and the mock's counters
+    """
+    server = MockGeminiServer(("127.0.0.1", 0), **server_options)
+    server.start()
+    cache_dir = tempfile.mkdtemp(prefix="benchmark_scoring_")
+    try:
+        limiter = RateLimiter(rpm=client_rpm, burst=burst)
+        backend = GeminiBackend(api_key="mock", rate_limiter=limiter, context_cache=LocalContextCache(),
+                                base_url=server.base_url)
+        if context_cache == "server":
+            backend.context_cache = GeminiContextCache(backend.transport)
+        elif context_cache == "none":
+            backend.context_cache = None
+        matcher = CVJobMatcher(backend=backend, result_cache=ResultCache(os.path.join(cache_dir, "results.sqlite3")))
+
+        cv_corpus = synthetic_corpus("cv", cvs, words, 1)
+        job_corpus = synthetic_corpus("job", jobs, words, 2)
+        start = time.perf_counter()
+        matcher.match_all(cv_corpus, job_corpus, max_concurrency=concurrency)
+        elapsed = time.perf_counter() - start
+        stats = server.stats_snapshot()
+        stats.update(pairs=cvs * jobs, seconds=elapsed, pairs_per_second=cvs * jobs / elapsed,
+                     requests_per_second=stats["requests"] / elapsed, client_retries=backend.transport.retries)
+        backend.close()
+        return stats
+    finally:
+        server.stop()
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+def main():
+    """Run the benchmark from the command line."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark CVJobMatcher against the mock Gemini server")
+    parser.add_argument("--cvs", type=int, default=20, help="Number of synthetic CVs (default: 20)")
+    parser.add_argument("--jobs", type=int, default=10, help="Number of synthetic jobs (default: 10)")
+    parser.add_argument("--concurrency", type=int, default=None, help="Requests in flight (default: config)")
+    parser.add_argument("--client-rpm", type=float, default=6000, help="Client rate limit (default: 6000)")
+    parser.add_argument("--burst", type=int, default=50, help="Client burst size (default: 50)")
+    parser.add_argument("--context-cache", choices=("local", "server", "none"), default="local",
+                        help="Context cache used by the matcher (default: local)")
+    parser.add_argument("--latency", choices=LATENCY_DISTRIBUTIONS, default="lognormal",
+                        help="Mock response delay distribution (default: lognormal)")
+    parser.add_argument("--latency-mean", type=float, default=0.5, help="Mean delay in seconds (default: 0.5)")
+    parser.add_argument("--latency-spread", type=float, default=0.5, help="Delay spread (default: 0.5)")
+    parser.add_argument("--error-rate-429", type=float, default=0.0, help="Share of injected 429 responses")
+    parser.add_argument("--error-rate-5xx", type=float, default=0.0, help="Share of injected 500/503 responses")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After of injected 429s (default: 1)")
+    parser.add_argument("--rpm", type=float, default=None, help="Server-side quota in requests per minute")
+    parser.add_argument("--max-in-flight", type=int, default=None,
+                        help="Server-side limit on concurrent requests (default: none)")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed (default: 0)")
+    args = parser.parse_args()
+
+    stats = benchmark_scoring(cvs=args.cvs, jobs=args.jobs, concurrency=args.concurrency,
+                              client_rpm=args.client_rpm, burst=args.burst, context_cache=args.context_cache,
+                              latency=args.latency, latency_mean=args.latency_mean,
+                              latency_spread=args.latency_spread, error_rate_429=args.error_rate_429,
+                              error_rate_5xx=args.error_rate_5xx, retry_after=args.retry_after,
+                              rpm=args.rpm, max_in_flight=args.max_in_flight, seed=args.seed)
+
+    print(f"Scored {stats['pairs']} pairs in {stats['seconds']:.2f}s "
+          f"({stats['pairs_per_second']:.1f} pairs/s, {stats['requests_per_second']:.1f} requests/s)")
+    print(f"Requests: {stats['requests']} ({stats['ok']} ok, {stats['injected_429']} injected 429, "
+          f"{stats['injected_5xx']} injected 5xx, {stats['rate_limited']} over quota, "
+          f"{stats['over_capacity']} over capacity), "
+          f"{stats['client_retries']} client retries")
+    print(f"Mock latency: p50 {stats['latency_p50']:.3f}s, p95 {stats['latency_p95']:.3f}s; "
+          f"max in flight {stats['max_in_flight']}, cached context hits {stats['cache_hits']}")
+
+if __name__ == "__main__":
+    main()
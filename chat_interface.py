@@ -2,18 +2,18 @@ import os
 import sys
 from document_processor import extract_text
 from matcher import CVJobMatcher
-from config import GEMINI_API_KEY
+from config import GEMINI_API_KEY, SCORING_BACKEND
 
 def chat_interface():
     """Interactive chat interface for CV-Job matching."""
     
     # Check if API key is provided
-    if not GEMINI_API_KEY:
+    if SCORING_BACKEND == "gemini" and not GEMINI_API_KEY:
         print("Error: GEMINI_API_KEY is not set.")
         print("Please set your API key in the config.py file or as an environment variable.")
         sys.exit(1)
     
-    print(f"Using Gemini API")
+    print(f"Using scoring backend: {SCORING_BACKEND}")
     
     # Get paths to files
     cv_dir = "DataSet/cv"
@@ -276,20 +276,44 @@ def chat_interface():
                 
                 # Match CV with job description
                 print("\nMatching CV with job description...")
-                result = matcher.match(cv_content, job_content)
                 
-                # Display results
-                print("\n" + "=" * 80)
-                print(f"MATCH ANALYSIS: {cv_display} → {job_display}")
-                print("=" * 80)
+                def print_scores(scores):
+                    print(f"\nIndustry Knowledge Score: {scores['industry_knowledge_score']:.2f} ({scores['industry_knowledge_score']*100:.0f}%)")
+                    print(f"Technical Skills Score: {scores['technical_skills_score']:.2f} ({scores['technical_skills_score']*100:.0f}%)")
+                    print(f"Job Description Match Score: {scores['job_description_match_score']:.2f} ({scores['job_description_match_score']*100:.0f}%)")
+                    print(f"Total Score: {scores['total_score']:.2f} ({scores['total_score']*100:.0f}%)")
+                
+                streamed_scores = {}
                 
-                print(f"\nIndustry Knowledge Score: {result.industry_knowledge_score:.2f} ({result.industry_knowledge_score*100:.0f}%)")
-                print(f"Technical Skills Score: {result.technical_skills_score:.2f} ({result.technical_skills_score*100:.0f}%)")
-                print(f"Job Description Match Score: {result.job_description_match_score:.2f} ({result.job_description_match_score*100:.0f}%)")
-                print(f"Total Score: {result.total_score:.2f} ({result.total_score*100:.0f}%)")
+                def show_scores(scores):
+                    # Display results as they stream in: the scores first, then the reasoning
+                    streamed_scores.update(scores)
+                    print("\n" + "=" * 80)
+                    print(f"MATCH ANALYSIS: {cv_display} → {job_display}")
+                    print("=" * 80)
+                    print_scores(scores)
+                    print("\nReasoning:")
                 
-                print("\nReasoning:")
-                print(result.reasoning)
+                streamed = []
+                
+                def show_reasoning(chunk):
+                    streamed.append(chunk)
+                    print(chunk, end="", flush=True)
+                
+                result = matcher.match_stream(cv_content, job_content, on_scores=show_scores, on_reasoning=show_reasoning)
+                print()
+                if result.failed:
+                    # The stream broke off or its answer could not be validated
+                    if streamed_scores:
+                        print("\nThe answer above is incomplete and has been discarded.")
+                    print(f"Error: the match could not be completed. {result.reasoning}")
+                    continue
+                final_scores = {field: getattr(result, field) for field in streamed_scores}
+                if final_scores != streamed_scores:
+                    print("\nFinal scores:")
+                    print_scores(final_scores)
+                if "".join(streamed) != result.reasoning:
+                    print(result.reasoning)
                 
                 print("\n" + "=" * 80)
                 print(f"Match Rating: ", end="")
@@ -0,0 +1,172 @@
+"""
+Circuit breaker for calls to a failing service.
+
+While the Gemini API is having an outage, every request would otherwise sit
+through its timeouts and retries. The breaker watches the outcome of the last
+CIRCUIT_BREAKER_WINDOW attempts; once at least CIRCUIT_BREAKER_FAILURE_RATE of
+them failed (server errors, timeouts, connection errors) it opens, and calls
+fail at once with CircuitOpenError for CIRCUIT_BREAKER_COOLDOWN seconds
+(CVJobMatcher then uses SCORING_FALLBACK_BACKEND if one is configured). After
+the cooldown a single probe is let through: success closes the circuit,
+failure opens it for another cooldown. Only the probe's own outcome counts
+then; calls that were already under way (or the other half of a hedged pair)
+are ignored.
+"""
+import time
+import threading
+from collections import deque
+from typing import Any, Dict, Optional
+
+from config import (
+    CIRCUIT_BREAKER_ENABLED,
+    CIRCUIT_BREAKER_WINDOW,
+    CIRCUIT_BREAKER_MIN_CALLS,
+    CIRCUIT_BREAKER_FAILURE_RATE,
+    CIRCUIT_BREAKER_COOLDOWN
+)
+
+# Circuit states
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+class CircuitOpenError(Exception):
+    """Raised instead of making a call while the circuit is open."""
+
+class CircuitBreaker:
+    """Thread-safe closed / open / half-open breaker over a window of recent outcomes."""
+
+    def __init__(self, name: str = "Gemini API", window: int = CIRCUIT_BREAKER_WINDOW,
+                 min_calls: int = CIRCUIT_BREAKER_MIN_CALLS, failure_rate: float = CIRCUIT_BREAKER_FAILURE_RATE,
+                 cooldown: float = CIRCUIT_BREAKER_COOLDOWN):
+        """
+        Initialize the breaker (closed).
+
+        Args:
+            name (str): Service name for messages
+            window (int): Number of recent outcomes considered
+            min_calls (int): Outcomes needed in the window before the breaker can open
+            failure_rate (float): Share of failures in the window that opens the circuit
+            cooldown (float): Seconds the circuit stays open before a probe is allowed
+        """
+        self.name = name
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.cooldown = cooldown
+        self._outcomes = deque(maxlen=window)
+        self._state = CLOSED
+        self._opened_until = 0.0
+        self._probing = False
+        # Token of the current half-open probe; outcomes carrying another token are stale
+        self._probe = 0
+        self._lock = threading.Lock()
+        self.opened = 0
+        self.rejected = 0
+
+    @property
+    def state(self) -> str:
+        """CLOSED, OPEN or HALF_OPEN (the cooldown is over and a probe may be sent)."""
+        with self._lock:
+            if self._state == OPEN and time.monotonic() >= self._opened_until:
+                return HALF_OPEN
+            return self._state
+
+    def available(self) -> bool:
+        """Whether a call made now would be let through (without reserving the probe)."""
+        with self._lock:
+            if self._state == CLOSED:
+                return True
+            return time.monotonic() >= self._opened_until and not self._probing
+
+    def allow(self) -> Optional[int]:
+        """
+        Check that a call may be made; call record() with its outcome (and this token) afterwards.
+
+        Returns:
+            Optional[int]: Probe token if the call is the half-open probe, None for a regular call
+
+        Raises:
+            CircuitOpenError: While the circuit is open, or while another caller's probe is pending
+        """
+        with self._lock:
+            if self._state == CLOSED:
+                return None
+            remaining = self._opened_until - time.monotonic()
+            if remaining <= 0 and not self._probing:
+                self._state = HALF_OPEN
+                self._probing = True
+                self._probe += 1
+                return self._probe
+            self.rejected += 1
+        raise CircuitOpenError(f"{self.name} circuit breaker is open after repeated failures"
+                               + (f"; retrying in {remaining:.0f}s" if remaining > 0 else "; probing"))
+
+    def record(self, success: Optional[bool], probe: Optional[int] = None):
+        """
+        Report the outcome of a call let through by allow().
+
+        Args:
+            success (Optional[bool]): True if the service answered, False if it failed,
+                None if the outcome says nothing about its health (e.g. a 429)
+            probe (Optional[int]): Token returned by allow() for the call
+        """
+        with self._lock:
+            if probe is not None:
+                if self._state != HALF_OPEN or probe != self._probe:
+                    return  # Stale probe
+                self._probing = False
+                if success:
+                    self._state = CLOSED
+                    self._outcomes.clear()
+                elif success is not None:
+                    self._open()
+                return
+            if self._state != CLOSED or success is None:
+                return  # Calls sent before the circuit opened, or while the probe decides
+            self._outcomes.append(success)
+            failures = self._outcomes.count(False)
+            if len(self._outcomes) >= self.min_calls and failures >= self.failure_rate * len(self._outcomes):
+                self._open()
+
+    def _open(self):
+        self._state = OPEN
+        self._opened_until = time.monotonic() + self.cooldown
+        self.opened += 1
+        print(f"{self.name} circuit breaker opened: failing fast for {self.cooldown:g}s")
+
+    def stats(self) -> Dict[str, Any]:
+        """Current state, failure rate of the window and counters."""
+        state = self.state
+        with self._lock:
+            outcomes = list(self._outcomes)
+            return {
+                "state": state,
+                "failure_rate": outcomes.count(False) / len(outcomes) if outcomes else 0.0,
+                "opened": self.opened,
+                "rejected": self.rejected
+            }
+
+    def summary(self) -> str:
+        """One-line description of the breaker's state."""
+        stats = self.stats()
+        return (f"Circuit breaker: {stats['state']}, {stats['failure_rate']:.0%} recent failures, "
+                f"opened {stats['opened']} times, {stats['rejected']} calls failed fast")
+
+_circuit_breaker = None
+_circuit_breaker_lock = threading.Lock()
+
+def get_circuit_breaker() -> Optional[CircuitBreaker]:
+    """
+    Get the circuit breaker shared by all Gemini callers of this process.
+
+    Returns:
+        Optional[CircuitBreaker]: Breaker configured from CIRCUIT_BREAKER_* in config,
+            or None if CIRCUIT_BREAKER_ENABLED is False
+    """
+    global _circuit_breaker
+    if not CIRCUIT_BREAKER_ENABLED:
+        return None
+    with _circuit_breaker_lock:
+        if _circuit_breaker is None:
+            _circuit_breaker = CircuitBreaker()
+        return _circuit_breaker
@@ -11,6 +11,54 @@ GEMINI_API_KEY = os.getenv("GEMINI_API_KEY", "")
 GEMINI_MODEL = "gemini-2.0-flash"  # or "gemini-2.0-pro"
 MODEL_NAME = GEMINI_MODEL
 
+# Gemini REST endpoint and HTTP behaviour (timeouts in seconds; retryable
+# errors are retried with exponential backoff and jitter, honouring Retry-After).
+# Point the base URL at mock_gemini_server.py (http://127.0.0.1:8765/v1beta) for offline runs.
+GEMINI_API_BASE_URL = os.getenv("GEMINI_API_BASE_URL", "https://generativelanguage.googleapis.com/v1beta")
+GEMINI_CONNECT_TIMEOUT = 10
+GEMINI_READ_TIMEOUT = 120
+GEMINI_MAX_RETRIES = 5
+GEMINI_BACKOFF_BASE = 1.0
+GEMINI_BACKOFF_MAX = 60.0
+GEMINI_EMBEDDING_MODEL = "text-embedding-004"
+# Overall time limit of one Gemini call, including retries and backoff (None = no limit)
+GEMINI_REQUEST_DEADLINE = 300
+
+# Hedged generateContent calls (see hedging.py): a call still unanswered after the
+# GEMINI_HEDGE_QUANTILE latency of recent calls (at least GEMINI_HEDGE_MIN_DELAY
+# seconds; GEMINI_HEDGE_INITIAL_DELAY until 20 calls have been seen) is sent a second
+# time and the first answer wins. At most GEMINI_HEDGE_MAX_RATIO of calls are duplicated.
+GEMINI_HEDGE_ENABLED = True
+GEMINI_HEDGE_QUANTILE = 0.95
+GEMINI_HEDGE_MIN_DELAY = 2.0
+GEMINI_HEDGE_INITIAL_DELAY = 30.0
+GEMINI_HEDGE_MAX_RATIO = 0.1
+
+# Circuit breaker on Gemini requests (see circuit_breaker.py): when at least
+# CIRCUIT_BREAKER_FAILURE_RATE of the last CIRCUIT_BREAKER_WINDOW attempts failed
+# (server errors, timeouts), requests fail fast for CIRCUIT_BREAKER_COOLDOWN seconds
+# or go to SCORING_FALLBACK_BACKEND ("ollama"; None = no fallback)
+CIRCUIT_BREAKER_ENABLED = True
+CIRCUIT_BREAKER_WINDOW = 20
+CIRCUIT_BREAKER_MIN_CALLS = 10
+CIRCUIT_BREAKER_FAILURE_RATE = 0.5
+CIRCUIT_BREAKER_COOLDOWN = 30
+
+# Scoring backend: "gemini" (Gemini API) or "ollama" (local Ollama server)
+SCORING_BACKEND = os.getenv("SCORING_BACKEND", "gemini")
+SCORING_FALLBACK_BACKEND = os.getenv("SCORING_FALLBACK_BACKEND") or None
+
+# Ollama settings. OLLAMA_NUM_PARALLEL requests are kept in flight (start the
+# server with the same OLLAMA_NUM_PARALLEL); OLLAMA_KEEP_ALIVE keeps the model
+# loaded between requests ("-1" pins it until the server stops).
+OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
+OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "mistral")
+OLLAMA_EMBEDDING_MODEL = "nomic-embed-text"
+OLLAMA_KEEP_ALIVE = "30m"
+OLLAMA_NUM_PARALLEL = 4
+OLLAMA_NUM_CTX = 16384
+OLLAMA_TIMEOUT = 600
+
 # General model settings
 TEMPERATURE = 0.3
 MAX_TOKENS = 4096
@@ -19,6 +67,125 @@ MAX_TOKENS = 4096
 CV_DIR = "DataSet/cv"
 JOB_DESCRIPTIONS_DIR = "DataSet/job_descriptions"
 OUTPUT_DIR = "output"
+CACHE_DIR = "cache"
+
+# Extracted text cache (parsed documents are reused across runs)
+TEXT_CACHE_ENABLED = True
+TEXT_CACHE_PATH = os.path.join(CACHE_DIR, "text_cache.sqlite3")
+
+# .docx extraction engine: "fast" streams word/document.xml directly (includes
+# tables and text boxes), "python-docx" uses the python-docx object model
+DOCX_ENGINE = "fast"
+
+# PDF reading budget: stop after this many pages / characters (None = no limit)
+PDF_MAX_PAGES = None
+PDF_MAX_CHARS = None
+
+# Packed corpus snapshot built with `python document_processor.py pack`
+USE_CORPUS_PACK = True
+CORPUS_PACK_PATH = os.path.join(CACHE_DIR, "corpus.pack")
+
+# Number of processes used to parse documents when loading a corpus
+# (None = one per CPU core, 1 = parse serially in the calling process)
+LOAD_WORKERS = None
+
+# Cache of scored CV / job pairs, keyed by both texts, the prompt and the model
+# settings; least recently used results beyond the maximum are evicted
+RESULT_CACHE_ENABLED = True
+RESULT_CACHE_PATH = os.path.join(CACHE_DIR, "match_results.sqlite3")
+RESULT_CACHE_MAX_ENTRIES = 200000
+
+# Request coalescing: concurrent requests for the same pair share one API call
+# within a process. With RESULT_CACHE_CLAIMS, processes sharing the result cache
+# (GUI, batch runs, report generator) also claim a pair there while scoring it;
+# the others poll for its result every RESULT_CACHE_CLAIM_POLL seconds. Claims
+# of a crashed process lapse after RESULT_CACHE_CLAIM_TTL seconds.
+RESULT_CACHE_CLAIMS = True
+RESULT_CACHE_CLAIM_TTL = 300
+RESULT_CACHE_CLAIM_POLL = 0.5
+
+# Gemini request rate limit (token bucket shared by every caller): sustained
+# requests per minute and how many may be sent back to back. With
+# RATE_LIMIT_SHARED, concurrently running scripts share one bucket via a state file.
+RATE_LIMIT_RPM = 15
+RATE_LIMIT_BURST = 3
+RATE_LIMIT_SHARED = True
+RATE_LIMIT_STATE_PATH = os.path.join(CACHE_DIR, "rate_limit.json")
+
+# Maximum number of scoring requests in flight at once (match_all and the batch matchers)
+MAX_CONCURRENT_REQUESTS = 4
+
+# Adaptive concurrency for Gemini requests (AIMD): starting from the initial limit,
+# about one more request is allowed in flight per round trip while responses are
+# healthy; a 429, an overloaded server or a response slower than
+# ADAPTIVE_CONCURRENCY_LATENCY_TOLERANCE x the average latency multiplies the
+# limit by ADAPTIVE_CONCURRENCY_BACKOFF. Disabled: MAX_CONCURRENT_REQUESTS is fixed.
+ADAPTIVE_CONCURRENCY_ENABLED = True
+ADAPTIVE_CONCURRENCY_INITIAL = MAX_CONCURRENT_REQUESTS
+ADAPTIVE_CONCURRENCY_MIN = 1
+ADAPTIVE_CONCURRENCY_MAX = 16
+ADAPTIVE_CONCURRENCY_BACKOFF = 0.5
+ADAPTIVE_CONCURRENCY_LATENCY_TOLERANCE = 2.5
+
+# Token accounting (see usage_meter.py): prices in USD per million tokens as
+# (input, cached input, output); models not listed (e.g. Ollama) cost nothing.
+# Batch API requests are billed at USAGE_BATCH_PRICE_FACTOR of these prices.
+USAGE_PRICES = {
+    "gemini-2.0-flash": (0.10, 0.025, 0.40),
+    "gemini-2.0-flash-lite": (0.075, 0.075, 0.30),
+    "gemini-2.5-flash": (0.30, 0.075, 2.50),
+    "gemini-2.5-pro": (1.25, 0.31, 10.00),
+}
+USAGE_BATCH_PRICE_FACTOR = 0.5
+
+# Budgets per run (None = no limit). At the budget, "stop" aborts the run (scored
+# pairs stay in the result cache) and "pause" waits until the usage of the last
+# USAGE_BUDGET_WINDOW seconds drops below it; without a window the budgets cover the whole run.
+USAGE_TOKEN_BUDGET = int(os.getenv("USAGE_TOKEN_BUDGET")) if os.getenv("USAGE_TOKEN_BUDGET") else None
+USAGE_COST_BUDGET = float(os.getenv("USAGE_COST_BUDGET")) if os.getenv("USAGE_COST_BUDGET") else None
+USAGE_BUDGET_WINDOW = None
+USAGE_BUDGET_ACTION = "stop"
+
+# Multi-candidate prompts: one job is scored against up to MATCH_BATCH_SIZE CVs
+# (or one CV against that many jobs) per request; 1 scores every pair on its own
+MATCH_BATCH_SIZE = 5
+BATCH_MAX_TOKENS = 8192
+
+# Explicit context caching (cachedContents): while one job is scored against many
+# CVs, the system prompt and job text are cached once and referenced by name.
+# "gemini" uses the API, "local" an in-memory stand-in. Prefixes shorter than
+# CONTEXT_CACHE_MIN_TOKENS (the model's caching minimum) are sent inline.
+CONTEXT_CACHE_ENABLED = True
+CONTEXT_CACHE_BACKEND = os.getenv("CONTEXT_CACHE_BACKEND", "gemini")
+CONTEXT_CACHE_TTL = 900
+CONTEXT_CACHE_MIN_TOKENS = 1024
+
+# Offline bulk scoring (--batch in main.py and generate_excel_report.py): pending
+# pairs are submitted as Batch API jobs of at most BATCH_API_MAX_REQUESTS requests
+# and their results are stored in the result cache. "gemini" uses the Batch API,
+# "local" a file-based fake that answers with deterministic scores. A job whose
+# status cannot be read BATCH_API_MAX_POLL_ERRORS times in a row is given up on,
+# and a run stops waiting after BATCH_API_TIMEOUT seconds (unfinished jobs stay
+# in the manifest for the next run; their pairs are scored online meanwhile).
+BATCH_API_BACKEND = os.getenv("BATCH_API_BACKEND", "gemini")
+BATCH_API_DIR = os.path.join(CACHE_DIR, "batch_jobs")
+BATCH_API_MAX_REQUESTS = 10000
+BATCH_API_POLL_INTERVAL = 60
+BATCH_API_MAX_POLL_ERRORS = 5
+BATCH_API_TIMEOUT = 24 * 60 * 60
+
+# Near-duplicate detection (MinHash/LSH over word shingles): documents whose
+# estimated Jaccard similarity reaches the threshold share match results
+SKIP_NEAR_DUPLICATES = True
+NEAR_DUPLICATE_THRESHOLD = 0.9
+NEAR_DUPLICATE_NUM_PERM = 128
+NEAR_DUPLICATE_SHINGLE_SIZE = 3
+
+# Send only the relevant sections of each document to the model (see
+# document_sections.py); documents without recognised headings are sent whole
+PROMPT_SECTIONS_ONLY = False
+CV_PROMPT_SECTIONS = ["header", "summary", "skills", "languages", "education", "certifications", "experience"]
+JOB_PROMPT_SECTIONS = ["title", "responsibilities", "requirements", "preferred"]
 
 # Scoring weights
 INDUSTRY_KNOWLEDGE_WEIGHT = 0.1
@@ -0,0 +1,178 @@
+"""
+Explicit context caching for the scoring prompts.
+
+When one job description is scored against many CVs (or one CV against many
+jobs), every request starts with the same system prompt and document. Gemini
+can store such a prefix as a cachedContents resource; requests then refer to it
+by name and its tokens are neither re-sent nor re-processed at full price.
+CVJobMatcher.cached_context() creates an entry per job (or CV) for the length
+of a batch run, keeps it alive while it is used and deletes it afterwards.
+
+LocalContextCache is an in-memory stand-in with the same interface, for tests
+and servers without cachedContents support: it expands cached names back into
+the full prompt on the client.
+"""
+import time
+import threading
+import itertools
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Optional
+
+from config import GEMINI_MODEL, CONTEXT_CACHE_ENABLED, CONTEXT_CACHE_BACKEND
+from gemini_transport import GeminiAPIError, GeminiTransport
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count of a text (about four characters per token)."""
+    return len(text) // 4
+
+def _content(text: str) -> Dict[str, Any]:
+    """A user turn with a single text part."""
+    return {"role": "user", "parts": [{"text": text}]}
+
+class ContextCache(ABC):
+    """Store for prompt prefixes (system instruction plus a shared document)."""
+
+    @abstractmethod
+    def create(self, system_instruction: str, prefix: str, ttl: int) -> str:
+        """
+        Cache a prompt prefix.
+
+        Args:
+            system_instruction (str): System prompt
+            prefix (str): Shared document text sent before the per-request content
+            ttl (int): Lifetime in seconds
+
+        Returns:
+            str: Name to pass as cachedContent in generateContent requests
+        """
+
+    @abstractmethod
+    def touch(self, name: str, ttl: int):
+        """
+        Extend the lifetime of a cached prefix.
+
+        Args:
+            name (str): Name returned by create()
+            ttl (int): New lifetime in seconds, counted from now
+        """
+
+    @abstractmethod
+    def delete(self, name: str):
+        """
+        Remove a cached prefix.
+
+        Args:
+            name (str): Name returned by create()
+        """
+
+    def expand(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Prepare a generateContent payload that may refer to a cached prefix.
+
+        Args:
+            payload (Dict[str, Any]): Request body, possibly with a cachedContent name
+
+        Returns:
+            Dict[str, Any]: Body to send (the server resolves cachedContent itself by default)
+        """
+        return payload
+
+class GeminiContextCache(ContextCache):
+    """Context cache backed by the Gemini cachedContents API."""
+
+    def __init__(self, transport: GeminiTransport, model: str = GEMINI_MODEL):
+        """
+        Initialize the cache.
+
+        Args:
+            transport (GeminiTransport): Transport used for the cachedContents requests
+            model (str): Model the cached prefixes are used with
+        """
+        self.transport = transport
+        self.model = model
+
+    def create(self, system_instruction: str, prefix: str, ttl: int) -> str:
+        response = self.transport.request("POST", f"{self.transport.base_url}/cachedContents", {
+            "model": f"models/{self.model}",
+            "systemInstruction": {"parts": [{"text": system_instruction}]},
+            "contents": [_content(prefix)],
+            "ttl": f"{int(ttl)}s"
+        })
+        try:
+            return response["name"]
+        except KeyError:
+            raise GeminiAPIError(f"Unexpected cachedContents response: {response}")
+
+    def touch(self, name: str, ttl: int):
+        self.transport.request("PATCH", f"{self.transport.base_url}/{name}", {"ttl": f"{int(ttl)}s"},
+                               params={"updateMask": "ttl"})
+
+    def delete(self, name: str):
+        self.transport.request("DELETE", f"{self.transport.base_url}/{name}")
+
+class LocalContextCache(ContextCache):
+    """In-memory stand-in for cachedContents; cached names are expanded on the client."""
+
+    def __init__(self):
+        """Initialize an empty cache."""
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self.created = 0
+        self.deleted = 0
+        self.hits = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def create(self, system_instruction: str, prefix: str, ttl: int) -> str:
+        with self._lock:
+            name = f"cachedContents/local-{next(self._ids)}"
+            self._entries[name] = (system_instruction, prefix, time.time() + ttl)
+            self.created += 1
+        return name
+
+    def touch(self, name: str, ttl: int):
+        with self._lock:
+            if name not in self._entries:
+                raise GeminiAPIError(f"Cached content {name} not found", status_code=404)
+            system_instruction, prefix, _ = self._entries[name]
+            self._entries[name] = (system_instruction, prefix, time.time() + ttl)
+
+    def delete(self, name: str):
+        with self._lock:
+            if self._entries.pop(name, None) is not None:
+                self.deleted += 1
+
+    def expand(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        name = payload.get("cachedContent")
+        if name is None:
+            return payload
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is None or entry[2] < time.time():
+                # Same failure the API reports for an expired or deleted entry
+                raise GeminiAPIError(f"Cached content {name} not found", status_code=404)
+            self.hits += 1
+        system_instruction, prefix, _ = entry
+        expanded = {key: value for key, value in payload.items() if key != "cachedContent"}
+        expanded["systemInstruction"] = {"parts": [{"text": system_instruction}]}
+        expanded["contents"] = [_content(prefix)] + list(payload.get("contents", []))
+        return expanded
+
+def get_context_cache(transport: GeminiTransport) -> Optional[ContextCache]:
+    """
+    Create the context cache configured in config.
+
+    Args:
+        transport (GeminiTransport): Transport of the matcher using the cache
+
+    Returns:
+        Optional[ContextCache]: GeminiContextCache or LocalContextCache (CONTEXT_CACHE_BACKEND),
+            or None if CONTEXT_CACHE_ENABLED is False
+    """
+    if not CONTEXT_CACHE_ENABLED:
+        return None
+    if CONTEXT_CACHE_BACKEND == "local":
+        return LocalContextCache()
+    return GeminiContextCache(transport)
@@ -0,0 +1,199 @@
+"""
+Packed corpus snapshot: all extracted CV and job description texts in one file.
+
+Layout (little-endian):
+    header   magic, version, entry count, index offset, info offset / length
+    data     UTF-8 document IDs, texts and metadata JSON, back to back
+    index    fixed-size entries sorted by (kind, document ID)
+    info     UTF-8 JSON describing how the pack was built
+
+Readers memory-map the file and binary-search the index, so opening a pack
+costs the same for 10 or 10,000 documents and texts are sliced straight out
+of the mapping.
+"""
+import os
+import json
+import mmap
+import struct
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+MAGIC = b"CVJPACK\0"
+VERSION = 1
+
+KIND_CV = "cv"
+KIND_JOB = "job"
+_KIND_CODES = {KIND_CV: 0, KIND_JOB: 1}
+
+_HEADER = struct.Struct("<8sHxxIQQQ")
+# kind, ID length, ID offset, text offset, text length, metadata offset, metadata length
+_ENTRY = struct.Struct("<BxxxIQQQQI4x")
+
+def write_corpus_pack(output_path: str, documents: Dict[str, Iterable[Tuple[str, str, Dict[str, Any]]]],
+                      info: Dict[str, Any] = None) -> int:
+    """
+    Write a corpus pack.
+
+    Args:
+        output_path (str): Path of the pack file to create (replaced atomically)
+        documents: Dictionary mapping a kind ("cv" or "job") to (ID, text, metadata) tuples
+        info (Dict[str, Any], optional): Extra JSON-serializable build information
+
+    Returns:
+        int: Number of documents written
+    """
+    entries = []
+    tmp_path = output_path + ".tmp"
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+
+    with open(tmp_path, "wb") as f:
+        f.write(b"\0" * _HEADER.size)
+        for kind, docs in documents.items():
+            kind_code = _KIND_CODES[kind]
+            for doc_id, text, metadata in docs:
+                id_bytes = doc_id.encode("utf-8")
+                id_offset = f.tell()
+                f.write(id_bytes)
+                text_offset = f.tell()
+                text_length = f.write(text.encode("utf-8"))
+                meta_offset = f.tell()
+                meta_length = f.write(json.dumps(metadata or {}, ensure_ascii=False).encode("utf-8"))
+                entries.append((kind_code, id_bytes, id_offset, text_offset, text_length, meta_offset, meta_length))
+
+        # Sorted index so readers can binary-search without building a dictionary
+        entries.sort(key=lambda e: (e[0], e[1]))
+        index_offset = f.tell()
+        for kind_code, id_bytes, id_offset, text_offset, text_length, meta_offset, meta_length in entries:
+            f.write(_ENTRY.pack(kind_code, len(id_bytes), id_offset, text_offset, text_length,
+                                meta_offset, meta_length))
+
+        info_offset = f.tell()
+        info_length = f.write(json.dumps(info or {}, ensure_ascii=False).encode("utf-8"))
+
+        f.seek(0)
+        f.write(_HEADER.pack(MAGIC, VERSION, len(entries), index_offset, info_offset, info_length))
+
+    os.replace(tmp_path, output_path)
+    return len(entries)
+
+class CorpusPack:
+    """Read-only, memory-mapped view of a corpus pack."""
+
+    def __init__(self, path: str):
+        """
+        Open a corpus pack.
+
+        Args:
+            path (str): Path to the pack file
+
+        Raises:
+            ValueError: If the file is not a corpus pack of a supported version
+        """
+        self.path = path
+        self._file = open(path, "rb")
+        try:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise ValueError(f"Empty corpus pack: {path}")
+
+        magic, version, count, index_offset, info_offset, info_length = _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"Not a corpus pack (or unsupported version): {path}")
+        self.count = count
+        self._index_offset = index_offset
+        self.info = json.loads(self._mm[info_offset:info_offset + info_length].decode("utf-8"))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
+
+    def __len__(self):
+        return self.count
+
+    def close(self):
+        """Unmap and close the pack file."""
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        self._file.close()
+
+    def _entry(self, position: int) -> Tuple:
+        return _ENTRY.unpack_from(self._mm, self._index_offset + position * _ENTRY.size)
+
+    def _key(self, position: int) -> Tuple[int, bytes]:
+        kind_code, id_length, id_offset = self._entry(position)[:3]
+        return kind_code, self._mm[id_offset:id_offset + id_length]
+
+    def _find(self, kind: str, doc_id: str) -> Optional[Tuple]:
+        """Binary-search the index for a document; returns its index entry or None."""
+        target = (_KIND_CODES[kind], doc_id.encode("utf-8"))
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self._key(middle) < target:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self.count and self._key(low) == target:
+            return self._entry(low)
+        return None
+
+    def text_view(self, kind: str, doc_id: str) -> Optional[memoryview]:
+        """
+        Get the UTF-8 bytes of a document's text without copying them.
+
+        The view is only valid while the pack is open.
+
+        Args:
+            kind (str): "cv" or "job"
+            doc_id (str): Document ID
+
+        Returns:
+            Optional[memoryview]: Slice of the mapping, or None if the document is not in the pack
+        """
+        entry = self._find(kind, doc_id)
+        if entry is None:
+            return None
+        text_offset, text_length = entry[3], entry[4]
+        return memoryview(self._mm)[text_offset:text_offset + text_length]
+
+    def get_text(self, kind: str, doc_id: str) -> Optional[str]:
+        """Get a document's text, or None if it is not in the pack."""
+        entry = self._find(kind, doc_id)
+        if entry is None:
+            return None
+        return self._mm[entry[3]:entry[3] + entry[4]].decode("utf-8")
+
+    def get_metadata(self, kind: str, doc_id: str) -> Optional[Dict[str, Any]]:
+        """Get a document's metadata, or None if it is not in the pack."""
+        entry = self._find(kind, doc_id)
+        if entry is None:
+            return None
+        return json.loads(self._mm[entry[5]:entry[5] + entry[6]].decode("utf-8"))
+
+    def ids(self, kind: str) -> List[str]:
+        """List the IDs of all documents of a kind, in index order."""
+        kind_code = _KIND_CODES[kind]
+        return [key.decode("utf-8") for code, key in (self._key(i) for i in range(self.count)) if code == kind_code]
+
+    def iter_documents(self, kind: str) -> Iterator[Tuple[str, str, Dict[str, Any]]]:
+        """
+        Iterate over the documents of a kind.
+
+        Yields:
+            Tuple[str, str, Dict[str, Any]]: Document ID, text and metadata
+        """
+        kind_code = _KIND_CODES[kind]
+        for position in range(self.count):
+            code, id_length, id_offset, text_offset, text_length, meta_offset, meta_length = self._entry(position)
+            if code != kind_code:
+                continue
+            yield (
+                self._mm[id_offset:id_offset + id_length].decode("utf-8"),
+                self._mm[text_offset:text_offset + text_length].decode("utf-8"),
+                json.loads(self._mm[meta_offset:meta_offset + meta_length].decode("utf-8"))
+            )
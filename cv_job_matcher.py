@@ -1,10 +1,10 @@
 import os
 import sys
 import heapq
-import time
 from document_processor import extract_text, load_job_descriptions, load_cvs
+from document_manifest import get_manifest, parse_document_filename
 from matcher import CVJobMatcher
-from config import GEMINI_API_KEY
+from config import GEMINI_API_KEY, SCORING_BACKEND
 
 def get_cv_files(cv_id=None, base_dir=None):
     """
@@ -19,43 +19,12 @@ def get_cv_files(cv_id=None, base_dir=None):
     """
     if base_dir is None:
         base_dir = os.path.dirname(os.path.abspath(__file__))
-    cv_dir = os.path.join(base_dir, "DataSet", "cv")
-    cv_files = [f for f in os.listdir(cv_dir) if f.endswith(('.docx', '.pdf'))]
-    cv_display_names = {}
-    
-    for file in cv_files:
-        if file.endswith('.docx') and file.startswith('cv_'):
-            # Standard naming convention: cv_ID_Name.docx
-            parts = file.split('_')
-            if len(parts) >= 3:
-                file_id = parts[1]
-                name = '_'.join(parts[2:]).replace('.docx', '')
-                cv_display_names[file] = f"ID {file_id} - {name}"
-        elif file.endswith('.pdf'):
-            # PDF files might not follow the naming convention
-            if file.startswith('cv_'):
-                # Try to extract ID if it follows the convention
-                parts = file.split('_')
-                if len(parts) >= 3:
-                    file_id = parts[1]
-                    name = '_'.join(parts[2:]).replace('.pdf', '')
-                    cv_display_names[file] = f"ID {file_id} - {name}"
-                else:
-                    # For PDF files without standard naming
-                    cv_display_names[file] = file.replace('.pdf', '')
-            else:
-                # For PDF files without standard naming
-                cv_display_names[file] = file.replace('.pdf', '')
+    manifest = get_manifest(os.path.join(base_dir, "DataSet", "cv"))
+    cv_files, cv_display_names = manifest.get_files()
     
-    # If cv_id is provided, filter the files
+    # If cv_id is provided, filter the files by numeric ID or filename
     if cv_id:
-        if cv_id.isdigit():
-            # Try to find by numeric ID
-            filtered_files = [f for f in cv_files if f.endswith('.docx') and f.split('_')[1] == cv_id]
-        else:
-            # Assume cv_id is a filename
-            filtered_files = [f for f in cv_files if f == cv_id or f.replace('.pdf', '') == cv_id or f.replace('.docx', '') == cv_id]
-        
+        filtered_files = manifest.find(cv_id)
         return filtered_files, {k: cv_display_names[k] for k in filtered_files if k in cv_display_names}
     
     return cv_files, cv_display_names
@@ -74,12 +43,12 @@ def batch_match_cv_to_jobs(cv_path, num_jobs=20, top_matches=5, max_retries=3):
         list: Top matches sorted by score (highest first)
     """
     # Check if Gemini API key is provided
-    if not GEMINI_API_KEY:
+    if SCORING_BACKEND == "gemini" and not GEMINI_API_KEY:
         print("Error: GEMINI_API_KEY is not set.")
         print("Please set your API key in the config.py file or as an environment variable.")
         sys.exit(1)
     
-    print(f"Using Gemini API")
+    print(f"Using scoring backend: {SCORING_BACKEND}")
     
     # Get paths to directories
     base_dir = os.path.dirname(os.path.abspath(__file__))
@@ -89,16 +58,11 @@ def batch_match_cv_to_jobs(cv_path, num_jobs=20, top_matches=5, max_retries=3):
     cv_content = extract_text(cv_path)
     
     # Get display name for the CV
-    cv_name = os.path.basename(cv_path)
-    if cv_name.endswith('.docx') and cv_name.startswith('cv_'):
-        parts = cv_name.split('_')
-        if len(parts) >= 3:
-            cv_id = parts[1]
-            name = '_'.join(parts[2:]).replace('.docx', '')
-            cv_name = f"ID {cv_id} - {name}"
+    cv_name = parse_document_filename(os.path.basename(cv_path))['display_name']
     
     # Load job descriptions
-    job_files = [f for f in os.listdir(job_dir) if f.endswith(('.docx', '.pdf'))]
+    job_manifest = get_manifest(job_dir)
+    job_files, _ = job_manifest.get_files()
     job_files.sort()
     
     # Limit to the specified number of jobs
@@ -112,67 +76,27 @@ def batch_match_cv_to_jobs(cv_path, num_jobs=20, top_matches=5, max_retries=3):
     
     print(f"Matching CV: {cv_name} with {len(job_files)} job descriptions...")
     
-    # Track API calls for rate limiting
-    api_call_count = 0
-    
-    # Process each job description
-    for i, job_file in enumerate(job_files):
-        # Check if we need to pause for rate limiting (after 15 API calls)
-        if api_call_count >= 15:
-            print("\n=== RATE LIMIT REACHED ===")
-            print("Pausing for 60 seconds to avoid API rate limiting...")
-            for remaining in range(60, 0, -1):
-                sys.stdout.write(f"\rResuming in {remaining} seconds...")
-                sys.stdout.flush()
-                time.sleep(1)
-            print("\nResuming processing...")
-            # Reset the counter after the pause
-            api_call_count = 0
+    # Read the job descriptions first (retrying unreadable files); scoring then runs concurrently
+    job_contents = []
+    scored_jobs = []
+    
+    for job_file in job_files:
+        # Extract job info (standard naming: job_description_ID_Title.docx)
+        job_entry = job_manifest.entry(job_file)
+        job_id = job_entry['file_id'] or "N/A"
+        job_title = job_entry['name']
         
         retry_count = 0
         success = False
         
         while retry_count < max_retries and not success:
             try:
-                # Extract job info
-                if job_file.endswith('.docx') and job_file.startswith('job_description_'):
-                    # Standard naming: job_description_ID_Title.docx
-                    parts = job_file.split('_')
-                    if len(parts) >= 4:
-                        job_id = parts[2]
-                        job_title = '_'.join(parts[3:]).replace('.docx', '')
-                    else:
-                        job_id = "N/A"
-                        job_title = job_file.replace('job_description_', '').replace('.docx', '')
-                else:
-                    # For PDF files or non-standard naming
-                    job_id = "N/A"
-                    job_title = job_file.replace('.pdf', '').replace('.docx', '')
-                
-                # Display progress
-                print(f"Processing {i+1}/{len(job_files)}: Job {job_id} - {job_title}")
-                
                 # Get job content
-                job_path = os.path.abspath(os.path.join(job_dir, job_file))
+                job_path = job_manifest.path(job_file)
                 job_content = extract_text(job_path)
                 
-                # Match CV with job description
-                result = matcher.match(cv_content, job_content)
-                
-                # Increment API call counter after successful call
-                api_call_count += 1
-                
-                # Store result with job info
-                all_results.append({
-                    'job_id': job_id,
-                    'job_title': job_title,
-                    'total_score': result.total_score,
-                    'industry_knowledge_score': result.industry_knowledge_score,
-                    'technical_skills_score': result.technical_skills_score,
-                    'job_description_match_score': result.job_description_match_score,
-                    'reasoning': result.reasoning
-                })
-                
+                job_contents.append(job_content)
+                scored_jobs.append((job_id, job_title))
                 success = True
                 
             except Exception as e:
@@ -184,13 +108,6 @@ def batch_match_cv_to_jobs(cv_path, num_jobs=20, top_matches=5, max_retries=3):
                 else:
                     print(f"Failed to process job {job_file} after {max_retries} attempts. Skipping.")
                     # Add a placeholder result to ensure we have data for reporting
-                    if job_file.endswith('.docx') and job_file.startswith('job_description_'):
-                        job_id = job_file.split('_')[2]
-                        job_title = '_'.join(job_file.split('_')[3:]).replace('.docx', '')
-                    else:
-                        job_id = "N/A"
-                        job_title = job_file.replace('.pdf', '').replace('.docx', '')
-                    
                     all_results.append({
                         'job_id': job_id,
                         'job_title': job_title,
@@ -201,6 +118,31 @@ def batch_match_cv_to_jobs(cv_path, num_jobs=20, top_matches=5, max_retries=3):
                         'reasoning': f"Error processing: {str(e)}"
                     })
     
+    completed = [0]
+    
+    def report_progress(index, result):
+        # Display progress
+        completed[0] += 1
+        job_id, job_title = scored_jobs[index]
+        print(f"Processed {completed[0]}/{len(job_contents)}: Job {job_id} - {job_title}")
+    
+    # Match the CV with the job descriptions, several jobs per request and several requests at a time
+    results = matcher.match_cv_to_jobs(cv_content, job_contents, on_result=report_progress)
+    if matcher.result_cache is not None:
+        print(matcher.result_cache.summary())
+    
+    for (job_id, job_title), result in zip(scored_jobs, results):
+        # Store result with job info
+        all_results.append({
+            'job_id': job_id,
+            'job_title': job_title,
+            'total_score': result.total_score,
+            'industry_knowledge_score': result.industry_knowledge_score,
+            'technical_skills_score': result.technical_skills_score,
+            'job_description_match_score': result.job_description_match_score,
+            'reasoning': result.reasoning
+        })
+    
     # Sort results by total score (highest first)
     all_results.sort(key=lambda x: x['total_score'], reverse=True)
     
@@ -266,16 +208,13 @@ def main():
                 # User entered a list number
                 cv_file = cv_list[int(choice)-1][0]
                 break
-            elif choice in [f.split('_')[1] for f in cv_files if f.endswith('.docx') and f.startswith('cv_') and len(f.split('_')) > 1]:
-                # User entered an ID
-                cv_identifier = choice
-                break
-            elif choice in cv_files or choice.replace('.pdf', '') in [f.replace('.pdf', '') for f in cv_files]:
-                # User entered a filename
-                cv_identifier = choice
+            
+            # User entered an ID or a filename
+            matching_files, _ = get_cv_files(choice)
+            if matching_files:
+                cv_identifier = matching_files[0]
                 break
-            else:
-                print("Invalid selection. Please try again.")
+            print("Invalid selection. Please try again.")
         except ValueError:
             print("Invalid input. Please try again.")
     
@@ -0,0 +1,228 @@
+import os
+import json
+import hashlib
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from config import CACHE_DIR
+
+DOCUMENT_EXTENSIONS = ('.docx', '.pdf')
+
+def get_base_dir():
+    """Get the base directory of the project."""
+    return os.path.dirname(os.path.abspath(__file__))
+
+def parse_document_filename(filename: str) -> Dict[str, Any]:
+    """
+    Split a cv_ID_Name or job_description_ID_Title filename into its parts.
+
+    Args:
+        filename (str): Name of the document file
+
+    Returns:
+        Dict[str, Any]: kind ("cv" or "job", None if unknown), file_id (None for
+            non-standard names), name, display_name, file_name and format
+    """
+    stem, extension = os.path.splitext(filename)
+    kind, file_id, name = None, None, stem
+    if filename.startswith('job_description_'):
+        kind = "job"
+        parts = stem.split('_', 3)
+        if len(parts) == 4:
+            file_id, name = parts[2], parts[3]
+    elif filename.startswith('cv_'):
+        kind = "cv"
+        parts = stem.split('_', 2)
+        if len(parts) == 3:
+            file_id, name = parts[1], parts[2]
+    return {
+        'kind': kind,
+        'file_id': file_id,
+        'name': name,
+        'display_name': f"ID {file_id} - {name}" if file_id else stem,
+        'file_name': filename,
+        'format': extension.lstrip('.').lower(),
+    }
+
+class DocumentManifest:
+    """
+    Parsed listing of a document directory.
+
+    Filenames are parsed once and kept in file -> entry and ID -> files indexes.
+    The manifest is persisted under CACHE_DIR and the directory is only listed
+    again when its modification time changes, so callers can ask for files,
+    display names and ID lookups as often as they like.
+    """
+
+    def __init__(self, directory: str, persist: bool = True):
+        """
+        Initialize the manifest for a directory.
+
+        Args:
+            directory (str): Directory containing CV or job description files
+            persist (bool): Whether to save the manifest to disk between runs
+        """
+        self.directory = os.path.abspath(directory)
+        self.persist = persist
+        self.dir_mtime_ns = None
+        self._entries = {}
+        self._by_id = {}
+        self._lock = threading.Lock()
+
+        digest = hashlib.sha1(self.directory.encode("utf-8")).hexdigest()[:12]
+        cache_dir = CACHE_DIR if os.path.isabs(CACHE_DIR) else os.path.join(get_base_dir(), CACHE_DIR)
+        self.manifest_path = os.path.join(cache_dir, "manifests", f"{os.path.basename(self.directory)}_{digest}.json")
+
+        if persist:
+            self._load()
+
+    def _load(self):
+        """Restore a previously saved manifest, if any."""
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return
+        if saved.get('directory') != self.directory:
+            return
+        self._set_entries({entry['file_name']: entry for entry in saved.get('entries', [])})
+        self.dir_mtime_ns = saved.get('mtime_ns')
+
+    def _save(self):
+        """Write the manifest to disk."""
+        os.makedirs(os.path.dirname(self.manifest_path), exist_ok=True)
+        tmp_path = self.manifest_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({
+                'directory': self.directory,
+                'mtime_ns': self.dir_mtime_ns,
+                'entries': list(self._entries.values())
+            }, f, ensure_ascii=False)
+        os.replace(tmp_path, self.manifest_path)
+
+    def _set_entries(self, entries: Dict[str, Dict[str, Any]]):
+        by_id = {}
+        for file_name, entry in entries.items():
+            if entry['file_id'] is not None:
+                by_id.setdefault(entry['file_id'], []).append(file_name)
+        self._entries = entries
+        self._by_id = by_id
+
+    def refresh(self, force: bool = False) -> bool:
+        """
+        Re-list the directory if it changed since the last scan.
+
+        Only new filenames are parsed; entries of files still present are reused.
+
+        Args:
+            force (bool): Re-list even if the directory modification time is unchanged
+
+        Returns:
+            bool: True if the directory was re-listed
+        """
+        with self._lock:
+            try:
+                mtime_ns = os.stat(self.directory).st_mtime_ns
+            except OSError:
+                mtime_ns = None
+            if not force and mtime_ns is not None and mtime_ns == self.dir_mtime_ns:
+                return False
+
+            try:
+                file_names = [f for f in os.listdir(self.directory) if f.endswith(DOCUMENT_EXTENSIONS)]
+            except OSError:
+                file_names = []
+
+            entries = {}
+            for file_name in file_names:
+                entry = self._entries.get(file_name)
+                if entry is None:
+                    entry = parse_document_filename(file_name)
+                entries[file_name] = entry
+            self._set_entries(entries)
+            self.dir_mtime_ns = mtime_ns
+
+            if self.persist:
+                try:
+                    self._save()
+                except OSError as e:
+                    print(f"Could not save document manifest {self.manifest_path}: {e}")
+            return True
+
+    def get_files(self) -> Tuple[List[str], Dict[str, str]]:
+        """
+        Get files and their display names.
+
+        Returns:
+            Tuple[List[str], Dict[str, str]]: List of files and dictionary mapping filenames to display names
+        """
+        self.refresh()
+        return list(self._entries), {f: e['display_name'] for f, e in self._entries.items()}
+
+    def entry(self, file_name: str) -> Optional[Dict[str, Any]]:
+        """Get the parsed entry of a file (parsing it on the fly if it isn't listed)."""
+        self.refresh()
+        entry = self._entries.get(file_name)
+        if entry is None and file_name.endswith(DOCUMENT_EXTENSIONS):
+            entry = parse_document_filename(os.path.basename(file_name))
+        return entry
+
+    def display_name(self, file_name: str) -> str:
+        """Get the "ID x - Name" display name of a file."""
+        entry = self.entry(file_name)
+        return entry['display_name'] if entry else file_name
+
+    def path(self, file_name: str) -> str:
+        """Get the full path of a file in the directory."""
+        return os.path.join(self.directory, file_name)
+
+    def find_by_id(self, file_id: str) -> List[str]:
+        """
+        Find files by the numeric ID in their name.
+
+        Args:
+            file_id (str): ID to look up
+
+        Returns:
+            List[str]: Matching filenames (normally zero or one)
+        """
+        self.refresh()
+        return list(self._by_id.get(file_id, []))
+
+    def find(self, identifier: str) -> List[str]:
+        """
+        Find files by numeric ID, filename or filename without extension.
+
+        Args:
+            identifier (str): ID, filename or stem
+
+        Returns:
+            List[str]: Matching filenames
+        """
+        self.refresh()
+        if identifier.isdigit():
+            return self.find_by_id(identifier)
+        if identifier in self._entries:
+            return [identifier]
+        return [f for f in self._entries if os.path.splitext(f)[0] == identifier]
+
+_manifests = {}
+_manifests_lock = threading.Lock()
+
+def get_manifest(directory: str) -> DocumentManifest:
+    """
+    Get the shared manifest of a directory.
+
+    Args:
+        directory (str): Directory containing CV or job description files
+
+    Returns:
+        DocumentManifest: Manifest, refreshed if the directory changed
+    """
+    directory = os.path.abspath(directory)
+    with _manifests_lock:
+        manifest = _manifests.get(directory)
+        if manifest is None:
+            manifest = _manifests[directory] = DocumentManifest(directory)
+    manifest.refresh()
+    return manifest
@@ -1,23 +1,42 @@
 import os
 import docx
-from typing import List, Dict, Optional, Any
+import time
+from typing import List, Dict, Optional, Any, Tuple, Iterator
 import re
+import io
+import mmap
+import zipfile
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import fitz  # PyMuPDF for PDF processing
-from config import CV_DIR, JOB_DESCRIPTIONS_DIR
+from pydantic import BaseModel
+from config import (
+    CV_DIR,
+    JOB_DESCRIPTIONS_DIR,
+    LOAD_WORKERS,
+    DOCX_ENGINE,
+    PDF_MAX_PAGES,
+    PDF_MAX_CHARS,
+    USE_CORPUS_PACK,
+    CORPUS_PACK_PATH
+)
+from text_cache import get_text_cache, EXTRACTOR_VERSION
+from corpus_pack import CorpusPack, write_corpus_pack, KIND_CV, KIND_JOB
+from document_manifest import get_manifest, parse_document_filename
 
 def get_base_dir():
     """Get the base directory of the project."""
     return os.path.dirname(os.path.abspath(__file__))
 
-def extract_text(file_path: str) -> str:
+def resolve_document_path(file_path: str) -> str:
     """
-    Extract text from a document file.
+    Resolve a document path relative to the DataSet folders.
 
     Args:
-        file_path (str): Path to the document file (.docx or .pdf)
+        file_path (str): Absolute path, bare CV/job filename, or path relative to the project
 
     Returns:
-        str: Extracted text
+        str: Absolute path to the document
     """
     # If the path is relative, make it absolute and include DataSet/cv/ directory
     if not os.path.isabs(file_path):
@@ -30,20 +49,90 @@ def extract_text(file_path: str) -> str:
             file_path = os.path.join(base_dir, "DataSet", "job_descriptions", file_path)
         else:
             file_path = os.path.join(base_dir, file_path)
+    return file_path
+
+def extract_text(file_path: str, use_cache: bool = True) -> str:
+    """
+    Extract text from a document file.
+
+    Results are served from the corpus pack or the on-disk text cache when
+    the file has been parsed before, so repeated runs don't re-parse the same documents.
+
+    Args:
+        file_path (str): Path to the document file (.docx or .pdf)
+        use_cache (bool): Whether to consult the text cache (default: True)
+
+    Returns:
+        str: Extracted text
+    """
+    file_path = resolve_document_path(file_path)
+    
+    if not file_path.lower().endswith(('.docx', '.pdf')):
+        raise ValueError(f"Unsupported file format: {file_path}")
+    
+    if not use_cache:
+        return _extract_uncached(file_path)
     
+    text = _pack_lookup(file_path)
+    if text is not None:
+        return text
+    
+    cache = get_text_cache()
+    if cache is None:
+        return _extract_uncached(file_path)
+    return cache.get_or_extract(file_path, _extract_uncached, extraction_signature())
+
+def extraction_signature() -> str:
+    """
+    Identify the extraction settings in use, so cached texts produced with
+    other engines or settings are not reused.
+
+    Returns:
+        str: Signature string stored alongside cached texts
+    """
+    return f"{EXTRACTOR_VERSION};docx={DOCX_ENGINE};pdf={PDF_MAX_PAGES}/{PDF_MAX_CHARS}"
+
+def _extract_uncached(file_path: str, data: bytes = None) -> str:
+    """
+    Parse a document with the extractor matching its extension.
+
+    Args:
+        file_path (str): Path to the document
+        data (bytes, optional): File contents if already read, so the file isn't read twice
+    """
     if file_path.lower().endswith('.docx'):
-        return extract_text_from_docx(file_path)
-    elif file_path.lower().endswith('.pdf'):
+        return extract_text_from_docx(file_path if data is None else io.BytesIO(data))
+    if data is None:
         return extract_text_from_pdf(file_path)
-    else:
-        raise ValueError(f"Unsupported file format: {file_path}")
+    return extract_text_from_pdf(data)
 
-def extract_text_from_docx(file_path: str) -> str:
+def extract_text_from_docx(file_path) -> str:
     """
     Extract text from a .docx file.
 
+    Uses the streaming extractor unless DOCX_ENGINE is set to "python-docx";
+    documents the streaming extractor can't read fall back to python-docx.
+
+    Args:
+        file_path: Path to the .docx file or a binary file object
+
+    Returns:
+        str: Extracted text
+    """
+    if DOCX_ENGINE == "fast":
+        try:
+            return extract_text_from_docx_fast(file_path)
+        except (zipfile.BadZipFile, KeyError, ET.ParseError, OSError):
+            if not isinstance(file_path, str):
+                file_path.seek(0)
+    return extract_text_from_docx_python_docx(file_path)
+
+def extract_text_from_docx_python_docx(file_path) -> str:
+    """
+    Extract text from a .docx file using the python-docx object model.
+
     Args:
-        file_path (str): Path to the .docx file
+        file_path: Path to the .docx file or a binary file object
 
     Returns:
         str: Extracted text
@@ -55,86 +144,491 @@ def extract_text_from_docx(file_path: str) -> str:
         print(f"Error extracting text from {file_path}: {e}")
         return ""
 
-def extract_text_from_pdf(file_path: str) -> str:
+_W = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+_MC_FALLBACK = '{http://schemas.openxmlformats.org/markup-compatibility/2006}Fallback'
+
+def extract_text_from_docx_fast(source) -> str:
+    """
+    Extract text from a .docx file by streaming word/document.xml out of the zip.
+
+    The XML is parsed incrementally, so no document object model is built.
+    Besides body paragraphs this also picks up table cells and text boxes,
+    one line per paragraph, with runs mapped the same way python-docx maps them.
+
+    Args:
+        source: Path to the .docx file or a binary file object
+
+    Returns:
+        str: Extracted text
+
+    Raises:
+        zipfile.BadZipFile, KeyError, ET.ParseError: If the file is not a readable .docx
+    """
+    lines = []
+    # Open paragraphs; text boxes nest paragraphs inside a run of the outer one
+    paragraphs = []
+    run_depth = 0
+    fallback_depth = 0
+
+    with zipfile.ZipFile(source) as archive, archive.open('word/document.xml') as xml_file:
+        for event, elem in ET.iterparse(xml_file, events=('start', 'end')):
+            tag = elem.tag
+            if event == 'start':
+                if tag == _W + 'p':
+                    paragraphs.append([])
+                elif tag == _W + 'r':
+                    run_depth += 1
+                elif tag == _MC_FALLBACK:
+                    # Alternate rendering of content already read from mc:Choice
+                    fallback_depth += 1
+                continue
+
+            if tag == _W + 'p':
+                parts = paragraphs.pop()
+                if not fallback_depth:
+                    lines.append(''.join(parts))
+                elem.clear()
+            elif tag == _W + 'r':
+                run_depth -= 1
+            elif tag == _MC_FALLBACK:
+                fallback_depth -= 1
+            elif fallback_depth or not run_depth or not paragraphs:
+                continue
+            elif tag == _W + 't':
+                paragraphs[-1].append(elem.text or '')
+            elif tag in (_W + 'tab', _W + 'ptab'):
+                paragraphs[-1].append('\t')
+            elif tag == _W + 'cr':
+                paragraphs[-1].append('\n')
+            elif tag == _W + 'br':
+                # Page and column breaks are not line breaks
+                if elem.get(_W + 'type', 'textWrapping') == 'textWrapping':
+                    paragraphs[-1].append('\n')
+            elif tag == _W + 'noBreakHyphen':
+                paragraphs[-1].append('-')
+
+    return "\n".join(lines)
+
+def extract_text_from_pdf(source, max_pages: int = None, max_chars: int = None) -> str:
     """
     Extract text from a PDF file using PyMuPDF (fitz).
 
+    Page texts are collected in a list and joined once. Reading stops early
+    once the page or character budget is reached, since pages past the first
+    few of a CV only add prompt tokens.
+
     Args:
-        file_path (str): Path to the PDF file
+        source: Path to the PDF file, or its contents as bytes, bytearray,
+            memoryview or mmap (so callers that already hold the file don't re-read it)
+        max_pages (int, optional): Maximum number of pages to read (defaults to PDF_MAX_PAGES)
+        max_chars (int, optional): Maximum number of characters to return (defaults to PDF_MAX_CHARS)
 
     Returns:
         str: Extracted text
     """
+    if max_pages is None:
+        max_pages = PDF_MAX_PAGES
+    if max_chars is None:
+        max_chars = PDF_MAX_CHARS
+    name = source if isinstance(source, str) else "<buffer>"
     try:
-        text = ""
-        with fitz.open(file_path) as doc:
-            for page in doc:
-                text += page.get_text()
-        return text
+        with _open_pdf(source) as doc:
+            pages = []
+            total_chars = 0
+            for page_number, page in enumerate(doc):
+                if max_pages is not None and page_number >= max_pages:
+                    break
+                page_text = page.get_text()
+                pages.append(page_text)
+                total_chars += len(page_text)
+                if max_chars is not None and total_chars >= max_chars:
+                    break
+        text = "".join(pages)
+        return text[:max_chars] if max_chars is not None else text
     except Exception as e:
-        print(f"Error extracting text from PDF {file_path}: {e}")
+        print(f"Error extracting text from PDF {name}: {e}")
         return ""
 
-def load_cvs(directory: str) -> Dict[str, str]:
+class _open_pdf:
+    """Context manager opening a PDF from a path or an in-memory / memory-mapped buffer."""
+
+    def __init__(self, source):
+        self.source = source
+        self.view = None
+        self.doc = None
+
+    def __enter__(self):
+        if isinstance(self.source, str):
+            self.doc = fitz.open(self.source)
+        else:
+            # PyMuPDF doesn't accept mmap objects directly, but takes a view of one
+            self.view = memoryview(self.source) if isinstance(self.source, mmap.mmap) else self.source
+            self.doc = fitz.open(stream=self.view, filetype="pdf")
+        return self.doc
+
+    def __exit__(self, *exc_info):
+        self.doc.close()
+        # Release the view so the caller can close its mmap
+        if isinstance(self.view, memoryview) and self.view is not self.source:
+            self.view.release()
+        return False
+
+class FileLoadResult(BaseModel):
+    """Timing and outcome of extracting a single document."""
+    doc_id: str
+    file_path: str
+    seconds: float
+    cached: bool = False
+    error: Optional[str] = None
+
+class LoadReport(BaseModel):
+    """Summary of a corpus load."""
+    files: List[FileLoadResult] = []
+    workers: int = 1
+    wall_seconds: float = 0.0
+
+    @property
+    def failures(self) -> List[FileLoadResult]:
+        return [f for f in self.files if f.error]
+
+    def summary(self, slowest: int = 5) -> str:
+        """
+        Format a short human readable summary of the load.
+
+        Args:
+            slowest (int): Number of slowest files to list
+
+        Returns:
+            str: Formatted summary
+        """
+        parsed = [f for f in self.files if not f.cached]
+        lines = [
+            f"Loaded {len(self.files)} documents in {self.wall_seconds:.2f}s "
+            f"({len(self.files) - len(parsed)} cached, {len(parsed)} parsed, {self.workers} workers)"
+        ]
+        for f in sorted(parsed, key=lambda f: f.seconds, reverse=True)[:slowest]:
+            lines.append(f"   {f.seconds:.3f}s  {os.path.basename(f.file_path)}")
+        for f in self.failures:
+            lines.append(f"   FAILED  {os.path.basename(f.file_path)}: {f.error}")
+        return '\n'.join(lines)
+
+def _cv_id_from_filename(filename: str) -> str:
+    """Derive the CV ID used as dictionary key from a CV filename."""
+    # Extract ID from filename (assuming naming convention like cv_1.docx or 1.pdf)
+    if filename.startswith('cv_') and filename.endswith('.docx'):
+        return filename.replace('cv_', '').replace('.docx', '')
+    elif filename.endswith('.pdf'):
+        # For PDF files without ID in filename, use the filename without extension
+        return filename.replace('.pdf', '')
+    return filename.replace('.docx', '')
+
+def _job_id_from_filename(filename: str) -> str:
+    """Derive the job ID used as dictionary key from a job description filename."""
+    if filename.startswith('job_description_') and filename.endswith('.docx'):
+        return filename.replace('job_description_', '').replace('.docx', '')
+    elif filename.endswith('.pdf'):
+        # For PDF files, use the filename without extension
+        return filename.replace('.pdf', '')
+    return filename.replace('.docx', '')
+
+def _cv_file_paths(directory: str) -> Dict[str, str]:
+    """Map CV IDs to file paths for every document in a CV directory."""
+    # If the directory is relative, make it absolute and include DataSet/cv/ directory
+    if not os.path.isabs(directory):
+        base_dir = get_base_dir()
+        directory = os.path.join(base_dir, "DataSet", "cv")
+    
+    manifest = get_manifest(directory)
+    file_names, _ = manifest.get_files()
+    return {_cv_id_from_filename(f): manifest.path(f) for f in file_names}
+
+def _job_file_paths(directory: str) -> Dict[str, str]:
+    """Map job IDs to file paths for every document in a job description directory."""
+    # If the directory is relative, make it absolute and include DataSet/job_descriptions/ directory
+    if not os.path.isabs(directory):
+        base_dir = get_base_dir()
+        directory = os.path.join(base_dir, "DataSet", "job_descriptions")
+    
+    manifest = get_manifest(directory)
+    file_names, _ = manifest.get_files()
+    return {_job_id_from_filename(f): manifest.path(f) for f in file_names}
+
+def _extract_timed(file_path: str) -> Tuple[str, float, Optional[str]]:
+    """Extract a document and measure how long it took (runs in worker processes)."""
+    start = time.perf_counter()
+    try:
+        text = extract_text(file_path)
+        error = None if text else "no text extracted"
+    except Exception as e:
+        text, error = "", str(e)
+    return text, time.perf_counter() - start, error
+
+def load_documents_parallel(file_paths: Dict[str, str], max_workers: int = None) -> Tuple[Dict[str, str], LoadReport]:
+    """
+    Extract many documents, fanning the parsing out across a process pool.
+
+    Files already in the text cache are served directly in this process;
+    only the remaining ones are sent to the workers.
+
+    Args:
+        file_paths (Dict[str, str]): Dictionary mapping document IDs to file paths
+        max_workers (int, optional): Number of worker processes (defaults to LOAD_WORKERS,
+            then os.cpu_count(); 1 disables the pool)
+
+    Returns:
+        Tuple[Dict[str, str], LoadReport]: Dictionary mapping IDs to text, and per-file timings
+    """
+    start = time.perf_counter()
+    if max_workers is None:
+        max_workers = LOAD_WORKERS or os.cpu_count() or 1
+
+    texts = {}
+    results = {}
+    pending = {}
+    cache = get_text_cache()
+    for doc_id, file_path in file_paths.items():
+        t0 = time.perf_counter()
+        text = _pack_lookup(file_path)
+        if text is None and cache is not None:
+            text = cache.peek(file_path, extraction_signature())
+        if text is not None:
+            texts[doc_id] = text
+            results[doc_id] = FileLoadResult(doc_id=doc_id, file_path=file_path,
+                                             seconds=time.perf_counter() - t0, cached=True)
+        else:
+            pending[doc_id] = file_path
+
+    workers = max(1, min(max_workers, len(pending)))
+    if workers == 1:
+        for doc_id, file_path in pending.items():
+            texts[doc_id], seconds, error = _extract_timed(file_path)
+            results[doc_id] = FileLoadResult(doc_id=doc_id, file_path=file_path, seconds=seconds, error=error)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(_extract_timed, path): doc_id for doc_id, path in pending.items()}
+            for future in as_completed(futures):
+                doc_id = futures[future]
+                file_path = pending[doc_id]
+                try:
+                    texts[doc_id], seconds, error = future.result()
+                except Exception as e:
+                    # The worker itself died (e.g. a crash inside the PDF library)
+                    texts[doc_id], seconds, error = "", 0.0, f"worker failed: {e}"
+                results[doc_id] = FileLoadResult(doc_id=doc_id, file_path=file_path, seconds=seconds, error=error)
+
+    # Keep the directory order of the input rather than completion order
+    texts = {doc_id: texts[doc_id] for doc_id in file_paths}
+    report = LoadReport(
+        files=[results[doc_id] for doc_id in file_paths],
+        workers=workers if pending else 0,
+        wall_seconds=time.perf_counter() - start
+    )
+    return texts, report
+
+def load_cvs(directory: str, max_workers: int = None) -> Dict[str, str]:
     """
     Load CVs from a directory.
 
     Args:
         directory (str): Directory containing CV files
+        max_workers (int, optional): Number of extraction processes (defaults to LOAD_WORKERS)
 
     Returns:
         Dict[str, str]: Dictionary mapping CV IDs to their content
     """
-    # If the directory is relative, make it absolute and include DataSet/cv/ directory
-    if not os.path.isabs(directory):
-        base_dir = get_base_dir()
-        directory = os.path.join(base_dir, "DataSet", "cv")
-    
-    cvs = {}
-    for filename in os.listdir(directory):
-        if filename.endswith(('.docx', '.pdf')):
-            file_path = os.path.join(directory, filename)
-            
-            # Extract ID from filename (assuming naming convention like cv_1.docx or 1.pdf)
-            if filename.startswith('cv_') and filename.endswith('.docx'):
-                cv_id = filename.replace('cv_', '').replace('.docx', '')
-            elif filename.endswith('.pdf'):
-                # For PDF files without ID in filename, use the filename without extension
-                cv_id = filename.replace('.pdf', '')
-            else:
-                cv_id = filename.replace('.docx', '')
-                
-            cvs[cv_id] = extract_text(file_path)
+    cvs, report = load_documents_parallel(_cv_file_paths(directory), max_workers)
+    print(report.summary())
     return cvs
 
-def load_job_descriptions(directory: str) -> Dict[str, str]:
+def load_job_descriptions(directory: str, max_workers: int = None) -> Dict[str, str]:
     """
     Load job descriptions from a directory.
 
     Args:
         directory (str): Directory containing job description files
+        max_workers (int, optional): Number of extraction processes (defaults to LOAD_WORKERS)
 
     Returns:
         Dict[str, str]: Dictionary mapping job IDs to their descriptions
     """
-    # If the directory is relative, make it absolute and include DataSet/job_descriptions/ directory
-    if not os.path.isabs(directory):
-        base_dir = get_base_dir()
-        directory = os.path.join(base_dir, "DataSet", "job_descriptions")
+    jobs, report = load_documents_parallel(_job_file_paths(directory), max_workers)
+    print(report.summary())
+    return jobs
+
+def iter_documents(file_paths: Dict[str, str]) -> Iterator[Tuple[str, str, Dict[str, Any]]]:
+    """
+    Lazily extract documents one at a time.
+
+    Only the document currently being consumed is held in memory, so callers
+    can start working on the first document before the rest are parsed.
+
+    Args:
+        file_paths (Dict[str, str]): Dictionary mapping document IDs to file paths
+
+    Yields:
+        Tuple[str, str, Dict[str, Any]]: Document ID, extracted text and metadata
+            (file_name, file_path, format, extract_seconds)
+    """
+    for doc_id, file_path in file_paths.items():
+        start = time.perf_counter()
+        text = extract_text(file_path)
+        metadata = {
+            'file_name': os.path.basename(file_path),
+            'file_path': file_path,
+            'format': os.path.splitext(file_path)[1].lstrip('.').lower(),
+            'extract_seconds': time.perf_counter() - start,
+        }
+        yield doc_id, text, metadata
+
+def iter_cvs(directory: str) -> Iterator[Tuple[str, str, Dict[str, Any]]]:
+    """
+    Stream CVs from a directory instead of loading them all up front.
+
+    Args:
+        directory (str): Directory containing CV files
+
+    Yields:
+        Tuple[str, str, Dict[str, Any]]: CV ID (same keys as load_cvs), content and metadata
+    """
+    return iter_documents(_cv_file_paths(directory))
+
+def iter_job_descriptions(directory: str) -> Iterator[Tuple[str, str, Dict[str, Any]]]:
+    """
+    Stream job descriptions from a directory instead of loading them all up front.
+
+    Args:
+        directory (str): Directory containing job description files
+
+    Yields:
+        Tuple[str, str, Dict[str, Any]]: Job ID (same keys as load_job_descriptions), content and metadata
+    """
+    return iter_documents(_job_file_paths(directory))
+
+_corpus_pack = None
+_corpus_pack_stat = None
+
+def get_corpus_pack() -> Optional[CorpusPack]:
+    """
+    Get the shared corpus pack, if one has been built with the current extraction settings.
+
+    The pack is opened (memory-mapped) once and reopened when it is rebuilt.
+
+    Returns:
+        Optional[CorpusPack]: The open pack, or None if disabled, missing or built with other settings
+    """
+    global _corpus_pack, _corpus_pack_stat
+    if not USE_CORPUS_PACK:
+        return None
+    pack_path = CORPUS_PACK_PATH
+    if not os.path.isabs(pack_path):
+        pack_path = os.path.join(get_base_dir(), pack_path)
+    try:
+        stat = os.stat(pack_path)
+    except OSError:
+        return None
+    
+    fingerprint = (stat.st_mtime_ns, stat.st_size)
+    if _corpus_pack is None or _corpus_pack_stat != fingerprint:
+        if _corpus_pack is not None:
+            _corpus_pack.close()
+            _corpus_pack = None
+        try:
+            pack = CorpusPack(pack_path)
+        except ValueError as e:
+            print(f"Ignoring corpus pack: {e}")
+            _corpus_pack_stat = fingerprint
+            return None
+        _corpus_pack, _corpus_pack_stat = pack, fingerprint
+    
+    if _corpus_pack.info.get('extraction') != extraction_signature():
+        return None
+    return _corpus_pack
+
+def _pack_lookup(file_path: str) -> Optional[str]:
+    """Return a document's text from the corpus pack if it is there and the file is unchanged."""
+    pack = get_corpus_pack()
+    if pack is None:
+        return None
+    
+    directory, filename = os.path.split(file_path)
+    if directory == pack.info.get('cv_dir'):
+        kind, doc_id = KIND_CV, _cv_id_from_filename(filename)
+    elif directory == pack.info.get('job_dir'):
+        kind, doc_id = KIND_JOB, _job_id_from_filename(filename)
+    else:
+        return None
+    
+    metadata = pack.get_metadata(kind, doc_id)
+    if metadata is None or metadata.get('file_name') != filename:
+        return None
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return None
+    if (stat.st_mtime_ns, stat.st_size) != (metadata.get('mtime_ns'), metadata.get('size')):
+        return None
+    return pack.get_text(kind, doc_id)
+
+def build_corpus_pack(output_path: str = None, cv_dir: str = CV_DIR, job_dir: str = JOB_DESCRIPTIONS_DIR,
+                      max_workers: int = None) -> str:
+    """
+    Extract every CV and job description and write them into a corpus pack.
+
+    Args:
+        output_path (str, optional): Where to write the pack (defaults to CORPUS_PACK_PATH)
+        cv_dir (str): Directory containing CV files
+        job_dir (str): Directory containing job description files
+        max_workers (int, optional): Number of extraction processes (defaults to LOAD_WORKERS)
+
+    Returns:
+        str: Path of the written pack
+    """
+    global _corpus_pack, _corpus_pack_stat
+    if output_path is None:
+        output_path = CORPUS_PACK_PATH
+    if not os.path.isabs(output_path):
+        output_path = os.path.join(get_base_dir(), output_path)
+    
+    cv_paths = _cv_file_paths(cv_dir)
+    job_paths = _job_file_paths(job_dir)
+    
+    documents = {}
+    for kind, file_paths in ((KIND_CV, cv_paths), (KIND_JOB, job_paths)):
+        texts, report = load_documents_parallel(file_paths, max_workers)
+        print(report.summary())
+        entries = []
+        for doc_id, file_path in file_paths.items():
+            stat = os.stat(file_path)
+            metadata = dict(parse_document_filename(os.path.basename(file_path)))
+            metadata.update({'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size})
+            entries.append((doc_id, texts[doc_id], metadata))
+        documents[kind] = entries
+    
+    info = {
+        'cv_dir': os.path.dirname(next(iter(cv_paths.values()))) if cv_paths else None,
+        'job_dir': os.path.dirname(next(iter(job_paths.values()))) if job_paths else None,
+        'extraction': extraction_signature(),
+        'created': time.time(),
+    }
+    
+    # Release our own mapping first; Windows can't replace a mapped file
+    if _corpus_pack is not None:
+        _corpus_pack.close()
+        _corpus_pack, _corpus_pack_stat = None, None
+    
+    count = write_corpus_pack(output_path, documents, info)
+    print(f"Wrote {count} documents to {output_path}")
+    return output_path
+
+if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Document processing utilities")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    pack_parser = subparsers.add_parser("pack", help="Build a packed corpus snapshot of all CVs and job descriptions")
+    pack_parser.add_argument("output", nargs="?", default=None, help=f"Output file (default: {CORPUS_PACK_PATH})")
+    pack_parser.add_argument("--workers", type=int, default=None, help="Number of extraction processes")
+    args = parser.parse_args()
     
-    jobs = {}
-    for filename in os.listdir(directory):
-        if filename.endswith(('.docx', '.pdf')):
-            file_path = os.path.join(directory, filename)
-            
-            # Extract ID from filename
-            if filename.startswith('job_description_') and filename.endswith('.docx'):
-                job_id = filename.replace('job_description_', '').replace('.docx', '')
-            elif filename.endswith('.pdf'):
-                # For PDF files, use the filename without extension
-                job_id = filename.replace('.pdf', '')
-            else:
-                job_id = filename.replace('.docx', '')
-                
-            jobs[job_id] = extract_text(file_path)
-    return jobs 
\ No newline at end of file
+    if args.command == "pack":
+        build_corpus_pack(args.output, max_workers=args.workers)
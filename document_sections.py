@@ -0,0 +1,209 @@
+"""
+Section segmentation of CVs and job descriptions.
+
+Extracted texts are split on their headings ("Technical Skills",
+"Required Qualifications:", ...) into typed sections. The result is stored in
+the text cache as a compact record of (type, heading, start, end) offsets into
+the text, so the matcher can send only the sections that matter for scoring
+instead of whole documents.
+"""
+import json
+import hashlib
+from typing import Iterable, List, Optional
+
+from pydantic import BaseModel
+
+from config import CV_PROMPT_SECTIONS, JOB_PROMPT_SECTIONS
+from text_cache import get_text_cache
+
+# Bump this whenever the headings or the splitting logic change
+SEGMENTER_VERSION = "1"
+
+HEADER = "header"
+
+# Section type -> heading phrases (compared case-insensitively, without a trailing colon)
+SECTION_HEADINGS = {
+    "summary": ("summary", "professional summary", "profile", "professional profile", "about me",
+                "objective", "career objective"),
+    "skills": ("technical skills", "professional skills", "skills", "core competencies", "key skills"),
+    "languages": ("foreign languages", "languages"),
+    "education": ("education", "academic background"),
+    "certifications": ("certifications", "certificates", "certifications and courses"),
+    "experience": ("project experience", "work experience", "professional experience", "experience",
+                   "employment history", "projects"),
+    "title": ("job title", "position", "role"),
+    "company": ("company overview", "about us", "about the company"),
+    "responsibilities": ("key responsibilities", "responsibilities", "what you will do"),
+    "requirements": ("required qualifications", "requirements", "qualifications", "required skills"),
+    "preferred": ("preferred skills", "preferred qualifications", "nice to have"),
+    "benefits": ("benefits", "what we offer", "perks"),
+}
+
+_HEADING_TYPES = {phrase: section_type for section_type, phrases in SECTION_HEADINGS.items() for phrase in phrases}
+
+class Section(BaseModel):
+    """One section of a document: its type, heading and body offsets in the text."""
+    type: str
+    heading: str
+    start: int
+    end: int
+
+class SegmentedDocument(BaseModel):
+    """Sections of a document, in document order."""
+    kind: Optional[str] = None
+    sections: List[Section] = []
+
+    def has_sections(self) -> bool:
+        """Whether any known heading was found."""
+        return any(section.type != HEADER for section in self.sections)
+
+    def types(self) -> List[str]:
+        """Section types present in the document, in document order."""
+        return [section.type for section in self.sections]
+
+    def get(self, text: str, section_type: str) -> str:
+        """
+        Get the body of every section of a type.
+
+        Args:
+            text (str): The text the document was segmented from
+            section_type (str): Section type, e.g. "skills"
+
+        Returns:
+            str: Section bodies joined by newlines ("" if the type is absent)
+        """
+        return "\n".join(text[s.start:s.end].strip() for s in self.sections if s.type == section_type)
+
+    def select(self, text: str, section_types: Iterable[str]) -> str:
+        """
+        Rebuild a text from the chosen sections only, keeping their headings and order.
+
+        Args:
+            text (str): The text the document was segmented from
+            section_types (Iterable[str]): Section types to keep
+
+        Returns:
+            str: Reduced text
+        """
+        wanted = set(section_types)
+        parts = []
+        for section in self.sections:
+            if section.type not in wanted:
+                continue
+            body = text[section.start:section.end].strip()
+            parts.append(f"{section.heading}\n{body}" if section.heading else body)
+        return "\n".join(part for part in parts if part)
+
+    def to_record(self) -> str:
+        """Serialize to the compact JSON record stored in the cache."""
+        return json.dumps([self.kind, [[s.type, s.heading, s.start, s.end] for s in self.sections]],
+                          ensure_ascii=False, separators=(",", ":"))
+
+    @classmethod
+    def from_record(cls, record: str) -> "SegmentedDocument":
+        """Deserialize a record produced by to_record."""
+        kind, sections = json.loads(record)
+        return cls(kind=kind, sections=[Section(type=t, heading=h, start=a, end=b) for t, h, a, b in sections])
+
+def heading_type(line: str) -> Optional[str]:
+    """
+    Classify a line as a section heading.
+
+    Args:
+        line (str): A line of text
+
+    Returns:
+        Optional[str]: Section type, or None if the line is not a known heading
+    """
+    phrase = line.strip().rstrip(":").strip().lower()
+    if not phrase or len(phrase) > 40:
+        return None
+    return _HEADING_TYPES.get(phrase)
+
+def segment_text(text: str, kind: str = None) -> SegmentedDocument:
+    """
+    Split a document text into typed sections.
+
+    Text before the first heading becomes a "header" section (e.g. the
+    candidate's name); every other line belongs to the section of the
+    heading above it.
+
+    Args:
+        text (str): Extracted document text
+        kind (str, optional): "cv" or "job"
+
+    Returns:
+        SegmentedDocument: Sections with body offsets into text
+    """
+    sections = []
+    current_type, current_heading, body_start = HEADER, "", 0
+    position = 0
+
+    def close(end):
+        if end > body_start or current_heading:
+            sections.append(Section(type=current_type, heading=current_heading, start=body_start, end=end))
+
+    for line in text.splitlines(keepends=True):
+        line_type = heading_type(line)
+        if line_type is not None:
+            close(position)
+            current_type, current_heading = line_type, line.strip()
+            body_start = position + len(line)
+        position += len(line)
+    close(len(text))
+
+    # Drop a whitespace-only header
+    sections = [s for s in sections if s.heading or text[s.start:s.end].strip()]
+    return SegmentedDocument(kind=kind, sections=sections)
+
+def get_sections(text: str, kind: str = None) -> SegmentedDocument:
+    """
+    Get the sections of a text, using the record stored in the text cache when possible.
+
+    Args:
+        text (str): Extracted document text
+        kind (str, optional): "cv" or "job"
+
+    Returns:
+        SegmentedDocument: Sections of the text
+    """
+    cache = get_text_cache()
+    if cache is None:
+        return segment_text(text, kind)
+
+    text_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    try:
+        record = cache.get_sections(text_hash, SEGMENTER_VERSION)
+        if record is not None:
+            document = SegmentedDocument.from_record(record)
+            document.kind = kind or document.kind
+            return document
+    except Exception as e:
+        print(f"Error reading section record: {e}")
+
+    document = segment_text(text, kind)
+    try:
+        cache.put_sections(text_hash, SEGMENTER_VERSION, document.to_record())
+    except Exception as e:
+        print(f"Error storing section record: {e}")
+    return document
+
+def prompt_text(text: str, kind: str) -> str:
+    """
+    Reduce a document to the sections used for scoring.
+
+    The sections kept are CV_PROMPT_SECTIONS or JOB_PROMPT_SECTIONS from config.
+    Documents without any recognised heading are returned unchanged.
+
+    Args:
+        text (str): Extracted document text
+        kind (str): "cv" or "job"
+
+    Returns:
+        str: Text made of the relevant sections only
+    """
+    document = get_sections(text, kind)
+    if not document.has_sections():
+        return text
+    reduced = document.select(text, CV_PROMPT_SECTIONS if kind == "cv" else JOB_PROMPT_SECTIONS)
+    return reduced or text
@@ -0,0 +1,525 @@
+"""
+HTTP transport for the Gemini REST API.
+
+One pooled requests.Session per transport keeps connections (and TLS
+sessions) alive between calls. Every request has explicit connect and read
+timeouts and goes through the shared rate limiter and the adaptive
+concurrency limit (see adaptive_concurrency.py). Failures are classified:
+timeouts, connection errors, 408, 429 and 5xx are retried with exponential
+backoff and full jitter (honouring Retry-After / RetryInfo when the server
+sends one), anything else raises GeminiAPIError straight away.
+
+Every call has an overall deadline (GEMINI_REQUEST_DEADLINE) that bounds its
+attempts, waits and retries together. A shared circuit breaker (see
+circuit_breaker.py) makes calls fail fast while the API keeps failing, and
+slow generateContent calls are hedged with a duplicate (see hedging.py).
+"""
+import re
+import json
+import time
+import random
+import threading
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from config import (
+    GEMINI_API_BASE_URL,
+    GEMINI_MODEL,
+    GEMINI_CONNECT_TIMEOUT,
+    GEMINI_READ_TIMEOUT,
+    GEMINI_MAX_RETRIES,
+    GEMINI_BACKOFF_BASE,
+    GEMINI_BACKOFF_MAX,
+    GEMINI_REQUEST_DEADLINE,
+    GEMINI_HEDGE_ENABLED,
+    MAX_CONCURRENT_REQUESTS
+)
+from rate_limiter import RateLimiter, get_rate_limiter
+from adaptive_concurrency import (
+    AdaptiveConcurrencyLimiter,
+    get_concurrency_limiter,
+    outcome_for_status,
+    OK,
+    OVERLOADED,
+    ERROR
+)
+from circuit_breaker import CircuitBreaker, get_circuit_breaker
+from hedging import HedgeCancelled, Hedger
+
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+class GeminiAPIError(Exception):
+    """Error returned by (or while reaching) the Gemini API."""
+
+    def __init__(self, message: str, status_code: Optional[int] = None, retryable: bool = False,
+                 retry_after: Optional[float] = None):
+        """
+        Initialize the error.
+
+        Args:
+            message (str): Description of the error
+            status_code (int, optional): HTTP status code, None for network errors
+            retryable (bool): Whether sending the same request again may succeed
+            retry_after (float, optional): Seconds the server asked us to wait
+        """
+        super().__init__(message)
+        self.status_code = status_code
+        self.retryable = retryable
+        self.retry_after = retry_after
+
+def _parse_seconds(value: Any) -> Optional[float]:
+    """Parse "12", "12.5" or "12s" into seconds."""
+    if value is None:
+        return None
+    match = re.match(r"^\s*(\d+(?:\.\d+)?)\s*s?\s*$", str(value))
+    return float(match.group(1)) if match else None
+
+def retry_after_seconds(response: requests.Response) -> Optional[float]:
+    """
+    Get the delay the server asked for, from the Retry-After header or a google.rpc.RetryInfo detail.
+
+    Args:
+        response (requests.Response): Error response
+
+    Returns:
+        Optional[float]: Seconds to wait, or None if the server did not say
+    """
+    delay = _parse_seconds(response.headers.get("Retry-After"))
+    if delay is not None:
+        return delay
+    try:
+        details = response.json().get("error", {}).get("details", [])
+    except ValueError:
+        return None
+    for detail in details:
+        if isinstance(detail, dict) and "retryDelay" in detail:
+            return _parse_seconds(detail["retryDelay"])
+    return None
+
+def classify_response(response: requests.Response) -> GeminiAPIError:
+    """
+    Turn an unsuccessful response into a GeminiAPIError.
+
+    Args:
+        response (requests.Response): Response with a non-200 status
+
+    Returns:
+        GeminiAPIError: Error marked retryable for 408, 429 and 5xx
+    """
+    status = response.status_code
+    return GeminiAPIError(
+        f"Gemini API error: {status} - {response.text[:500]}",
+        status_code=status,
+        retryable=status in RETRYABLE_STATUS_CODES,
+        retry_after=retry_after_seconds(response)
+    )
+
+# Bodies cut short or garbled in transit ("Connection broken: IncompleteRead") are worth another attempt
+TRANSIENT_REQUEST_EXCEPTIONS = (requests.exceptions.ChunkedEncodingError, requests.exceptions.ContentDecodingError)
+
+def classify_exception(error: requests.exceptions.RequestException) -> GeminiAPIError:
+    """
+    Turn a requests exception other than a timeout or connection error into a GeminiAPIError.
+
+    Args:
+        error (requests.exceptions.RequestException): Exception raised while sending or reading a request
+
+    Returns:
+        GeminiAPIError: Error marked retryable for broken or undecodable response bodies
+            (other errors, e.g. too many redirects, are fatal)
+    """
+    return GeminiAPIError(f"Gemini API request failed: {error}",
+                          retryable=isinstance(error, TRANSIENT_REQUEST_EXCEPTIONS))
+
+def _healthy(status_code: int) -> Optional[bool]:
+    """Circuit breaker outcome of a response: 429s say nothing about the service's health."""
+    if status_code == 429:
+        return None
+    return status_code not in RETRYABLE_STATUS_CODES
+
+def response_text(response_json: Dict[str, Any]) -> str:
+    """
+    Get the generated text from a generateContent response.
+
+    Args:
+        response_json (Dict[str, Any]): Decoded response
+
+    Returns:
+        str: Text of the first candidate
+
+    Raises:
+        GeminiAPIError: If the response has no text (e.g. the prompt was blocked)
+    """
+    try:
+        return "".join(part.get("text", "") for part in response_json["candidates"][0]["content"]["parts"])
+    except (KeyError, IndexError, TypeError):
+        raise GeminiAPIError(f"Unexpected Gemini API response format: {response_json}")
+
+class GeminiTransport:
+    """Pooled, retrying client for the Gemini generateContent and streamGenerateContent endpoints."""
+
+    def __init__(self, api_key: str, model: str = GEMINI_MODEL, base_url: str = GEMINI_API_BASE_URL,
+                 rate_limiter: RateLimiter = None, connect_timeout: float = GEMINI_CONNECT_TIMEOUT,
+                 read_timeout: float = GEMINI_READ_TIMEOUT, max_retries: int = GEMINI_MAX_RETRIES,
+                 backoff_base: float = GEMINI_BACKOFF_BASE, backoff_max: float = GEMINI_BACKOFF_MAX,
+                 pool_size: int = None, concurrency_limiter: AdaptiveConcurrencyLimiter = None,
+                 deadline: Optional[float] = GEMINI_REQUEST_DEADLINE, circuit_breaker: CircuitBreaker = None,
+                 hedger: Hedger = None):
+        """
+        Initialize the transport.
+
+        Args:
+            api_key (str): Gemini API key (sent as a header, not in the URL)
+            model (str): Model name
+            base_url (str): API root, e.g. https://generativelanguage.googleapis.com/v1beta
+            rate_limiter (RateLimiter, optional): Limiter every attempt waits on (default: the shared one)
+            connect_timeout (float): Seconds to wait for a connection
+            read_timeout (float): Seconds to wait for the response
+            max_retries (int): Retries after the first attempt for retryable errors
+            backoff_base (float): First backoff ceiling in seconds (doubles per retry)
+            backoff_max (float): Upper bound of a single backoff
+            pool_size (int, optional): Kept-alive connections (default: twice the maximum concurrency)
+            concurrency_limiter (AdaptiveConcurrencyLimiter, optional): Limit on requests in flight
+                (default: the shared one; none if ADAPTIVE_CONCURRENCY_ENABLED is False)
+            deadline (float, optional): Overall seconds per call, retries included (None: no limit)
+            circuit_breaker (CircuitBreaker, optional): Breaker every attempt goes through
+                (default: the shared one; none if CIRCUIT_BREAKER_ENABLED is False)
+            hedger (Hedger, optional): Hedging of generateContent calls
+                (default: a new one; none if GEMINI_HEDGE_ENABLED is False)
+        """
+        self.api_key = api_key
+        self.model = model
+        self.base_url = base_url.rstrip("/")
+        self.rate_limiter = rate_limiter or get_rate_limiter()
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.retries = 0
+        self.concurrency_limiter = (concurrency_limiter if concurrency_limiter is not None
+                                    else get_concurrency_limiter())
+        self.deadline = deadline
+        self.circuit_breaker = circuit_breaker if circuit_breaker is not None else get_circuit_breaker()
+        self.hedger = hedger if hedger is not None else (Hedger() if GEMINI_HEDGE_ENABLED else None)
+
+        max_in_flight = MAX_CONCURRENT_REQUESTS
+        if self.concurrency_limiter is not None:
+            max_in_flight = max(max_in_flight, self.concurrency_limiter.max_limit)
+        pool_size = pool_size or max(2, 2 * max_in_flight)
+        self.session = requests.Session()
+        # Retries are handled here (they need the rate limiter), not by urllib3
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({
+            'Content-Type': 'application/json',
+            'x-goog-api-key': api_key
+        })
+        self._stats_lock = threading.Lock()
+
+    def url(self, method: str = "generateContent") -> str:
+        """URL of a model method, e.g. generateContent."""
+        return f"{self.base_url}/models/{self.model}:{method}"
+
+    def backoff(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """
+        Delay before retry number `attempt` (0-based).
+
+        Args:
+            attempt (int): Number of retries already made
+            retry_after (float, optional): Delay requested by the server
+
+        Returns:
+            float: Seconds to wait; full jitter, or the server's delay plus up to a second of jitter
+        """
+        if retry_after is not None:
+            return retry_after + random.uniform(0, 1.0)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def post(self, method: str, payload: Dict[str, Any], deadline: Optional[float] = None) -> Dict[str, Any]:
+        """
+        POST a JSON payload to a model method, retrying transient failures.
+
+        Args:
+            method (str): Model method, e.g. "generateContent"
+            payload (Dict[str, Any]): Request body
+            deadline (float, optional): time.monotonic() by which the call must be done
+                (default: GEMINI_REQUEST_DEADLINE from now)
+
+        Returns:
+            Dict[str, Any]: Decoded JSON response
+
+        Raises:
+            GeminiAPIError: On a non-retryable error, when retries are exhausted or the deadline passes
+            CircuitOpenError: While the circuit breaker is open
+        """
+        return self.request("POST", self.url(method), payload, deadline=deadline)
+
+    def request(self, http_method: str, url: str, payload: Optional[Dict[str, Any]] = None,
+                params: Optional[Dict[str, str]] = None, deadline: Optional[float] = None,
+                token_taken: bool = False, on_send: Optional[Callable[[], bool]] = None) -> Dict[str, Any]:
+        """
+        Send a request to any API URL (e.g. a cachedContents resource), retrying transient failures.
+
+        Args:
+            http_method (str): "GET", "POST", "PATCH" or "DELETE"
+            url (str): Full URL
+            payload (Dict[str, Any], optional): JSON body
+            params (Dict[str, str], optional): Query parameters
+            deadline (float, optional): time.monotonic() by which the call must be done
+                (default: GEMINI_REQUEST_DEADLINE from now)
+            token_taken (bool): The caller already took the rate limiter token for the first attempt
+            on_send (Callable[[], bool], optional): Called right before each attempt is sent (after the
+                rate limit and concurrency waits); False cancels the call (see Hedger.call)
+
+        Returns:
+            Dict[str, Any]: Decoded JSON response ({} for an empty body)
+
+        Raises:
+            GeminiAPIError: On a non-retryable error, when retries are exhausted or the deadline passes
+            CircuitOpenError: While the circuit breaker is open
+            HedgeCancelled: If on_send returned False
+        """
+        deadline = deadline if deadline is not None else self._deadline()
+        attempt = 0
+        while True:
+            probe = self._allow_attempt()
+            healthy = None
+            try:
+                if not (token_taken and attempt == 0):
+                    self._wait_for_rate_limit(deadline)
+                started = self._acquire_slot()
+                outcome = ERROR
+                try:
+                    if on_send is not None and not on_send():
+                        raise HedgeCancelled("Not sent: the other hedged call already answered")
+                    response = self.session.request(http_method, url, json=payload, params=params,
+                                                    timeout=self._attempt_timeout(deadline))
+                    outcome = outcome_for_status(response.status_code)
+                    healthy = _healthy(response.status_code)
+                    if response.status_code == 200:
+                        if not response.content:
+                            return {}
+                        try:
+                            return response.json()
+                        except ValueError:
+                            healthy = False
+                            raise GeminiAPIError(f"Invalid JSON from Gemini API: {response.text[:200]}",
+                                                 status_code=200, retryable=True)
+                    error = classify_response(response)
+                except requests.exceptions.Timeout as e:
+                    outcome = OVERLOADED
+                    healthy = False
+                    error = GeminiAPIError(f"Gemini API timeout: {e}", retryable=True)
+                except requests.exceptions.ConnectionError as e:
+                    healthy = False
+                    error = GeminiAPIError(f"Could not reach Gemini API: {e}", retryable=True)
+                except requests.exceptions.RequestException as e:
+                    healthy = False
+                    error = classify_exception(e)
+                except GeminiAPIError as e:
+                    error = e
+                finally:
+                    self._release_slot(started, outcome)
+            finally:
+                self._record_attempt(healthy, probe)
+
+            self._wait_to_retry(error, attempt, deadline)
+            attempt += 1
+
+    def _deadline(self) -> Optional[float]:
+        """time.monotonic() by which a call starting now must be done (None without a deadline)."""
+        return time.monotonic() + self.deadline if self.deadline is not None else None
+
+    def _deadline_error(self, reason: str) -> GeminiAPIError:
+        return GeminiAPIError(f"Gemini API call exceeded its {self.deadline:g}s deadline ({reason})")
+
+    def _wait_for_rate_limit(self, deadline: Optional[float]):
+        """Take a rate limiter token, giving up at the deadline."""
+        timeout = max(0.0, deadline - time.monotonic()) if deadline is not None else None
+        if not self.rate_limiter.acquire(timeout=timeout):
+            raise self._deadline_error("waiting for the rate limit")
+
+    def _attempt_timeout(self, deadline: Optional[float]) -> Tuple[float, float]:
+        """Connect and read timeouts of an attempt, cut short so it ends by the deadline."""
+        if deadline is None:
+            return self.timeout
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise self._deadline_error("no time left for another attempt")
+        return min(self.timeout[0], remaining), min(self.timeout[1], remaining)
+
+    def _allow_attempt(self) -> Optional[int]:
+        """Fail fast with CircuitOpenError while the circuit breaker is open; returns the probe token, if any."""
+        if self.circuit_breaker is not None:
+            return self.circuit_breaker.allow()
+        return None
+
+    def _record_attempt(self, healthy: Optional[bool], probe: Optional[int] = None):
+        """Report an attempt's outcome (and its probe token) to the circuit breaker."""
+        if self.circuit_breaker is not None:
+            self.circuit_breaker.record(healthy, probe)
+
+    def _acquire_slot(self) -> Optional[float]:
+        """Wait for the concurrency limiter (if any); returns the start time for _release_slot."""
+        if self.concurrency_limiter is None:
+            return None
+        return self.concurrency_limiter.acquire()
+
+    def _release_slot(self, started: Optional[float], outcome: str, latency: Optional[float] = None):
+        """Return a slot taken by _acquire_slot, reporting how the attempt went."""
+        if started is not None:
+            self.concurrency_limiter.release(started, outcome, latency)
+
+    def _wait_to_retry(self, error: GeminiAPIError, attempt: int, deadline: Optional[float] = None):
+        """Sleep before retrying a failed attempt, or raise the error if it cannot be retried (in time)."""
+        if not error.retryable or attempt >= self.max_retries:
+            raise error
+
+        delay = self.backoff(attempt, error.retry_after)
+        if deadline is not None and time.monotonic() + delay >= deadline:
+            raise GeminiAPIError(f"{error} (not retried: the {self.deadline:g}s deadline would pass)",
+                                 status_code=error.status_code, retry_after=error.retry_after)
+        if error.status_code == 429:
+            # Quota exhausted: hold back every caller sharing the limiter, not just this one
+            self.rate_limiter.penalize(delay)
+        print(f"{error} - retrying in {delay:.1f}s (attempt {attempt + 2}/{self.max_retries + 1})")
+        with self._stats_lock:
+            self.retries += 1
+        time.sleep(delay)
+
+    def stream(self, method: str, payload: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        """
+        POST to a streaming model method (server-sent events) and yield the response chunks.
+
+        Failures before the response starts are retried like post(); once chunks
+        have been yielded the request is not repeated.
+
+        Args:
+            method (str): Model method, e.g. "streamGenerateContent"
+            payload (Dict[str, Any]): Request body
+
+        Yields:
+            Dict[str, Any]: Decoded chunks as they arrive
+
+        Raises:
+            GeminiAPIError: On a non-retryable error, when retries are exhausted, or if the stream breaks off
+        """
+        # The deadline covers getting the stream started; a running stream is bounded by the read timeout
+        deadline = self._deadline()
+        attempt = 0
+        while True:
+            probe = self._allow_attempt()
+            healthy = None
+            try:
+                self._wait_for_rate_limit(deadline)
+                started = self._acquire_slot()
+                outcome = ERROR
+                streaming = False
+                try:
+                    response = self.session.post(self.url(method), json=payload, params={"alt": "sse"},
+                                                 timeout=self._attempt_timeout(deadline), stream=True)
+                    healthy = _healthy(response.status_code)
+                    if response.status_code == 200:
+                        streaming = True
+                        break
+                    outcome = outcome_for_status(response.status_code)
+                    error = classify_response(response)
+                    response.close()
+                except requests.exceptions.Timeout as e:
+                    outcome = OVERLOADED
+                    healthy = False
+                    error = GeminiAPIError(f"Gemini API timeout: {e}", retryable=True)
+                except requests.exceptions.ConnectionError as e:
+                    healthy = False
+                    error = GeminiAPIError(f"Could not reach Gemini API: {e}", retryable=True)
+                except requests.exceptions.RequestException as e:
+                    healthy = False
+                    error = classify_exception(e)
+                finally:
+                    # Whatever went wrong before the stream started, the slot must not leak
+                    if not streaming:
+                        self._release_slot(started, outcome)
+            finally:
+                self._record_attempt(healthy, probe)
+
+            self._wait_to_retry(error, attempt, deadline)
+            attempt += 1
+
+        # The slot is held while the stream runs; the latency reported is the time to the response headers
+        latency = time.monotonic() - started if started is not None else None
+        # Events are UTF-8 JSON; without a charset requests would assume ISO-8859-1
+        response.encoding = "utf-8"
+        with response:
+            try:
+                # chunk_size=None hands over each chunk as it arrives instead of filling a buffer
+                for line in response.iter_lines(chunk_size=None, decode_unicode=True):
+                    if not line or not line.startswith("data:"):
+                        continue
+                    try:
+                        yield json.loads(line[5:])
+                    except ValueError:
+                        raise GeminiAPIError(f"Invalid JSON in Gemini API stream: {line[:200]}")
+            except requests.exceptions.RequestException as e:
+                raise GeminiAPIError(f"Gemini API stream interrupted: {e}")
+            finally:
+                self._release_slot(started, OK, latency)
+
+    def stream_generate_content(self, payload: Dict[str, Any],
+                                on_usage: Callable[[Dict[str, Any]], None] = None) -> Iterator[str]:
+        """
+        Call streamGenerateContent.
+
+        Args:
+            payload (Dict[str, Any]): Request body (same as for generateContent)
+            on_usage (Callable[[Dict[str, Any]], None], optional): Called with the usageMetadata of
+                the last chunk once the stream ends
+
+        Yields:
+            str: Text of each response chunk, in order
+        """
+        usage_metadata = None
+        for chunk in self.stream("streamGenerateContent", payload):
+            # Every chunk carries the running totals; the last one has the final counts
+            usage_metadata = chunk.get("usageMetadata", usage_metadata)
+            candidates = chunk.get("candidates")
+            if not candidates:
+                block_reason = chunk.get("promptFeedback", {}).get("blockReason")
+                if block_reason:
+                    raise GeminiAPIError(f"Prompt blocked by the Gemini API: {block_reason}")
+                continue  # e.g. a final chunk with only usage metadata
+            text = "".join(part.get("text", "") for part in candidates[0].get("content", {}).get("parts", []))
+            if text:
+                yield text
+        if usage_metadata is not None and on_usage is not None:
+            on_usage(usage_metadata)
+
+    def generate_content(self, payload: Dict[str, Any],
+                         on_discard: Callable[[Dict[str, Any]], None] = None) -> Dict[str, Any]:
+        """
+        Call generateContent, sending a duplicate if the answer is unusually slow (see hedging.py).
+
+        Args:
+            payload (Dict[str, Any]): Request body (contents, generationConfig, ...)
+            on_discard (Callable[[Dict[str, Any]], None], optional): Called with the response of the
+                slower of a hedged pair if it succeeds too (its tokens are billed all the same)
+
+        Returns:
+            Dict[str, Any]: Decoded response (the first of the original and the duplicate)
+        """
+        if self.hedger is None:
+            return self.post("generateContent", payload)
+        # The duplicate shares the original's deadline, and is only sent if the rate limit has room now
+        deadline = self._deadline()
+        return self.hedger.call(
+            lambda duplicate, on_send: self.request("POST", self.url("generateContent"), payload,
+                                                    deadline=deadline, token_taken=duplicate, on_send=on_send),
+            can_hedge=lambda: self.rate_limiter.try_acquire()[0],
+            on_discard=on_discard
+        )
+
+    def close(self):
+        """Close the pooled connections."""
+        self.session.close()
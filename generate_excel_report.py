@@ -5,29 +5,34 @@ import gc
 import time
 from tqdm import tqdm
 from document_processor import extract_text, load_cvs, load_job_descriptions
+from document_manifest import get_manifest
 from matcher import CVJobMatcher
-from config import GEMINI_API_KEY, CV_DIR, JOB_DESCRIPTIONS_DIR, OUTPUT_DIR
+from result_cache import hash_text
+from usage_meter import BudgetExceededError
+from batch_jobs import BatchRunner
+from config import GEMINI_API_KEY, SCORING_BACKEND, CV_DIR, JOB_DESCRIPTIONS_DIR, OUTPUT_DIR
 from openpyxl import Workbook
 from openpyxl.styles import Font, Alignment, PatternFill
 from matching_algorithm import match_cv_to_job_description
 
-def generate_excel_report(cv_sample_size=None, job_sample_size=None):
+def generate_excel_report(cv_sample_size=None, job_sample_size=None, batch=False):
     """
     Generate an Excel report of CV-Job matches.
     
     Args:
         cv_sample_size (int, optional): Number of CVs to use (for testing with smaller dataset)
         job_sample_size (int, optional): Number of jobs to use (for testing with smaller dataset)
+        batch (bool): Score the pending pairs offline through the Batch API first
     """
     start_time = time.time()
     try:
         # Check if API key is provided
-        if not GEMINI_API_KEY:
+        if SCORING_BACKEND == "gemini" and not GEMINI_API_KEY:
             print("Error: GEMINI_API_KEY is not set.")
             print("Please set your API key in the config.py file or as an environment variable.")
             sys.exit(1)
         
-        print("Using Gemini API")
+        print(f"Using scoring backend: {SCORING_BACKEND}")
         
         print("=" * 80)
         print("Generating Excel Report for CV-Job Matching")
@@ -42,8 +47,10 @@ def generate_excel_report(cv_sample_size=None, job_sample_size=None):
         
         # Load the CVs and job descriptions
         print("Loading CVs and job descriptions...")
-        cv_files = [f for f in os.listdir(cv_dir) if f.endswith(('.docx', '.pdf'))]
-        job_files = [f for f in os.listdir(job_dir) if f.endswith(('.docx', '.pdf'))]
+        cv_manifest = get_manifest(cv_dir)
+        job_manifest = get_manifest(job_dir)
+        cv_files, _ = cv_manifest.get_files()
+        job_files, _ = job_manifest.get_files()
         
         # If sample sizes are specified, limit the number of files
         if cv_sample_size is not None:
@@ -62,22 +69,22 @@ def generate_excel_report(cv_sample_size=None, job_sample_size=None):
         # Create a DataFrame to store the results
         results = []
         
-        # Create a lookup to convert file names to more readable names
-        cv_names = {}
-        for f in cv_files:
-            if f.endswith('.docx'):
-                cv_names[f] = f.replace('cv_', '').replace('.docx', '')
-            else:
-                # For PDF files, just use the filename without extension
-                cv_names[f] = f.replace('.pdf', '')
-        
-        job_names = {}
-        for f in job_files:
-            if f.endswith('.docx'):
-                job_names[f] = f.replace('job_description_', '').replace('.docx', '')
-            else:
-                # For PDF files, just use the filename without extension
-                job_names[f] = f.replace('.pdf', '')
+        # Create a lookup to convert file names to more readable names ("ID_Name", or the bare name)
+        cv_names = {f: _report_name(cv_manifest.entry(f)) for f in cv_files}
+        job_names = {f: _report_name(job_manifest.entry(f)) for f in job_files}
+        
+        # Extract the CVs once; every job is scored against the same texts
+        cv_contents = [extract_text(cv_manifest.path(f)) for f in cv_files]
+        for cv_file, cv_content in zip(cv_files, cv_contents):
+            # Token usage is reported per job and per CV under the report names
+            matcher.usage_meter.label("cv", hash_text(cv_content), cv_names[cv_file])
+        
+        if batch:
+            # Score everything not yet in the result cache as batch jobs; the loop below then reads the cache
+            print("Submitting pending pairs to the Batch API...")
+            job_texts = [extract_text(job_manifest.path(f)) for f in job_files]
+            BatchRunner(matcher).run((cv, job) for job in job_texts for cv in cv_contents)
+            del job_texts
         
         # Calculate total number of matches
         total_matches = len(cv_files) * len(job_files)
@@ -86,40 +93,30 @@ def generate_excel_report(cv_sample_size=None, job_sample_size=None):
         # Create progress bar
         progress = tqdm(total=total_matches, desc="Matching CVs with Jobs")
         
-        # Track API calls for rate limiting
-        api_call_count = 0
-        
-        # For each CV and job description, calculate the match
+        # Score each job against all CVs at once, so the pairs go out in batched requests
+        budget_error = None
         for job_file in job_files:
-            job_path = os.path.join(job_dir, job_file)
+            job_path = job_manifest.path(job_file)
             job_content = extract_text(job_path)
+            matcher.usage_meter.label("job", hash_text(job_content), job_names[job_file])
             
-            for cv_file in cv_files:
-                # Check if we need to pause for rate limiting (after 15 API calls)
-                if api_call_count >= 15:
-                    print("\n=== RATE LIMIT REACHED ===")
-                    print("Pausing for 60 seconds to avoid API rate limiting...")
-                    for remaining in range(60, 0, -1):
-                        sys.stdout.write(f"\rResuming in {remaining} seconds...")
-                        sys.stdout.flush()
-                        time.sleep(1)
-                    print("\nResuming processing...")
-                    # Reset the counter after the pause
-                    api_call_count = 0
-                
-                cv_path = os.path.join(cv_dir, cv_file)
-                cv_content = extract_text(cv_path)
-                
-                # Match CV with job description
-                result = matcher.match(cv_content, job_content)
-                
-                # Increment API call counter after successful call
-                api_call_count += 1
-                
-                # Store the result
+            # Results arrive out of order; the ones finished before the budget ran out are kept
+            job_results = {}
+            def on_result(index, result):
+                job_results[index] = result
+                progress.update(1)
+            
+            try:
+                matcher.match_job_to_cvs(job_content, cv_contents, on_result=on_result)
+            except BudgetExceededError as e:
+                budget_error = e
+            
+            # Store the results
+            for index in sorted(job_results):
+                result = job_results[index]
                 results.append({
-                    'CV': cv_names[cv_file],
-                    'CV_File': cv_file,
+                    'CV': cv_names[cv_files[index]],
+                    'CV_File': cv_files[index],
                     'Job': job_names[job_file],
                     'Job_File': job_file,
                     'Industry_Score': result.industry_knowledge_score,
@@ -128,13 +125,17 @@ def generate_excel_report(cv_sample_size=None, job_sample_size=None):
                     'Total_Score': result.total_score,
                     'Reasoning': result.reasoning[:500]  # Limit reasoning length to avoid Excel issues
                 })
-                
-                # Update progress bar
-                progress.update(1)
+            
+            if budget_error is not None:
+                break
         
         # Close progress bar
         progress.close()
         
+        if budget_error is not None:
+            print(f"Stopped matching: usage {budget_error}. Scored pairs are kept in the result cache.")
+            if not results:
+                raise budget_error
         print(f"Total results collected: {len(results)}")
         
         # Convert to DataFrame
@@ -202,6 +203,11 @@ def generate_excel_report(cv_sample_size=None, job_sample_size=None):
         print("4. Top5_CVs_Per_Job: The top 5 CVs for each job")
         print("\nScores are provided in both decimal (0-1) and percentage (0-100%) formats.")
         
+        # Save the token usage and cost of this run next to the report
+        print(matcher.usage_meter.summary())
+        usage_file = matcher.usage_meter.write_summary(os.path.join(output_dir, "usage_summary.json"))
+        print(f"Usage summary saved to '{usage_file}'.")
+        
         # Calculate and display total execution time
         end_time = time.time()
         total_time = end_time - start_time
@@ -216,12 +222,18 @@ def generate_excel_report(cv_sample_size=None, job_sample_size=None):
         # Force garbage collection to clean up resources
         gc.collect()
 
+def _report_name(entry):
+    """Name used for a document in the report: "ID_Name" for standard filenames, otherwise the bare name."""
+    return f"{entry['file_id']}_{entry['name']}" if entry['file_id'] else entry['name']
+
 def generate_excel_report_from_processed_data():
     """Generate an Excel report from processed matching data."""
     try:
         # Get list of CVs and job descriptions from directories
-        cv_files = [f for f in os.listdir(CV_DIR) if f.endswith(('.docx', '.pdf'))]
-        job_files = [f for f in os.listdir(JOB_DESCRIPTIONS_DIR) if f.endswith(('.docx', '.pdf'))]
+        cv_manifest = get_manifest(CV_DIR)
+        job_manifest = get_manifest(JOB_DESCRIPTIONS_DIR)
+        cv_files, _ = cv_manifest.get_files()
+        job_files, _ = job_manifest.get_files()
         
         # Create arrays to hold data
         data = []
@@ -229,45 +241,19 @@ def generate_excel_report_from_processed_data():
         # Process each CV and job description pair
         for cv_file in cv_files:
             # Create readable name for CV
-            if cv_file.endswith('.docx'):
-                cv_name = ''.join(cv_file.split('')[2:]).replace('.docx', '')
-                cv_id = cv_file.split('_')[1]
-            elif cv_file.endswith('.pdf'):
-                # For PDF files, handle name extraction differently
-                if cv_file.startswith('cv_'):
-                    parts = cv_file.split('_')
-                    if len(parts) >= 3:
-                        cv_id = parts[1]
-                        cv_name = '_'.join(parts[2:]).replace('.pdf', '')
-                    else:
-                        cv_id = parts[1].replace('.pdf', '')
-                        cv_name = "Unnamed"
-                else:
-                    cv_id = "N/A"
-                    cv_name = cv_file.replace('.pdf', '')
+            cv_entry = cv_manifest.entry(cv_file)
+            cv_id = cv_entry['file_id'] or "N/A"
+            cv_name = cv_entry['name']
             
             for job_file in job_files:
                 # Create readable name for job description
-                if job_file.endswith('.docx'):
-                    job_title = ''.join(job_file.split('')[3:]).replace('.docx', '')
-                    job_id = job_file.split('_')[2]
-                elif job_file.endswith('.pdf'):
-                    # For PDF files, handle job title extraction differently
-                    if job_file.startswith('job_description_'):
-                        parts = job_file.split('_')
-                        if len(parts) >= 4:
-                            job_id = parts[2]
-                            job_title = '_'.join(parts[3:]).replace('.pdf', '')
-                        else:
-                            job_id = parts[2].replace('.pdf', '')
-                            job_title = "Untitled"
-                    else:
-                        job_id = "N/A"
-                        job_title = job_file.replace('.pdf', '')
+                job_entry = job_manifest.entry(job_file)
+                job_id = job_entry['file_id'] or "N/A"
+                job_title = job_entry['name']
                 
                 # Get match results
-                cv_path = os.path.join(CV_DIR, cv_file)
-                job_path = os.path.join(JOB_DESCRIPTIONS_DIR, job_file)
+                cv_path = cv_manifest.path(cv_file)
+                job_path = job_manifest.path(job_file)
                 score, skills_match = match_cv_to_job_description(cv_path, job_path)
                 
                 # Add to data array
@@ -342,13 +328,16 @@ if __name__ == "_main_":
         cv_sample_size = None
         job_sample_size = None
         
-        if len(sys.argv) > 1:
-            if sys.argv[1].isdigit():
-                cv_sample_size = int(sys.argv[1])
-            if len(sys.argv) > 2 and sys.argv[2].isdigit():
-                job_sample_size = int(sys.argv[2])
+        # --batch scores the pending pairs through the Batch API first
+        batch = "--batch" in sys.argv[1:]
+        args = [arg for arg in sys.argv[1:] if arg != "--batch"]
+        if len(args) > 0:
+            if args[0].isdigit():
+                cv_sample_size = int(args[0])
+            if len(args) > 1 and args[1].isdigit():
+                job_sample_size = int(args[1])
         
-        generate_excel_report(cv_sample_size, job_sample_size)
+        generate_excel_report(cv_sample_size, job_sample_size, batch)
         generate_excel_report_from_processed_data()
     finally:
         # One final garbage collection to ensure all resources are freed
@@ -0,0 +1,186 @@
+"""
+Hedged calls against tail latency.
+
+Now and then a Gemini call takes far longer than the rest, and a batch run
+waits on its slowest request. A Hedger runs each call in the background and,
+if it has not answered GEMINI_HEDGE_QUANTILE latency of recent calls after its
+request was sent, sends a duplicate; whichever answers first wins. Time spent
+waiting for the rate limiter or a concurrency slot does not count, and a call
+that has not been sent yet when the other one answers is not sent at all. The
+slower one is otherwise left to finish on its own; its result is discarded,
+but the tokens it used are still reported (on_discard).
+Duplicates are limited to GEMINI_HEDGE_MAX_RATIO of all calls so a general
+slowdown does not double the load.
+"""
+import time
+import threading
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from typing import Any, Callable, Dict, Optional
+
+from config import (
+    GEMINI_HEDGE_QUANTILE,
+    GEMINI_HEDGE_MIN_DELAY,
+    GEMINI_HEDGE_INITIAL_DELAY,
+    GEMINI_HEDGE_MAX_RATIO
+)
+
+class HedgeCancelled(Exception):
+    """Raised by a hedged call that was not sent because the other call had already answered."""
+
+def _run_in_thread(fn: Callable[..., Any], *args) -> Future:
+    """Run fn in a daemon thread (so a loser never holds up the caller or shutdown)."""
+    future = Future()
+
+    def run():
+        try:
+            future.set_result(fn(*args))
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=run, daemon=True).start()
+    return future
+
+class Hedger:
+    """Sends a duplicate of slow calls, with the delay taken from the latency of recent calls."""
+
+    def __init__(self, quantile: float = GEMINI_HEDGE_QUANTILE, min_delay: float = GEMINI_HEDGE_MIN_DELAY,
+                 initial_delay: float = GEMINI_HEDGE_INITIAL_DELAY, max_ratio: float = GEMINI_HEDGE_MAX_RATIO,
+                 window: int = 200, min_samples: int = 20):
+        """
+        Initialize the hedger.
+
+        Args:
+            quantile (float): Latency quantile after which a duplicate is sent, e.g. 0.95
+            min_delay (float): Never hedge sooner than this many seconds
+            initial_delay (float): Delay used until min_samples latencies have been seen
+            max_ratio (float): Largest share of calls that may be duplicated
+            window (int): Number of recent latencies kept
+            min_samples (int): Latencies needed before the quantile is used
+        """
+        self.quantile = quantile
+        self.min_delay = min_delay
+        self.initial_delay = initial_delay
+        self.max_ratio = max_ratio
+        self.min_samples = min_samples
+        self._latencies = deque(maxlen=window)
+        # Duplicates that may be sent: grows by max_ratio per call, up to a small burst
+        self._credit = 1.0
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.hedged = 0
+        self.duplicate_wins = 0
+
+    def delay(self) -> float:
+        """Seconds to wait for a call before duplicating it."""
+        with self._lock:
+            if len(self._latencies) < self.min_samples:
+                return max(self.min_delay, self.initial_delay)
+            latencies = sorted(self._latencies)
+        index = min(len(latencies) - 1, int(self.quantile * len(latencies)))
+        return max(self.min_delay, latencies[index])
+
+    def _record(self, latency: float):
+        with self._lock:
+            self._latencies.append(latency)
+
+    def _has_credit(self) -> bool:
+        with self._lock:
+            return self._credit >= 1.0
+
+    def _take_credit(self):
+        with self._lock:
+            self._credit -= 1.0
+            self.hedged += 1
+
+    def call(self, fn: Callable[[bool, Callable[[], bool]], Any], can_hedge: Optional[Callable[[], bool]] = None,
+             on_discard: Optional[Callable[[Any], None]] = None) -> Any:
+        """
+        Run a call, duplicating it if it is slow.
+
+        Args:
+            fn (Callable[[bool, Callable[[], bool]], Any]): The call; receives True when it is the duplicate,
+                and an on_send function to call right before each request is sent: it returns False if the
+                answer is no longer needed (fn should then raise HedgeCancelled instead of sending)
+            can_hedge (Callable[[], bool], optional): Asked before sending a duplicate (e.g. whether
+                the rate limit leaves room for it); False keeps waiting for the original
+            on_discard (Callable[[Any], None], optional): Called with the result of the slower call
+                if it succeeds too (e.g. to record the tokens it used)
+
+        Returns:
+            Any: The first successful result
+
+        Raises:
+            Exception: The original's error if both calls fail (or if no duplicate was sent)
+        """
+        with self._lock:
+            self.calls += 1
+            self._credit = min(self._credit + self.max_ratio, max(1.0, 10 * self.max_ratio))
+        answered = threading.Event()
+        # Set when the original's first request goes out (or the original ends without sending one)
+        sent = threading.Event()
+        sent_at = []
+
+        def on_send_original() -> bool:
+            if answered.is_set():
+                return False
+            if not sent_at:
+                sent_at.append(time.monotonic())
+                sent.set()
+            return True
+
+        def record_latency(future):
+            # Recorded even if a duplicate wins, so slow calls still count towards the quantile
+            if future.exception() is None and sent_at:
+                self._record(time.monotonic() - sent_at[0])
+
+        original = _run_in_thread(fn, False, on_send_original)
+        original.add_done_callback(lambda future: sent.set())
+        original.add_done_callback(record_latency)
+
+        # The hedge clock starts when the request is sent, not while it waits for the rate limit
+        sent.wait()
+        if not original.done():
+            wait([original], timeout=max(0.0, sent_at[0] + self.delay() - time.monotonic()))
+        if original.done() or not self._has_credit() or (can_hedge is not None and not can_hedge()):
+            return original.result()
+        self._take_credit()
+
+        duplicate = _run_in_thread(fn, True, lambda: not answered.is_set())
+        pending = {original, duplicate}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    answered.set()
+                    if future is duplicate:
+                        with self._lock:
+                            self.duplicate_wins += 1
+                    loser = original if future is duplicate else duplicate
+                    loser.add_done_callback(lambda loser: self._discard(loser, on_discard))
+                    return future.result()
+        # Both failed: report the original's error
+        return original.result()
+
+    @staticmethod
+    def _discard(future: Future, on_discard: Optional[Callable[[Any], None]]):
+        """Hand the result of the slower call, if it succeeded, to on_discard."""
+        if on_discard is None or future.exception() is not None:
+            return
+        try:
+            on_discard(future.result())
+        except Exception as e:
+            print(f"Error handling the result of a discarded hedged call: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Calls made, calls duplicated, duplicates that answered first and the current delay."""
+        delay = self.delay()
+        with self._lock:
+            return {"calls": self.calls, "hedged": self.hedged, "duplicate_wins": self.duplicate_wins,
+                    "delay": delay}
+
+    def summary(self) -> str:
+        """One-line description of the hedging so far."""
+        stats = self.stats()
+        return (f"Hedging: {stats['hedged']} of {stats['calls']} calls duplicated after {stats['delay']:.1f}s, "
+                f"{stats['duplicate_wins']} answered first by the duplicate")
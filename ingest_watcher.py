@@ -0,0 +1,347 @@
+import os
+import sys
+import json
+import time
+import queue
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from document_processor import extract_text
+from document_manifest import get_manifest
+from matcher import CVJobMatcher, MatchResult, format_top_matches
+from config import GEMINI_API_KEY, SCORING_BACKEND, CV_DIR, JOB_DESCRIPTIONS_DIR, OUTPUT_DIR
+
+KINDS = ("cv", "job")
+
+class ScoreMatrix:
+    """
+    Persisted CV x job score matrix.
+
+    Besides the scores it records the (mtime, size) fingerprint of every
+    document that has been ingested, so a restarted watcher only re-scores
+    what changed while it was stopped.
+    """
+
+    def __init__(self, path: str):
+        """
+        Initialize the matrix, loading it from disk if it exists.
+
+        Args:
+            path (str): JSON file the matrix is stored in
+        """
+        self.path = path
+        self.files = {kind: {} for kind in KINDS}
+        self.scores = {}
+        self._lock = threading.RLock()
+        # Held across a whole save, so the worker and the polling thread never share the temporary file
+        self._save_lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return
+        self.files = {kind: {name: tuple(fp) for name, fp in saved.get('files', {}).get(kind, {}).items()}
+                      for kind in KINDS}
+        self.scores = saved.get('scores', {})
+
+    def save(self):
+        """Write the matrix to disk (atomically)."""
+        with self._save_lock:
+            with self._lock:
+                data = json.dumps({'files': self.files, 'scores': self.scores}, ensure_ascii=False)
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(data)
+            os.replace(tmp_path, self.path)
+
+    def fingerprint(self, kind: str, file_name: str) -> Optional[Tuple[int, int]]:
+        with self._lock:
+            return self.files[kind].get(file_name)
+
+    def update_file(self, kind: str, file_name: str, fingerprint: Tuple[int, int]):
+        """Record a new or changed document and drop its now stale scores."""
+        with self._lock:
+            self.files[kind][file_name] = fingerprint
+            self._drop_scores(kind, file_name)
+
+    def remove_file(self, kind: str, file_name: str):
+        """Forget a deleted document and its row or column of scores."""
+        with self._lock:
+            self.files[kind].pop(file_name, None)
+            self._drop_scores(kind, file_name)
+
+    def _drop_scores(self, kind: str, file_name: str):
+        if kind == "job":
+            self.scores.pop(file_name, None)
+        else:
+            for job_scores in self.scores.values():
+                job_scores.pop(file_name, None)
+
+    def set_score(self, cv_file: str, job_file: str, result: MatchResult):
+        with self._lock:
+            self.scores.setdefault(job_file, {})[cv_file] = result.dict()
+
+    def missing_pairs(self) -> List[Tuple[str, str]]:
+        """List the (CV file, job file) pairs of known documents that have no score yet."""
+        with self._lock:
+            return [(cv_file, job_file)
+                    for job_file in self.files["job"]
+                    for cv_file in self.files["cv"]
+                    if cv_file not in self.scores.get(job_file, {})]
+
+    def to_matches(self) -> Dict[str, List[Tuple[str, MatchResult]]]:
+        """
+        Convert the matrix to the format used by format_top_matches.
+
+        Returns:
+            Dict[str, List[Tuple[str, MatchResult]]]: Dictionary mapping job files to (CV file, result), best first
+        """
+        with self._lock:
+            matches = {}
+            for job_file, job_scores in self.scores.items():
+                results = [(cv_file, MatchResult(**result)) for cv_file, result in job_scores.items()]
+                results.sort(key=lambda x: x[1].total_score, reverse=True)
+                matches[job_file] = results
+            return matches
+
+class IngestWatcher:
+    """
+    Watch the CV and job description folders and keep the score matrix up to date.
+
+    The folders are polled (portable, no extra dependencies). Added and
+    changed documents are extracted right away; only the affected row (CV)
+    or column (job) of the matrix is queued for scoring, and deleted documents
+    drop out of the matrix. Queued pairs are scored a row or column at a time,
+    so they share grouped requests (MATCH_BATCH_SIZE) like match_all.
+    """
+
+    def __init__(self, cv_dir: str = CV_DIR, job_dir: str = JOB_DESCRIPTIONS_DIR,
+                 matrix_path: str = None, matcher: CVJobMatcher = None, interval: float = 10.0):
+        """
+        Initialize the watcher.
+
+        Args:
+            cv_dir (str): Directory containing CV files
+            job_dir (str): Directory containing job description files
+            matrix_path (str, optional): Where to keep the score matrix (default: OUTPUT_DIR/match_matrix.json)
+            matcher (CVJobMatcher, optional): Matcher used for scoring
+            interval (float): Seconds between polls
+        """
+        self.directories = {"cv": cv_dir, "job": job_dir}
+        self.matrix = ScoreMatrix(matrix_path or os.path.join(OUTPUT_DIR, "match_matrix.json"))
+        self.matcher = matcher or CVJobMatcher()
+        self.interval = interval
+        self._queue = queue.Queue()
+        self._queued = set()
+        self._queued_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._worker = None
+        # write_results runs on the worker and, after removals, on the polling thread
+        self._write_lock = threading.Lock()
+
+    def scan(self) -> Dict[str, Dict[str, List[str]]]:
+        """
+        Compare the folders with the documents already ingested.
+
+        Returns:
+            Dict[str, Dict[str, List[str]]]: For "cv" and "job", the added, changed and removed filenames
+        """
+        changes = {}
+        for kind, directory in self.directories.items():
+            manifest = get_manifest(directory)
+            file_names, _ = manifest.get_files()
+            current = {}
+            for file_name in file_names:
+                try:
+                    stat = os.stat(manifest.path(file_name))
+                except OSError:
+                    continue
+                current[file_name] = (stat.st_mtime_ns, stat.st_size)
+
+            known = dict(self.matrix.files[kind])
+            changes[kind] = {
+                'added': [f for f in current if f not in known],
+                'changed': [f for f in current if f in known and known[f] != current[f]],
+                'removed': [f for f in known if f not in current],
+            }
+            for file_name in changes[kind]['added'] + changes[kind]['changed']:
+                # Warm the text cache now so scoring only pays for the API call
+                extract_text(manifest.path(file_name))
+                self.matrix.update_file(kind, file_name, current[file_name])
+            for file_name in changes[kind]['removed']:
+                self.matrix.remove_file(kind, file_name)
+        return changes
+
+    def poll_once(self) -> int:
+        """
+        Scan the folders once and queue the pairs that need scoring.
+
+        Returns:
+            int: Number of newly queued pairs
+        """
+        changes = self.scan()
+        for kind in KINDS:
+            for change in ('added', 'changed', 'removed'):
+                for file_name in changes[kind][change]:
+                    print(f"{change.capitalize()} {kind}: {file_name}")
+        changed = any(changes[kind][change] for kind in KINDS for change in changes[kind])
+
+        queued = 0
+        with self._queued_lock:
+            for pair in self.matrix.missing_pairs():
+                if pair not in self._queued:
+                    self._queued.add(pair)
+                    self._queue.put(pair)
+                    queued += 1
+        if queued:
+            print(f"Queued {queued} pairs for scoring ({self._queue.qsize()} pending)")
+        elif changed:
+            # Only removals: nothing to score, but the report must drop them
+            self.write_results()
+        return queued
+
+    def _score_pairs(self, pairs: List[Tuple[str, str]]):
+        """Score queued pairs a column (job) or row (CV) at a time, whichever gives fewer groups."""
+        by_job, by_cv = {}, {}
+        for cv_file, job_file in pairs:
+            by_job.setdefault(job_file, []).append(cv_file)
+            by_cv.setdefault(cv_file, []).append(job_file)
+        if len(by_job) <= len(by_cv):
+            groups = [([(cv_file, job_file) for cv_file in cv_files], True) for job_file, cv_files in by_job.items()]
+        else:
+            groups = [([(cv_file, job_file) for job_file in job_files], False) for cv_file, job_files in by_cv.items()]
+        for group, by_job in groups:
+            if self._stop.is_set():
+                return
+            try:
+                self._score_group(group, by_job)
+            except Exception as e:
+                shared = group[0][1] if by_job else group[0][0]
+                print(f"Error scoring {len(group)} pairs of {shared}: {e}")
+
+    def _score_group(self, pairs: List[Tuple[str, str]], by_job: bool):
+        """Score pairs sharing one job (by_job) or one CV with the matcher's grouped requests."""
+        fingerprints = {pair: (self.matrix.fingerprint("cv", pair[0]), self.matrix.fingerprint("job", pair[1]))
+                        for pair in pairs}
+        # Skip pairs whose documents were removed while queued
+        pairs = [pair for pair in pairs if None not in fingerprints[pair]]
+        if not pairs:
+            return
+
+        cv_manifest = get_manifest(self.directories["cv"])
+        job_manifest = get_manifest(self.directories["job"])
+        if by_job:
+            job_content = extract_text(job_manifest.path(pairs[0][1]))
+            cv_contents = [extract_text(cv_manifest.path(cv_file)) for cv_file, _ in pairs]
+            results = self.matcher.match_job_to_cvs(job_content, cv_contents)
+        else:
+            cv_content = extract_text(cv_manifest.path(pairs[0][0]))
+            job_contents = [extract_text(job_manifest.path(job_file)) for _, job_file in pairs]
+            results = self.matcher.match_cv_to_jobs(cv_content, job_contents)
+
+        failed = 0
+        for (cv_file, job_file), result in zip(pairs, results):
+            if result.failed:
+                # Leave the pair missing so the next poll queues it again
+                failed += 1
+                continue
+            # Discard the result if either document changed while it was being scored
+            if (self.matrix.fingerprint("cv", cv_file), self.matrix.fingerprint("job", job_file)) \
+                    == fingerprints[(cv_file, job_file)]:
+                self.matrix.set_score(cv_file, job_file, result)
+        if failed:
+            print(f"Could not score {failed} of {len(pairs)} pairs; retrying on the next poll")
+
+    def _work(self):
+        """Score queued pairs until stopped; saves the matrix after each batch drains."""
+        while not self._stop.is_set():
+            try:
+                pairs = [self._queue.get(timeout=0.5)]
+            except queue.Empty:
+                continue
+            # Take everything queued so far, so whole rows and columns share requests
+            while True:
+                try:
+                    pairs.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._score_pairs(pairs)
+            finally:
+                with self._queued_lock:
+                    self._queued.difference_update(pairs)
+                for _ in pairs:
+                    self._queue.task_done()
+            if self._queue.empty():
+                self.write_results()
+
+    def write_results(self):
+        """Save the matrix and refresh the top matches report in the output directory."""
+        with self._write_lock:
+            self.matrix.save()
+            os.makedirs(OUTPUT_DIR, exist_ok=True)
+            output_file = os.path.join(OUTPUT_DIR, "matching_results.txt")
+            with open(output_file, "w", encoding="utf-8") as f:
+                f.write(format_top_matches(self.matrix.to_matches(), top_n=5))
+        print(f"Matrix updated. Results saved to '{output_file}'.")
+
+    def start(self):
+        """Start the scoring worker thread."""
+        if self._worker is None:
+            self._worker = threading.Thread(target=self._work, daemon=True)
+            self._worker.start()
+
+    def stop(self):
+        """Stop the scoring worker after the group of pairs currently being scored."""
+        self._stop.set()
+        if self._worker is not None:
+            self._worker.join()
+            self._worker = None
+
+    def run(self, once: bool = False):
+        """
+        Poll the folders and score changes until interrupted.
+
+        Args:
+            once (bool): Process the current changes, wait for scoring to finish and return
+        """
+        self.start()
+        try:
+            while True:
+                self.poll_once()
+                if once:
+                    self._queue.join()
+                    break
+                time.sleep(self.interval)
+        finally:
+            self.stop()
+            self.matrix.save()
+
+def main():
+    """Main function to run the watcher."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Watch DataSet/ and score only new or changed documents")
+    parser.add_argument("--interval", type=float, default=10.0, help="Seconds between folder scans (default: 10)")
+    parser.add_argument("--once", action="store_true", help="Process pending changes once and exit")
+    args = parser.parse_args()
+
+    # Check if API key is provided
+    if SCORING_BACKEND == "gemini" and not GEMINI_API_KEY:
+        print("Error: GEMINI_API_KEY is not set.")
+        print("Please set your API key in the config.py file or as an environment variable.")
+        sys.exit(1)
+
+    watcher = IngestWatcher(interval=args.interval)
+    print(f"Watching '{CV_DIR}' and '{JOB_DESCRIPTIONS_DIR}' (Ctrl+C to stop)...")
+    try:
+        watcher.run(once=args.once)
+    except KeyboardInterrupt:
+        print("\nStopping watcher...")
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,7 @@
 from PyQt6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, 
                            QFrame, QScrollArea, QWidget, QTextEdit, QComboBox, QLineEdit,
                            QMessageBox, QProgressBar, QButtonGroup, QRadioButton)
-from PyQt6.QtCore import Qt, QSize, QPropertyAnimation, QEasingCurve, QPoint, QTimer, QRect
+from PyQt6.QtCore import Qt, QSize, QPropertyAnimation, QEasingCurve, QPoint, QTimer, QRect, QThread, pyqtSignal
 from PyQt6.QtGui import QFont, QIcon, QTextCursor, QColor, QPalette, QLinearGradient, QBrush, QPainter, QPen
 import os
 import sys
@@ -9,7 +9,7 @@ import sys
 # Add parent directory to Python path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from document_processor import extract_text
-from matcher import CVJobMatcher
+from matcher import CVJobMatcher, MatchResult
 from config import GEMINI_API_KEY
 from file_uploader import FileUploader, LocalFileUploader, DatasetFileUploader
 
@@ -186,6 +186,30 @@ class LoadingWidget(QFrame):
         self.animation.setEasingCurve(QEasingCurve.Type.OutCubic)
         self.animation.start()
 
+class MatchWorker(QThread):
+    """Runs a streamed match off the GUI thread and reports its progress through signals."""
+    scores_ready = pyqtSignal(dict)
+    reasoning_chunk = pyqtSignal(str)
+    match_finished = pyqtSignal(object)
+    match_failed = pyqtSignal(str)
+    
+    def __init__(self, matcher, cv_content, job_content, parent=None):
+        super().__init__(parent)
+        self.matcher = matcher
+        self.cv_content = cv_content
+        self.job_content = job_content
+    
+    def run(self):
+        try:
+            result = self.matcher.match_stream(
+                self.cv_content, self.job_content,
+                on_scores=self.scores_ready.emit,
+                on_reasoning=self.reasoning_chunk.emit
+            )
+            self.match_finished.emit(result)
+        except Exception as e:
+            self.match_failed.emit(str(e))
+
 class ChatDialog(QDialog):
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -218,6 +242,8 @@ class ChatDialog(QDialog):
         
         # Initialize matcher
         self.matcher = CVJobMatcher()
+        self.match_worker = None
+        self.reasoning_text = None
         
         # Create main layout
         main_layout = QVBoxLayout(self)
@@ -436,6 +462,7 @@ class ChatDialog(QDialog):
         """)
         match_button.clicked.connect(self.perform_match)
         input_layout.addWidget(match_button)
+        self.match_button = match_button
         
         main_layout.addWidget(input_frame)
         
@@ -517,8 +544,8 @@ class ChatDialog(QDialog):
             self.chat_area.verticalScrollBar().maximum()
         ))
     
-    def add_score_bars(self, result):
-        """Add animated score bars for the match results."""
+    def add_score_bars(self, result, index=-1):
+        """Add animated score bars for the match results (at index in the chat, default last); returns their frame."""
         scores_frame = QFrame()
         scores_frame.setStyleSheet("""
             QFrame {
@@ -550,7 +577,8 @@ class ChatDialog(QDialog):
             "Total Score"
         ))
         
-        self.chat_layout.addWidget(scores_frame)
+        self.chat_layout.insertWidget(index, scores_frame)
+        return scores_frame
     
     def show_loading(self, message="Processing match..."):
         """Show the loading animation."""
@@ -576,7 +604,10 @@ class ChatDialog(QDialog):
                 item.widget().deleteLater()
 
     def perform_match(self):
-        """Perform the CV-job matching and display results."""
+        """Start the CV-job matching; scores and reasoning are displayed as they stream in."""
+        if self.match_worker is not None:
+            return
+        
         cv_file = self.cv_combo.currentData()
         job_file = self.job_combo.currentData()
         
@@ -604,12 +635,6 @@ class ChatDialog(QDialog):
             if self.loading_widget:
                 self.loading_widget.message_label.setText("Analyzing match...")
             
-            # Perform matching
-            result = self.matcher.match(cv_content, job_content)
-            
-            # Hide loading animation
-            self.hide_loading()
-            
             # Format results
             cv_name = self.cv_combo.currentText()
             job_name = self.job_combo.currentText()
@@ -634,66 +659,132 @@ class ChatDialog(QDialog):
             
             self.chat_layout.addWidget(header_frame)
             
-            # Add score bars
-            self.add_score_bars(result)
-            
-            # Add reasoning
-            reasoning_frame = QFrame()
-            reasoning_frame.setStyleSheet("""
-                QFrame {
-                    background: white;
-                    border-radius: 8px;
-                    border: 1px solid #e0e0e0;
-                    padding: 12px;
-                    margin: 8px;
-                }
-            """)
-            reasoning_layout = QVBoxLayout(reasoning_frame)
-            
-            reasoning_label = QLabel("Reasoning")
-            reasoning_label.setFont(QFont('Segoe UI', 12, QFont.Weight.Bold))
-            reasoning_label.setStyleSheet("color: #424242;")
-            reasoning_layout.addWidget(reasoning_label)
-            
-            reasoning_text = QLabel(result.reasoning)
-            reasoning_text.setWordWrap(True)
-            reasoning_text.setFont(QFont('Segoe UI', 11))
-            reasoning_text.setStyleSheet("color: #616161;")
-            reasoning_layout.addWidget(reasoning_text)
-            
-            self.chat_layout.addWidget(reasoning_frame)
-            
-            # Add rating
-            rating = "Excellent Match ⭐⭐⭐⭐⭐" if result.total_score >= 0.8 else \
-                    "Strong Match ⭐⭐⭐⭐" if result.total_score >= 0.6 else \
-                    "Good Match ⭐⭐⭐" if result.total_score >= 0.4 else \
-                    "Fair Match ⭐⭐" if result.total_score >= 0.2 else \
-                    "Poor Match ⭐"
-            
-            rating_frame = QFrame()
-            rating_frame.setStyleSheet("""
-                QFrame {
-                    background: #e3f2fd;
-                    border-radius: 8px;
-                    border: 1px solid #1976d2;
-                    padding: 12px;
-                    margin: 8px;
-                }
-            """)
-            rating_layout = QVBoxLayout(rating_frame)
-            
-            rating_label = QLabel("Match Rating")
-            rating_label.setFont(QFont('Segoe UI', 12, QFont.Weight.Bold))
-            rating_label.setStyleSheet("color: #1976d2;")
-            rating_layout.addWidget(rating_label)
-            
-            rating_text = QLabel(rating)
-            rating_text.setFont(QFont('Segoe UI', 14))
-            rating_text.setStyleSheet("color: #1976d2;")
-            rating_layout.addWidget(rating_text)
-            
-            self.chat_layout.addWidget(rating_frame)
+            # Perform matching in the background; the scores arrive before the reasoning
+            self.reasoning_text = None
+            self.streamed_scores = None
+            self.scores_frame = None
+            self.reasoning_frame = None
+            self.match_button.setEnabled(False)
+            self.match_worker = MatchWorker(self.matcher, cv_content, job_content, self)
+            self.match_worker.scores_ready.connect(self.on_match_scores)
+            self.match_worker.reasoning_chunk.connect(self.on_match_reasoning)
+            self.match_worker.match_finished.connect(self.on_match_finished)
+            self.match_worker.match_failed.connect(self.on_match_failed)
+            self.match_worker.finished.connect(self.on_match_worker_done)
+            self.match_worker.start()
             
         except Exception as e:
             self.hide_loading()
-            self.add_message(f"Error: {str(e)}", False) 
\ No newline at end of file
+            self.add_message(f"Error: {str(e)}", False)
+    
+    def on_match_scores(self, scores):
+        """Show the score bars and an empty reasoning box as soon as the scores are in."""
+        self.hide_loading()
+        
+        # Add score bars
+        self.streamed_scores = scores
+        self.scores_frame = self.add_score_bars(MatchResult(reasoning="", **scores))
+        
+        # Add reasoning
+        reasoning_frame = QFrame()
+        reasoning_frame.setStyleSheet("""
+            QFrame {
+                background: white;
+                border-radius: 8px;
+                border: 1px solid #e0e0e0;
+                padding: 12px;
+                margin: 8px;
+            }
+        """)
+        reasoning_layout = QVBoxLayout(reasoning_frame)
+        
+        reasoning_label = QLabel("Reasoning")
+        reasoning_label.setFont(QFont('Segoe UI', 12, QFont.Weight.Bold))
+        reasoning_label.setStyleSheet("color: #424242;")
+        reasoning_layout.addWidget(reasoning_label)
+        
+        self.reasoning_text = QLabel("")
+        self.reasoning_text.setWordWrap(True)
+        self.reasoning_text.setFont(QFont('Segoe UI', 11))
+        self.reasoning_text.setStyleSheet("color: #616161;")
+        reasoning_layout.addWidget(self.reasoning_text)
+        
+        self.chat_layout.addWidget(reasoning_frame)
+        self.reasoning_frame = reasoning_frame
+    
+    def on_match_reasoning(self, chunk):
+        """Append a streamed piece of the reasoning."""
+        if self.reasoning_text is not None:
+            self.reasoning_text.setText(self.reasoning_text.text() + chunk)
+    
+    def on_match_finished(self, result):
+        """Add the rating once the full result is in (or replace a broken streamed answer with an error)."""
+        self.hide_loading()
+        if result.failed:
+            # The stream broke off or its answer could not be validated: drop the partial answer
+            for frame in (self.scores_frame, self.reasoning_frame):
+                if frame is not None:
+                    self.chat_layout.removeWidget(frame)
+                    frame.deleteLater()
+            self.scores_frame = self.reasoning_frame = self.reasoning_text = None
+            self.add_message(f"Error: the match could not be completed. {result.reasoning}", False)
+            return
+        
+        if self.streamed_scores is not None:
+            final_scores = {field: getattr(result, field) for field in self.streamed_scores}
+            if final_scores != self.streamed_scores:
+                # Show the final scores in place of the streamed ones
+                index = self.chat_layout.indexOf(self.scores_frame)
+                self.chat_layout.removeWidget(self.scores_frame)
+                self.scores_frame.deleteLater()
+                self.scores_frame = self.add_score_bars(result, index)
+        if self.reasoning_text is not None and self.reasoning_text.text() != result.reasoning:
+            self.reasoning_text.setText(result.reasoning)
+        
+        # Add rating
+        rating = "Excellent Match ⭐⭐⭐⭐⭐" if result.total_score >= 0.8 else \
+                "Strong Match ⭐⭐⭐⭐" if result.total_score >= 0.6 else \
+                "Good Match ⭐⭐⭐" if result.total_score >= 0.4 else \
+                "Fair Match ⭐⭐" if result.total_score >= 0.2 else \
+                "Poor Match ⭐"
+        
+        rating_frame = QFrame()
+        rating_frame.setStyleSheet("""
+            QFrame {
+                background: #e3f2fd;
+                border-radius: 8px;
+                border: 1px solid #1976d2;
+                padding: 12px;
+                margin: 8px;
+            }
+        """)
+        rating_layout = QVBoxLayout(rating_frame)
+        
+        rating_label = QLabel("Match Rating")
+        rating_label.setFont(QFont('Segoe UI', 12, QFont.Weight.Bold))
+        rating_label.setStyleSheet("color: #1976d2;")
+        rating_layout.addWidget(rating_label)
+        
+        rating_text = QLabel(rating)
+        rating_text.setFont(QFont('Segoe UI', 14))
+        rating_text.setStyleSheet("color: #1976d2;")
+        rating_layout.addWidget(rating_text)
+        
+        self.chat_layout.addWidget(rating_frame)
+    
+    def on_match_failed(self, message):
+        """Report an error raised by the match worker."""
+        self.hide_loading()
+        self.add_message(f"Error: {message}", False)
+    
+    def on_match_worker_done(self):
+        """Allow the next match once the worker thread has stopped."""
+        self.match_worker.deleteLater()
+        self.match_worker = None
+        self.match_button.setEnabled(True)
+    
+    def reject(self):
+        """Wait for a running match before closing the dialog."""
+        if self.match_worker is not None:
+            self.match_worker.wait()
+        super().reject()
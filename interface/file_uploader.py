@@ -1,8 +1,13 @@
 from abc import ABC, abstractmethod
 from PyQt6.QtWidgets import QWidget, QFileDialog
 import os
+import sys
 from typing import Tuple, Dict, List
 
+# Add parent directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from document_manifest import get_manifest
+
 class FileUploader(ABC):
     """Abstract base class for file uploading strategies."""
     
@@ -68,28 +73,6 @@ class DatasetFileUploader(FileUploader):
         if base_dir is None:
             base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
         
+        # The manifest only re-lists the folder when it changes, so this is cheap to call on every keystroke
         folder_path = os.path.join(base_dir, "DataSet", self.subfolder)
-        files = [f for f in os.listdir(folder_path) if f.endswith(('.docx', '.pdf'))]
-        display_names = {}
-        
-        for file in files:
-            if file.endswith('.docx'):
-                if file.startswith('cv_') and len(file.split('_')) >= 3:
-                    # CV file: cv_ID_Name.docx
-                    parts = file.split('_')
-                    file_id = parts[1]
-                    name = '_'.join(parts[2:]).replace('.docx', '')
-                    display_names[file] = f"ID {file_id} - {name}"
-                elif file.startswith('job_description_') and len(file.split('_')) >= 4:
-                    # Job file: job_description_ID_Title.docx
-                    parts = file.split('_')
-                    file_id = parts[2]
-                    name = '_'.join(parts[3:]).replace('.docx', '')
-                    display_names[file] = f"ID {file_id} - {name}"
-                else:
-                    display_names[file] = file
-            else:
-                # PDF files
-                display_names[file] = file
-        
-        return files, display_names 
\ No newline at end of file
+        return get_manifest(folder_path).get_files()
@@ -1,10 +1,10 @@
 import os
 import sys
 import heapq
-import time
 from document_processor import extract_text, load_job_descriptions, load_cvs
+from document_manifest import get_manifest, parse_document_filename
 from matcher import CVJobMatcher
-from config import GEMINI_API_KEY
+from config import GEMINI_API_KEY, SCORING_BACKEND
 
 def get_job_files(job_id=None, base_dir=None):
     """
@@ -20,43 +20,12 @@ def get_job_files(job_id=None, base_dir=None):
     """
     if base_dir is None:
         base_dir = os.path.dirname(os.path.abspath(__file__))
-    job_dir = os.path.join(base_dir, "DataSet", "job_descriptions")
-    job_files = [f for f in os.listdir(job_dir) if f.endswith(('.docx', '.pdf'))]
-    job_display_names = {}
-    
-    for file in job_files:
-        if file.endswith('.docx') and file.startswith('job_description_'):
-            # Standard naming convention: job_description_ID_Title.docx
-            parts = file.split('_')
-            if len(parts) >= 4:
-                file_id = parts[2]
-                name = '_'.join(parts[3:]).replace('.docx', '')
-                job_display_names[file] = f"ID {file_id} - {name}"
-        elif file.endswith('.pdf'):
-            # PDF files might not follow the naming convention
-            if file.startswith('job_description_'):
-                # Try to extract ID if it follows the convention
-                parts = file.split('_')
-                if len(parts) >= 4:
-                    file_id = parts[2]
-                    name = '_'.join(parts[3:]).replace('.pdf', '')
-                    job_display_names[file] = f"ID {file_id} - {name}"
-                else:
-                    # For PDF files without standard naming
-                    job_display_names[file] = file.replace('.pdf', '')
-            else:
-                # For PDF files without standard naming
-                job_display_names[file] = file.replace('.pdf', '')
+    manifest = get_manifest(os.path.join(base_dir, "DataSet", "job_descriptions"))
+    job_files, job_display_names = manifest.get_files()
     
-    # If job_id is provided, filter the files
+    # If job_id is provided, filter the files by numeric ID or filename
     if job_id:
-        if job_id.isdigit():
-            # Try to find by numeric ID
-            filtered_files = [f for f in job_files if f.endswith('.docx') and f.split('_')[2] == job_id]
-        else:
-            # Assume job_id is a filename
-            filtered_files = [f for f in job_files if f == job_id or f.replace('.pdf', '') == job_id or f.replace('.docx', '') == job_id]
-        
+        filtered_files = manifest.find(job_id)
         return filtered_files, {k: job_display_names[k] for k in filtered_files if k in job_display_names}
     
     return job_files, job_display_names
@@ -71,35 +40,7 @@ def get_cv_files(base_dir=None):
     """
     if base_dir is None:
         base_dir = os.path.dirname(os.path.abspath(__file__))
-    cv_dir = os.path.join(base_dir, "DataSet", "cv")
-    cv_files = [f for f in os.listdir(cv_dir) if f.endswith(('.docx', '.pdf'))]
-    cv_display_names = {}
-    
-    for file in cv_files:
-        if file.endswith('.docx') and file.startswith('cv_'):
-            # Standard naming convention: cv_ID_Name.docx
-            parts = file.split('_')
-            if len(parts) >= 3:
-                file_id = parts[1]
-                name = '_'.join(parts[2:]).replace('.docx', '')
-                cv_display_names[file] = f"ID {file_id} - {name}"
-        elif file.endswith('.pdf'):
-            # PDF files might not follow the naming convention
-            if file.startswith('cv_'):
-                # Try to extract ID if it follows the convention
-                parts = file.split('_')
-                if len(parts) >= 3:
-                    file_id = parts[1]
-                    name = '_'.join(parts[2:]).replace('.pdf', '')
-                    cv_display_names[file] = f"ID {file_id} - {name}"
-                else:
-                    # For PDF files without standard naming
-                    cv_display_names[file] = file.replace('.pdf', '')
-            else:
-                # For PDF files without standard naming
-                cv_display_names[file] = file.replace('.pdf', '')
-    
-    return cv_files, cv_display_names
+    return get_manifest(os.path.join(base_dir, "DataSet", "cv")).get_files()
 
 def batch_match_job_to_cvs(job_path, num_cvs=20, top_matches=5, max_retries=3):
     """
@@ -115,12 +56,12 @@ def batch_match_job_to_cvs(job_path, num_cvs=20, top_matches=5, max_retries=3):
         list: Top matches sorted by score (highest first)
     """
     # Check if Gemini API key is provided
-    if not GEMINI_API_KEY:
+    if SCORING_BACKEND == "gemini" and not GEMINI_API_KEY:
         print("Error: GEMINI_API_KEY is not set.")
         print("Please set your API key in the config.py file or as an environment variable.")
         sys.exit(1)
     
-    print(f"Using Gemini API")
+    print(f"Using scoring backend: {SCORING_BACKEND}")
     
     # Get paths to directories
     base_dir = os.path.dirname(os.path.abspath(__file__))
@@ -130,16 +71,11 @@ def batch_match_job_to_cvs(job_path, num_cvs=20, top_matches=5, max_retries=3):
     job_content = extract_text(job_path)
     
     # Get display name for the job
-    job_name = os.path.basename(job_path)
-    if job_name.endswith('.docx') and job_name.startswith('job_description_'):
-        parts = job_name.split('_')
-        if len(parts) >= 4:
-            job_id = parts[2]
-            title = '_'.join(parts[3:]).replace('.docx', '')
-            job_name = f"ID {job_id} - {title}"
+    job_name = parse_document_filename(os.path.basename(job_path))['display_name']
     
     # Load CVs
-    cv_files = [f for f in os.listdir(cv_dir) if f.endswith(('.docx', '.pdf'))]
+    cv_manifest = get_manifest(cv_dir)
+    cv_files, _ = cv_manifest.get_files()
     
     # Limit to the specified number of CVs
     if num_cvs < len(cv_files):
@@ -153,69 +89,27 @@ def batch_match_job_to_cvs(job_path, num_cvs=20, top_matches=5, max_retries=3):
     
     print(f"Matching Job: {job_name} with {len(cv_files)} CVs...")
     
-    # Track API calls for rate limiting
-    api_call_count = 0
-    
-    # Process each CV
-    for i, cv_file in enumerate(cv_files):
-        # Check if we need to pause for rate limiting (after 15 API calls)
-        if api_call_count >= 15:
-            print("\n=== RATE LIMIT REACHED ===")
-            print("Pausing for 60 seconds to avoid API rate limiting...")
-            for remaining in range(60, 0, -1):
-                sys.stdout.write(f"\rResuming in {remaining} seconds...")
-                sys.stdout.flush()
-                time.sleep(1)
-            print("\nResuming processing...")
-            # Reset the counter after the pause
-            api_call_count = 0
+    # Read the CVs first (retrying unreadable files); scoring then runs concurrently
+    cv_contents = []
+    scored_cvs = []
+    
+    for cv_file in cv_files:
+        # Get CV ID and name (standard naming: cv_ID_Name.docx; placeholder ID for non-standard files)
+        cv_entry = cv_manifest.entry(cv_file)
+        cv_id = cv_entry['file_id'] or "N/A"
+        cv_name = cv_entry['name'] if cv_entry['file_id'] else cv_file
         
         retry_count = 0
         success = False
         
         while retry_count < max_retries and not success:
             try:
-                # Get CV display name
-                cv_name = cv_file
-                if cv_file.endswith('.docx') and cv_file.startswith('cv_'):
-                    parts = cv_file.split('_')
-                    if len(parts) >= 3:
-                        cv_id = parts[1]
-                        name = '_'.join(parts[2:]).replace('.docx', '')
-                        cv_name = f"ID {cv_id} - {name}"
-                
-                # If it's a standard CV file, extract ID
-                if cv_file.endswith('.docx') and cv_file.startswith('cv_') and len(cv_file.split('_')) >= 3:
-                    cv_id = cv_file.split('_')[1]
-                else:
-                    # For non-standard files, use placeholder
-                    cv_id = "N/A"
-                
-                # Display progress
-                print(f"Processing {i+1}/{len(cv_files)}: {cv_name}")
-                
                 # Get CV content
-                cv_path = os.path.join(cv_dir, cv_file)
+                cv_path = cv_manifest.path(cv_file)
                 cv_content = extract_text(cv_path)
                 
-                # Match CV with job description
-                result = matcher.match(cv_content, job_content)
-                
-                # Increment API call counter after successful call
-                api_call_count += 1
-                
-                # Store result with CV info
-                all_results.append({
-                    'cv_id': cv_id,
-                    'cv_name': cv_name.replace('ID ' + cv_id + ' - ', '') if cv_id != "N/A" else cv_name,
-                    'cv_file': cv_file,
-                    'total_score': result.total_score,
-                    'industry_knowledge_score': result.industry_knowledge_score,
-                    'technical_skills_score': result.technical_skills_score,
-                    'job_description_match_score': result.job_description_match_score,
-                    'reasoning': result.reasoning
-                })
-                
+                cv_contents.append(cv_content)
+                scored_cvs.append((cv_id, cv_name, cv_file, cv_entry['display_name']))
                 success = True
                 
             except Exception as e:
@@ -227,15 +121,9 @@ def batch_match_job_to_cvs(job_path, num_cvs=20, top_matches=5, max_retries=3):
                 else:
                     print(f"Failed to process CV {cv_file} after {max_retries} attempts. Skipping.")
                     # Add a placeholder result to ensure we have data for reporting
-                    cv_name = cv_file
-                    if cv_file.endswith('.docx') and cv_file.startswith('cv_') and len(cv_file.split('_')) >= 3:
-                        cv_id = cv_file.split('_')[1]
-                    else:
-                        cv_id = "N/A"
-                    
                     all_results.append({
                         'cv_id': cv_id,
-                        'cv_name': cv_name.replace('ID ' + cv_id + ' - ', '') if cv_id != "N/A" else cv_name,
+                        'cv_name': cv_name,
                         'cv_file': cv_file,
                         'total_score': 0.0,
                         'industry_knowledge_score': 0.0,
@@ -244,6 +132,31 @@ def batch_match_job_to_cvs(job_path, num_cvs=20, top_matches=5, max_retries=3):
                         'reasoning': f"Error processing: {str(e)}"
                     })
     
+    completed = [0]
+    
+    def report_progress(index, result):
+        # Display progress
+        completed[0] += 1
+        print(f"Processed {completed[0]}/{len(cv_contents)}: {scored_cvs[index][3]}")
+    
+    # Match the CVs with the job description, several CVs per request and several requests at a time
+    results = matcher.match_job_to_cvs(job_content, cv_contents, on_result=report_progress)
+    if matcher.result_cache is not None:
+        print(matcher.result_cache.summary())
+    
+    for (cv_id, cv_name, cv_file, _), result in zip(scored_cvs, results):
+        # Store result with CV info
+        all_results.append({
+            'cv_id': cv_id,
+            'cv_name': cv_name,
+            'cv_file': cv_file,
+            'total_score': result.total_score,
+            'industry_knowledge_score': result.industry_knowledge_score,
+            'technical_skills_score': result.technical_skills_score,
+            'job_description_match_score': result.job_description_match_score,
+            'reasoning': result.reasoning
+        })
+    
     # Sort results by total score (highest first)
     all_results.sort(key=lambda x: x['total_score'], reverse=True)
     
@@ -314,16 +227,13 @@ def main():
                 # User entered a list number
                 job_file = job_list[int(choice)-1][0]
                 break
-            elif choice in [f.split('_')[2] for f in job_files if f.endswith('.docx') and f.startswith('job_description_') and len(f.split('_')) > 3]:
-                # User entered an ID
-                job_identifier = choice
-                break
-            elif choice in job_files or choice.replace('.pdf', '') in [f.replace('.pdf', '') for f in job_files]:
-                # User entered a filename
-                job_identifier = choice
+            
+            # User entered an ID or a filename
+            matching_files, _ = get_job_files(choice)
+            if matching_files:
+                job_identifier = matching_files[0]
                 break
-            else:
-                print("Invalid selection. Please try again.")
+            print("Invalid selection. Please try again.")
         except ValueError:
             print("Invalid input. Please try again.")
     
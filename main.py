@@ -2,31 +2,53 @@ import os
 import sys
 import gc
 import time
-from document_processor import load_cvs, load_job_descriptions
+import argparse
+from document_processor import iter_cvs, load_cvs, load_job_descriptions
 from matcher import CVJobMatcher, format_top_matches
-from config import GEMINI_API_KEY, OUTPUT_DIR, CV_DIR, JOB_DESCRIPTIONS_DIR
+from batch_jobs import BatchRunner, matrix_pairs
+from usage_meter import BudgetExceededError, get_usage_meter
+from config import GEMINI_API_KEY, SCORING_BACKEND, OUTPUT_DIR, CV_DIR, JOB_DESCRIPTIONS_DIR
 
 def main():
+    parser = argparse.ArgumentParser(description="Match all CVs with all job descriptions")
+    parser.add_argument("--batch", action="store_true",
+                        help="Score pending pairs offline through the Batch API before matching")
+    args = parser.parse_args()
+    
     start_time = time.time()
     try:
         # Check if API key is provided
-        if not GEMINI_API_KEY:
+        if SCORING_BACKEND == "gemini" and not GEMINI_API_KEY:
             print("Error: GEMINI_API_KEY is not set.")
             print("Please set your API key in the config.py file or as an environment variable.")
             sys.exit(1)
             
-        print("Loading CVs and job descriptions...")
-        cvs = load_cvs(CV_DIR)
+        print("Loading job descriptions...")
         job_descriptions = load_job_descriptions(JOB_DESCRIPTIONS_DIR)
         
-        print(f"Loaded {len(cvs)} CVs and {len(job_descriptions)} job descriptions.")
-        
         # Initialize the matcher
         matcher = CVJobMatcher()
         
-        # Match all CVs with all job descriptions
-        print("Starting the matching process using Gemini API...")
-        matches = matcher.match_all(cvs, job_descriptions)
+        if args.batch:
+            # Every pair is needed up front to build the batch input
+            cvs = load_cvs(CV_DIR)
+            print(f"Loaded {len(job_descriptions)} job descriptions and {len(cvs)} CVs.")
+            print("Submitting pending pairs to the Batch API...")
+            BatchRunner(matcher).run(matrix_pairs(cvs, job_descriptions))
+        else:
+            # CVs are streamed so matching starts on the first one instead of after all are parsed
+            cvs = iter_cvs(CV_DIR)
+            print(f"Loaded {len(job_descriptions)} job descriptions. CVs will be streamed from '{CV_DIR}'.")
+        
+        # Match all CVs with all job descriptions (after --batch, only pairs the batch could not score are sent)
+        print(f"Starting the matching process using the {SCORING_BACKEND} scoring backend...")
+        try:
+            matches = matcher.match_all(cvs, job_descriptions)
+        except BudgetExceededError as e:
+            print(f"Stopped matching: usage {e}.")
+            print(get_usage_meter().summary())
+            print("Pairs scored so far are kept in the result cache; run again with a higher budget to continue.")
+            return
         
         # Format and display the results
         results = format_top_matches(matches, top_n=5)
@@ -65,6 +87,8 @@ def main():
         print(f"\nTotal execution time: {int(hours)}h {int(minutes)}m {int(seconds)}s")
     
     finally:
+        # Save the token usage and cost of this run, even if it stopped early
+        print(f"Usage summary saved to '{get_usage_meter().write_summary()}'.")
         # Force garbage collection to clean up resources
         gc.collect()
         # Ensure proper termination
@@ -1,47 +1,209 @@
 import os
-from typing import Dict, List, Tuple
+import re
+from typing import Callable, Dict, List, Optional, Tuple, Iterable, Iterator, Union
 import numpy as np
 from tqdm import tqdm
-import requests
 import json
 import time
-import sys
+import asyncio
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, PrivateAttr, ValidationError
 
 from config import (
     GEMINI_API_KEY,
     MODEL_NAME,
     TEMPERATURE,
     MAX_TOKENS,
-    INDUSTRY_KNOWLEDGE_WEIGHT,
-    TECHNICAL_SKILLS_WEIGHT,
-    JOB_DESCRIPTION_MATCH_WEIGHT,
-    GEMINI_MODEL
+    SKIP_NEAR_DUPLICATES,
+    PROMPT_SECTIONS_ONLY,
+    CV_PROMPT_SECTIONS,
+    JOB_PROMPT_SECTIONS,
+    MATCH_BATCH_SIZE,
+    BATCH_MAX_TOKENS,
+    RESULT_CACHE_CLAIMS,
+    RESULT_CACHE_CLAIM_POLL,
+    SCORING_BACKEND,
+    SCORING_FALLBACK_BACKEND
 )
 from document_processor import load_cvs, load_job_descriptions
+from near_duplicates import RepresentativeHashes
+from document_sections import prompt_text, SEGMENTER_VERSION
+from rate_limiter import RateLimiter
+from context_cache import ContextCache, estimate_tokens
+from scoring_backends import GenerationRequest, ScoringBackend, get_scoring_backend
+from result_cache import ResultCache, get_result_cache, hash_text
+from single_flight import get_single_flight
+from circuit_breaker import CircuitOpenError
+from usage_meter import BudgetExceededError, TokenUsage, UsageMeter, get_usage_meter
+
+# Bump this whenever the user prompt template in CVJobMatcher.match or the response parsing changes
+PROMPT_TEMPLATE_VERSION = "3"
+# Same for the batched prompt built by CVJobMatcher._group_prompt
+BATCH_PROMPT_VERSION = "3"
 
 class MatchResult(BaseModel):
     """Data model for match results."""
-    industry_knowledge_score: float = Field(description="Score between 0 and 1 for industry knowledge")
-    technical_skills_score: float = Field(description="Score between 0 and 1 for technical skills")
-    job_description_match_score: float = Field(description="Score between 0 and 1 for overall job description match")
-    total_score: float = Field(description="Weighted total score between 0 and 1")
+    industry_knowledge_score: float = Field(ge=0.0, le=1.0, description="Score between 0 and 1 for industry knowledge")
+    technical_skills_score: float = Field(ge=0.0, le=1.0, description="Score between 0 and 1 for technical skills")
+    job_description_match_score: float = Field(ge=0.0, le=1.0, description="Score between 0 and 1 for overall job description match")
+    total_score: float = Field(ge=0.0, le=1.0, description="Weighted total score between 0 and 1")
     reasoning: str = Field(description="Reasoning for the scores")
+    # Why the pair could not be scored, on the zero-score stand-ins for failed calls and
+    # unparseable answers (not a field, so it is neither cached nor serialised)
+    _error: Optional[str] = PrivateAttr(default=None)
+    
+    class Config:
+        extra = "forbid"
+    
+    @property
+    def failed(self) -> bool:
+        """Whether this is a stand-in for a pair that could not be scored (it is not in the result cache)."""
+        return self._error is not None
+
+# Gemini structured output schemas (OpenAPI subset). The scores come before the
+# reasoning so they are generated first.
+_SCORE_FIELDS = ["industry_knowledge_score", "technical_skills_score", "job_description_match_score", "total_score"]
+_RESULT_PROPERTIES = dict(
+    {field: {"type": "NUMBER", "minimum": 0, "maximum": 1} for field in _SCORE_FIELDS},
+    reasoning={"type": "STRING"}
+)
+MATCH_RESPONSE_SCHEMA = {
+    "type": "OBJECT",
+    "properties": _RESULT_PROPERTIES,
+    "required": _SCORE_FIELDS + ["reasoning"],
+    "propertyOrdering": _SCORE_FIELDS + ["reasoning"]
+}
+GROUP_RESPONSE_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "results": {
+            "type": "ARRAY",
+            "items": {
+                "type": "OBJECT",
+                "properties": dict(item={"type": "INTEGER"}, **_RESULT_PROPERTIES),
+                "required": ["item"] + _SCORE_FIELDS + ["reasoning"],
+                "propertyOrdering": ["item"] + _SCORE_FIELDS + ["reasoning"]
+            }
+        }
+    },
+    "required": ["results"]
+}
+
+class MatchResultStream:
+    """
+    Incremental reader of a MatchResult JSON object that arrives in pieces.
+    
+    The response schema orders the scores before the reasoning, so the scores
+    are known as soon as the first few tokens have arrived; the reasoning
+    string is decoded as it grows.
+    """
+    _SCORE = re.compile(r'"(%s)"\s*:\s*(-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?)\s*[,}]' % "|".join(_SCORE_FIELDS))
+    _REASONING = re.compile(r'"reasoning"\s*:\s*"')
+    
+    def __init__(self):
+        """Initialize an empty stream."""
+        self.text = ""
+        self.scores = {}
+        self.reasoning = ""
+        self._scores_done = False
+        self._reasoning_pos = None
+        self._reasoning_done = False
+    
+    def feed(self, chunk: str) -> Tuple[Optional[Dict[str, float]], str]:
+        """
+        Add the next piece of the response text.
+        
+        Args:
+            chunk (str): Response text received since the last call
+            
+        Returns:
+            Tuple[Optional[Dict[str, float]], str]: The four scores if they became complete
+                with this piece (only once, and only if they are in range), and the newly
+                decoded reasoning text ("" if none)
+        """
+        self.text += chunk
+        scores = None
+        if not self._scores_done:
+            for match in self._SCORE.finditer(self.text):
+                self.scores[match.group(1)] = float(match.group(2))
+            if len(self.scores) == len(_SCORE_FIELDS):
+                self._scores_done = True
+                if all(0.0 <= score <= 1.0 for score in self.scores.values()):
+                    scores = dict(self.scores)
+        return scores, self._read_reasoning()
+    
+    def _read_reasoning(self) -> str:
+        """Decode the part of the reasoning string that has arrived completely."""
+        if self._reasoning_done:
+            return ""
+        text = self.text
+        if self._reasoning_pos is None:
+            match = self._REASONING.search(text)
+            if match is None:
+                return ""
+            self._reasoning_pos = match.end()
+        
+        start = i = self._reasoning_pos
+        while i < len(text):
+            char = text[i]
+            if char == '"':
+                self._reasoning_done = True
+                break
+            if char != "\\":
+                i += 1
+                continue
+            # Only consume complete escape sequences (\uXXXX, or a surrogate pair of them)
+            width = 2
+            if text[i + 1:i + 2] == "u":
+                width = 12 if text[i + 2:i + 4].lower() in ("d8", "d9", "da", "db") else 6
+            if i + width > len(text):
+                break
+            i += width
+        
+        self._reasoning_pos = i
+        try:
+            piece = json.loads(f'"{text[start:i]}"', strict=False)
+        except ValueError:
+            piece = text[start:i]
+        self.reasoning += piece
+        return piece
 
 class CVJobMatcher:
     """Class for matching CVs with job descriptions."""
     
-    def __init__(self, api_key: str = None):
+    def __init__(self, api_key: str = None, rate_limiter: RateLimiter = None, result_cache: ResultCache = None,
+                 context_cache: ContextCache = None, backend: ScoringBackend = None, usage_meter: UsageMeter = None,
+                 fallback_backend: ScoringBackend = None):
         """
         Initialize the CVJobMatcher with an API key.
         
         Args:
             api_key: API key to use (if None, will use the one from config)
+            rate_limiter: Limiter for API requests (if None, the one shared by all callers is used)
+            result_cache: Cache of scored pairs (if None, the shared one from config; disabled if RESULT_CACHE_ENABLED is False)
+            context_cache: Store for cached prompt prefixes (if None, the one from config; disabled if CONTEXT_CACHE_ENABLED is False)
+            backend: Model backend (if None, the one selected by SCORING_BACKEND; api_key, rate_limiter
+                and context_cache apply to the Gemini backend)
+            usage_meter: Token and cost tally with the run's budgets (if None, the one shared by this process)
+            fallback_backend: Backend used while the main backend's circuit breaker is open (if None, the one
+                selected by SCORING_FALLBACK_BACKEND; no fallback if that is not set)
         """
         self.api_key = api_key or GEMINI_API_KEY
-        self.api_call_count = 0
-        self.last_reset_time = time.time()
+        self.backend = backend if backend is not None else get_scoring_backend(self.api_key, rate_limiter, context_cache)
+        self.result_cache = result_cache if result_cache is not None else get_result_cache()
+        # With SKIP_NEAR_DUPLICATES, near-duplicate documents are cached (and coalesced) under their
+        # cluster representative's hash, so every entry point shares their results
+        self.near_duplicates = None
+        if SKIP_NEAR_DUPLICATES:
+            self.near_duplicates = {kind: RepresentativeHashes() for kind in ("cv", "job")}
+        if fallback_backend is None and SCORING_FALLBACK_BACKEND not in (None, SCORING_BACKEND):
+            fallback_backend = get_scoring_backend(backend=SCORING_FALLBACK_BACKEND)
+        self.fallback_backend = fallback_backend
+        # Concurrent requests for the same pair (from any matcher in this process) share one call
+        self.flights = get_single_flight()
+        self.usage_meter = usage_meter if usage_meter is not None else get_usage_meter()
         
         # Define the prompt template for matching
         self.system_prompt = """
@@ -104,16 +266,21 @@ class CVJobMatcher:
         - Any gaps or areas for development
         - Potential for growth and adaptation
         
-        Format your response as follows:
-        INDUSTRY_KNOWLEDGE_SCORE: [score between 0 and 1]
-        TECHNICAL_SKILLS_SCORE: [score between 0 and 1]
-        JOB_DESCRIPTION_MATCH_SCORE: [score between 0 and 1]
-        TOTAL_SCORE: [weighted total score between 0 and 1]
-        
-        REASONING:
-        [Your detailed reasoning for the scores]
+        Respond with a JSON object with these fields:
+        - industry_knowledge_score: score between 0 and 1
+        - technical_skills_score: score between 0 and 1
+        - job_description_match_score: score between 0 and 1
+        - total_score: weighted total score between 0 and 1
+        - reasoning: your detailed reasoning for the scores
         """
         
+        # Everything besides the two documents that shapes the prompt; part of the result cache key
+        prompt_settings = [PROMPT_TEMPLATE_VERSION, self.system_prompt]
+        if PROMPT_SECTIONS_ONLY:
+            prompt_settings += [SEGMENTER_VERSION, ",".join(CV_PROMPT_SECTIONS), ",".join(JOB_PROMPT_SECTIONS)]
+        self.prompt_version = hash_text("\n".join(prompt_settings))[:16]
+        self.batch_prompt_version = hash_text("\n".join(prompt_settings + ["batch", BATCH_PROMPT_VERSION]))[:16]
+        
     def match(self, cv_content: str, job_description: str) -> MatchResult:
         """
         Match a CV with a job description.
@@ -123,179 +290,823 @@ class CVJobMatcher:
             job_description (str): Content of the job description
             
         Returns:
-            MatchResult: The match result containing scores and reasoning
+            MatchResult: The match result containing scores and reasoning (a zero-score result
+                whose failed property is True if the pair could not be scored)
         """
+        # Pairs scored before (same texts, prompt and model settings) are answered from the cache
+        cached = self.cached_result(cv_content, job_description)
+        if cached is not None:
+            return cached
+        # A pair already being scored elsewhere is waited for, not sent again
+        return self._coalesce([(cv_content, job_description)], lambda pairs: [self._score_pair(*pairs[0])])[0]
+    
+    def representative(self, text: str, kind: str) -> str:
+        """The text hash a CV ("cv") or job description ("job") is cached as: its near-duplicate representative's."""
+        if self.near_duplicates is None:
+            return hash_text(text)
+        return self.near_duplicates[kind].representative(text)
+    
+    def representative_pair(self, cv_content: str, job_description: str) -> Tuple[str, str]:
+        """The (CV hash, job description hash) a pair is cached and coalesced as."""
+        return self.representative(cv_content, "cv"), self.representative(job_description, "job")
+    
+    def cached_result(self, cv_content: str, job_description: str, record_stats: bool = True) -> Optional[MatchResult]:
+        """Look a pair (or its near-duplicate representatives) up in the result cache; None on a miss."""
+        if self.result_cache is None:
+            return None
+        cv_hash, job_hash = self.representative_pair(cv_content, job_description)
+        keys = [self.result_cache.key_from_hashes(cv_hash, job_hash, version, self.backend.model_id, TEMPERATURE)
+                for version in (self.prompt_version, self.batch_prompt_version)]
         try:
-            # Create the prompt with CV and job description
-            user_content = f"""
-            ## CV:
-            {cv_content}
-            
-            ## Job Description:
-            {job_description}
+            cached = self.result_cache.lookup(keys, record_stats)
+            return MatchResult(**cached) if cached is not None else None
+        except Exception as e:
+            print(f"Error reading result cache: {e}")
+            return None
+    
+    def _flight_key(self, cv_content: str, job_description: str) -> Tuple[str, str, str, str, str]:
+        """Identity of a pair's scoring call, for coalescing (the single-pair result cache key)."""
+        return ResultCache.key_from_hashes(*self.representative_pair(cv_content, job_description), self.prompt_version,
+                                           self.backend.model_id, TEMPERATURE)
+    
+    def _coalesce(self, pairs: List[Tuple[str, str]],
+                  score: Callable[[List[Tuple[str, str]]], List[MatchResult]]) -> List[MatchResult]:
+        """
+        Score pairs, sharing the calls for pairs that are already being scored.
+        
+        Pairs in flight in this process are waited for. Of the rest, pairs claimed
+        in the result cache by another process (RESULT_CACHE_CLAIMS) are waited
+        for too, and the remaining ones are passed to `score` together.
+        
+        Args:
+            pairs (List[Tuple[str, str]]): (CV content, job description) pairs
+            score (Callable): Scores a list of pairs, returning results in the same order
             
-            Analyze the match between this CV and job description according to the criteria.
-            """
+        Returns:
+            List[MatchResult]: Results in the order of the pairs
+        """
+        keys = [self._flight_key(cv_content, job_description) for cv_content, job_description in pairs]
+        flights = [self.flights.begin(key) for key in keys]
+        led = [i for i, (leader, _) in enumerate(flights) if leader]
+        results = [None] * len(pairs)
+        error = None
+        try:
+            claims = RESULT_CACHE_CLAIMS and self.result_cache is not None
+            claimed = [i for i in led if self._claim(keys[i])] if claims else led
+            try:
+                # Another process may have stored the result just before releasing its claim
+                to_score = []
+                for i in claimed:
+                    results[i] = self.cached_result(*pairs[i], record_stats=False) if claims else None
+                    if results[i] is None:
+                        to_score.append(i)
+                if to_score:
+                    for i, result in zip(to_score, score([pairs[i] for i in to_score])):
+                        results[i] = result
+            finally:
+                if claims:
+                    for i in claimed:
+                        self._release_claim(keys[i])
+            for i in led:
+                if results[i] is None:
+                    results[i] = self._await_claim(pairs[i], keys[i], score)
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            for i in led:
+                if results[i] is not None:
+                    self.flights.finish(keys[i], results[i])
+                else:
+                    self.flights.finish(keys[i], error=error or RuntimeError("Scoring did not complete"))
+        
+        for i, (leader, future) in enumerate(flights):
+            if not leader:
+                results[i] = future.result()
+        return results
+    
+    def _await_claim(self, pair: Tuple[str, str], key: Tuple[str, str, str, str, str],
+                     score: Callable[[List[Tuple[str, str]]], List[MatchResult]]) -> MatchResult:
+        """Wait for a pair claimed by another process; score it here if the claim ends without a result."""
+        while True:
+            cached = self.cached_result(*pair, record_stats=False)
+            if cached is not None:
+                return cached
+            if self._claim(key):
+                try:
+                    cached = self.cached_result(*pair, record_stats=False)
+                    return cached if cached is not None else score([pair])[0]
+                finally:
+                    self._release_claim(key)
+            time.sleep(RESULT_CACHE_CLAIM_POLL)
+    
+    def _claim(self, key: Tuple[str, str, str, str, str]) -> bool:
+        """Claim a pair in the result cache; if the cache cannot be used, score it without a claim."""
+        try:
+            return self.result_cache.claim(key)
+        except Exception as e:
+            print(f"Error claiming in result cache: {e}")
+            return True
+    
+    def _release_claim(self, key: Tuple[str, str, str, str, str]):
+        """Release a claim taken by _claim."""
+        try:
+            self.result_cache.release_claim(key)
+        except Exception as e:
+            print(f"Error releasing result cache claim: {e}")
+    
+    def _store_result(self, cv_content: str, job_description: str, result: MatchResult, prompt_version: str,
+                      model_id: str = None):
+        """Save a successfully parsed result in the result cache (under the model that produced it)."""
+        if self.result_cache is None:
+            return
+        try:
+            key = self.result_cache.key_from_hashes(*self.representative_pair(cv_content, job_description),
+                                                    prompt_version, model_id or self.backend.model_id, TEMPERATURE)
+            self.result_cache.put(key, result.dict())
+        except Exception as e:
+            print(f"Error writing result cache: {e}")
+    
+    def _score_pair(self, cv_content: str, job_description: str, prefix_kind: str = "job") -> MatchResult:
+        """Score a single pair with the API (no cache lookup); prefix_kind is the document sent first."""
+        try:
+            prefix, user_content = self._pair_prompt(cv_content, job_description, prefix_kind)
             
             # Call Gemini API
-            text = self._call_gemini_api(user_content)
-            
-            # Extract scores from the response
-            lines = text.strip().split('\n')
-            
-            # Find the score lines 
-            industry_score_line = next((line for line in lines if 'INDUSTRY_KNOWLEDGE_SCORE' in line), None)
-            technical_score_line = next((line for line in lines if 'TECHNICAL_SKILLS_SCORE' in line), None)
-            job_match_score_line = next((line for line in lines if 'JOB_DESCRIPTION_MATCH_SCORE' in line), None)
-            total_score_line = next((line for line in lines if 'TOTAL_SCORE' in line), None)
+            text, model_id = self._generate(prefix, user_content, pairs=[(cv_content, job_description)])
             
-            # Extract scores
-            try:
-                industry_score = float(industry_score_line.split(':')[1].strip()) if industry_score_line else 0.0
-                technical_score = float(technical_score_line.split(':')[1].strip()) if technical_score_line else 0.0
-                description_score = float(job_match_score_line.split(':')[1].strip()) if job_match_score_line else 0.0
-                total = float(total_score_line.split(':')[1].strip()) if total_score_line else 0.0
-                
-                # Get the reasoning (everything after "REASONING:")
-                reasoning_idx = text.find("REASONING:")
-                reasoning = text[reasoning_idx + 10:] if reasoning_idx != -1 else "No reasoning provided."
-                
-                return MatchResult(
-                    industry_knowledge_score=industry_score,
-                    technical_skills_score=technical_score,
-                    job_description_match_score=description_score,
-                    total_score=total,
-                    reasoning=reasoning.strip()
-                )
-            except Exception as e:
-                print(f"Error parsing scores: {e}")
-                print(f"Raw text: {text}")
-                
-                # Calculate fallback total if needed
-                fallback_total = (
-                    INDUSTRY_KNOWLEDGE_WEIGHT * (industry_score if 'industry_score' in locals() else 0.0) +
-                    TECHNICAL_SKILLS_WEIGHT * (technical_score if 'technical_score' in locals() else 0.0) +
-                    JOB_DESCRIPTION_MATCH_WEIGHT * (description_score if 'description_score' in locals() else 0.0)
-                )
-                
-                return MatchResult(
-                    industry_knowledge_score=industry_score if 'industry_score' in locals() else 0.0,
-                    technical_skills_score=technical_score if 'technical_score' in locals() else 0.0,
-                    job_description_match_score=description_score if 'description_score' in locals() else 0.0,
-                    total_score=total if 'total' in locals() else fallback_total,
-                    reasoning="Error parsing the scores. Raw response: " + text[:200] + "..."
-                )
-                
+            result, valid = self.parse_response(text)
+            # Only valid results are cached; anything else is retried next time
+            if valid:
+                self._store_result(cv_content, job_description, result, self.prompt_version, model_id)
+            return result
+        
+        except BudgetExceededError:
+            raise
         except Exception as e:
             print(f"Error calling API: {e}")
-            return MatchResult(
+            return _error_result(e)
+    
+    def parse_response(self, text: str) -> Tuple[MatchResult, bool]:
+        """
+        Parse and validate a structured (JSON) response.
+        
+        Args:
+            text (str): Response text
+            
+        Returns:
+            Tuple[MatchResult, bool]: The result, and whether the response was valid
+                (an invalid response gives a zero-score result whose failed property is True)
+        """
+        try:
+            return MatchResult.parse_raw(text), True
+        except ValidationError as e:
+            print(f"Error parsing the response: {e}")
+            result = MatchResult(
                 industry_knowledge_score=0.0,
                 technical_skills_score=0.0,
                 job_description_match_score=0.0,
                 total_score=0.0,
-                reasoning=f"Error calling the API: {str(e)}"
+                reasoning="Error parsing the response. Raw response: " + text[:200] + "..."
             )
+            result._error = f"Invalid response: {e}"
+            return result, False
     
-    def _call_gemini_api(self, user_content: str) -> str:
-        """Call the Gemini API and return the response text."""
-        # Check if we need to pause for rate limiting (after 15 API calls)
-        current_time = time.time()
-        if current_time - self.last_reset_time >= 60:  # Reset counter every minute
-            self.api_call_count = 0
-            self.last_reset_time = current_time
+    def _parse_group_response(self, text: str) -> Dict[int, MatchResult]:
+        """
+        Parse and validate a structured response to a batched request.
+        
+        Args:
+            text (str): Response text
             
-        if self.api_call_count >= 15:
-            print("\n=== RATE LIMIT REACHED ===")
-            print("Pausing for 60 seconds to avoid API rate limiting...")
-            for remaining in range(60, 0, -1):
-                sys.stdout.write(f"\rResuming in {remaining} seconds...")
-                sys.stdout.flush()
-                time.sleep(1)
-            print("\nResuming processing...")
-            # Reset the counter after the pause
-            self.api_call_count = 0
-            self.last_reset_time = time.time()
-        
-        url = f"https://generativelanguage.googleapis.com/v1beta/models/{GEMINI_MODEL}:generateContent?key={self.api_key}"
-        
-        headers = {
-            'Content-Type': 'application/json'
-        }
+        Returns:
+            Dict[int, MatchResult]: Valid results by item number (invalid items are left out)
+        """
+        try:
+            items = json.loads(text)["results"]
+        except (ValueError, KeyError, TypeError) as e:
+            print(f"Error parsing the batched response: {e}")
+            return {}
+        
+        results = {}
+        for item in items:
+            try:
+                item = dict(item)
+                number = int(item.pop("item"))
+                results.setdefault(number, MatchResult.parse_obj(item))
+            except (ValueError, KeyError, TypeError) as e:
+                print(f"Error parsing a batched result: {e}")
+        return results
+    
+    def match_group(self, cv_contents: List[str], job_descriptions: List[str]) -> List[MatchResult]:
+        """
+        Score one job description against several CVs, or one CV against several job
+        descriptions, in a single request.
         
-        # Combine system prompt and user content for Gemini
-        combined_prompt = f"{self.system_prompt}\n\n{user_content}"
+        Cached pairs are not sent again. Items missing from (or unparseable in) the
+        batched answer are scored on their own.
         
-        data = {
-            "contents": [{
-                "parts": [{"text": combined_prompt}]
-            }],
-            "generationConfig": {
-                "temperature": TEMPERATURE,
-                "maxOutputTokens": MAX_TOKENS
-            }
-        }
+        Args:
+            cv_contents (List[str]): CV contents (a single CV when scoring against several jobs)
+            job_descriptions (List[str]): Job description contents (a single job when scoring several CVs)
+            
+        Returns:
+            List[MatchResult]: One result per CV, or per job description when a single CV is given
+        """
+        if len(job_descriptions) == 1:
+            pairs, by_job = [(cv, job_descriptions[0]) for cv in cv_contents], True
+        elif len(cv_contents) == 1:
+            pairs, by_job = [(cv_contents[0], job) for job in job_descriptions], False
+        else:
+            raise ValueError("match_group needs exactly one CV or exactly one job description")
+        
+        results = [self.cached_result(cv, job) for cv, job in pairs]
+        missing = [i for i, result in enumerate(results) if result is None]
+        if missing:
+            for i, result in zip(missing, self._score_group([pairs[i] for i in missing], by_job)):
+                results[i] = result
+        return results
+    
+    def _score_group(self, pairs: List[Tuple[str, str]], by_job: bool) -> List[MatchResult]:
+        """
+        Score pairs sharing one job (by_job) or one CV in a single request (no cache lookup).
+        
+        Pairs that are already being scored by another caller are not sent again;
+        their results are waited for.
+        
+        Args:
+            pairs (List[Tuple[str, str]]): (CV content, job description) pairs
+            by_job (bool): True if all pairs have the same job description, False if they share the CV
+            
+        Returns:
+            List[MatchResult]: Results in the order of the pairs
+        """
+        return self._coalesce(pairs, lambda owned: self._request_group(owned, by_job))
+    
+    def _request_group(self, pairs: List[Tuple[str, str]], by_job: bool) -> List[MatchResult]:
+        """
+        Send pairs sharing one job (by_job) or one CV in a single request.
+        
+        Args:
+            pairs (List[Tuple[str, str]]): (CV content, job description) pairs
+            by_job (bool): True if all pairs have the same job description, False if they share the CV
+            
+        Returns:
+            List[MatchResult]: Results in the order of the pairs
+        """
+        prefix_kind = "job" if by_job else "cv"
+        if len(pairs) == 1:
+            return [self._score_pair(*pairs[0], prefix_kind=prefix_kind)]
+        
+        try:
+            prefix, user_content = self._group_prompt(pairs, by_job)
+            text, model_id = self._generate(prefix, user_content, max_tokens=BATCH_MAX_TOKENS,
+                                            response_schema=GROUP_RESPONSE_SCHEMA, pairs=pairs)
+        except BudgetExceededError:
+            raise
+        except Exception as e:
+            print(f"Error calling API for a batch of {len(pairs)}: {e}")
+            return [_error_result(e) for _ in pairs]
+        
+        items = self._parse_group_response(text)
+        results = []
+        for number, (cv_content, job_description) in enumerate(pairs, 1):
+            result = items.get(number)
+            if result is not None:
+                self._store_result(cv_content, job_description, result, self.batch_prompt_version, model_id)
+                results.append(result)
+                continue
+            # Missing or invalid answer for this item: score it on its own
+            results.append(self._score_pair(cv_content, job_description, prefix_kind=prefix_kind))
+        return results
+    
+    def _pair_prompt(self, cv_content: str, job_description: str, prefix_kind: str = "job") -> Tuple[str, str]:
+        """Build the shared prefix and the per-request content of a single pair's request."""
+        # The shared document goes first so consecutive requests start with the same prefix
+        cv_block = self._document_block(cv_content, "cv")
+        job_block = self._document_block(job_description, "job")
+        prefix, rest = (cv_block, job_block) if prefix_kind == "cv" else (job_block, cv_block)
+        return prefix, f"{rest}\n\nAnalyze the match between this CV and job description according to the criteria."
+    
+    def request_payload(self, cv_content: str, job_description: str) -> Dict:
+        """
+        Build the complete generateContent request for a pair, e.g. for the Batch API.
+        
+        Args:
+            cv_content (str): Content of the CV
+            job_description (str): Content of the job description
+            
+        Returns:
+            Dict: Request body (system instruction and prompt inline, no cached context)
+        """
+        prefix, user_content = self._pair_prompt(cv_content, job_description)
+        return self.backend.request_payload(GenerationRequest(
+            system_prompt=self.system_prompt,
+            prefix=prefix,
+            user_content=user_content,
+            max_tokens=MAX_TOKENS,
+            response_schema=MATCH_RESPONSE_SCHEMA
+        ))
+    
+    def _document_block(self, text: str, kind: str) -> str:
+        """Render a CV ("cv") or job description ("job") for the prompt."""
+        if PROMPT_SECTIONS_ONLY:
+            # Leave out boilerplate such as company overviews and benefits
+            text = prompt_text(text, kind)
+        return f"## CV:\n{text}" if kind == "cv" else f"## Job Description:\n{text}"
+    
+    def _group_prompt(self, pairs: List[Tuple[str, str]], by_job: bool) -> Tuple[str, str]:
+        """Build the shared prefix and the per-request content of a batched request."""
+        reduce = prompt_text if PROMPT_SECTIONS_ONLY else (lambda text, kind: text)
+        if by_job:
+            prefix = self._document_block(pairs[0][1], "job")
+            parts = [f"## ITEM {i}: CV\n{reduce(cv, 'cv')}" for i, (cv, _) in enumerate(pairs, 1)]
+            task = (f"Analyze the match between this job description and each of the {len(pairs)} CVs "
+                    f"(ITEM 1 to ITEM {len(pairs)}) according to the criteria.")
+        else:
+            prefix = self._document_block(pairs[0][0], "cv")
+            parts = [f"## ITEM {i}: Job Description\n{reduce(job, 'job')}" for i, (_, job) in enumerate(pairs, 1)]
+            task = (f"Analyze the match between this CV and each of the {len(pairs)} job descriptions "
+                    f"(ITEM 1 to ITEM {len(pairs)}) according to the criteria.")
+        task += (" Score every item independently of the others. Respond with a JSON object whose "
+                 "results list has one entry per item: the item number followed by the fields "
+                 "described above. Keep each item's reasoning to at most about 150 words.")
+        return prefix, "\n\n".join(parts + [task])
+    
+    @contextmanager
+    def cached_context(self, text: str, kind: str):
+        """
+        Cache the system prompt plus a document as the prompt prefix while the block runs.
+        
+        Use it around a batch run that scores one job against many CVs ("job") or one CV
+        against many jobs ("cv"). Nested or concurrent uses for the same document share one
+        cache entry, which is kept alive while in use and deleted when the last user leaves.
+        
+        Args:
+            text (str): Content of the shared document
+            kind (str): "job" or "cv"
+        """
+        with self.backend.cached_context(self.system_prompt, self._document_block(text, kind)):
+            yield
+    
+    def _acquire_context(self, text: str, kind: str) -> Optional[str]:
+        """Take a reference to the backend's cached context of a document; returns its key (or None)."""
+        return self.backend.acquire_context(self.system_prompt, self._document_block(text, kind))
+    
+    def _release_context(self, key: str):
+        """Drop a reference taken by _acquire_context."""
+        self.backend.release_context(key)
+    
+    def _generate(self, prefix: str, user_content: str, max_tokens: int = MAX_TOKENS,
+                  response_schema: Dict = MATCH_RESPONSE_SCHEMA, pairs: List[Tuple[str, str]] = ()) -> Tuple[str, str]:
+        """
+        Send a prompt to the scoring backend and return the response text (JSON matching response_schema)
+        and the model ID of the backend that answered.
+        
+        While the backend's circuit breaker is open the fallback backend (if any) answers instead.
+        The tokens used are recorded in the usage meter against the (CV content, job description)
+        pairs the request scores; BudgetExceededError is raised instead of sending it once the
+        run's budget is used up.
+        """
+        request = GenerationRequest(
+            system_prompt=self.system_prompt,
+            prefix=prefix,
+            user_content=user_content,
+            max_tokens=max_tokens,
+            response_schema=response_schema
+        )
+        reservation = self._reserve_usage(request)
+        backend = self._pick_backend()
+        usage = None
+        
+        def record_discarded(discarded: TokenUsage):
+            # e.g. the slower of two hedged calls: its answer is dropped, its tokens are billed
+            self._settle_usage((0, 0.0), discarded, pairs, backend.model_id)
         
-        response = requests.post(url, headers=headers, data=json.dumps(data))
-        
-        if response.status_code != 200:
-            if response.status_code == 429:  # Rate limit error
-                print("\n=== RATE LIMIT REACHED ===")
-                print("Pausing for 60 seconds to avoid API rate limiting...")
-                for remaining in range(60, 0, -1):
-                    sys.stdout.write(f"\rResuming in {remaining} seconds...")
-                    sys.stdout.flush()
-                    time.sleep(1)
-                print("\nResuming processing...")
-                # Reset the counter after the pause
-                self.api_call_count = 0
-                self.last_reset_time = time.time()
-                # Retry the request
-                response = requests.post(url, headers=headers, data=json.dumps(data))
-            else:
-                raise Exception(f"Gemini API error: {response.status_code} - {response.text}")
-        
-        # Increment API call counter after successful call
-        self.api_call_count += 1
-        
-        response_json = response.json()
-        
-        # Extract the text from the response
         try:
-            return response_json["candidates"][0]["content"]["parts"][0]["text"]
-        except KeyError:
-            raise Exception(f"Unexpected Gemini API response format: {response_json}")
+            try:
+                text, usage = backend.generate_with_usage(request, on_discarded_usage=record_discarded)
+            except CircuitOpenError:
+                # The circuit opened after the backend was picked
+                if self.fallback_backend is None or backend is self.fallback_backend:
+                    raise
+                backend = self.fallback_backend
+                text, usage = backend.generate_with_usage(request, on_discarded_usage=record_discarded)
+            return text, backend.model_id
+        finally:
+            self._settle_usage(reservation, usage, pairs, backend.model_id)
+    
+    def _pick_backend(self) -> ScoringBackend:
+        """The backend to send a request to: the fallback while the main backend is failing fast."""
+        if self.fallback_backend is not None and not self.backend.available():
+            return self.fallback_backend
+        return self.backend
+    
+    def _reserve_usage(self, request: GenerationRequest) -> Tuple[int, float]:
+        """Wait for the usage budget to allow a request (raises BudgetExceededError at a "stop" budget)."""
+        prompt_tokens = estimate_tokens(request.system_prompt + request.prefix + request.user_content)
+        return self.usage_meter.reserve(prompt_tokens, self.backend.model_id)
     
-    def match_all(self, cvs: Dict[str, str], job_descriptions: Dict[str, str]) -> Dict[str, List[Tuple[str, MatchResult]]]:
+    def _settle_usage(self, reservation: Tuple[int, float], usage: Optional[TokenUsage],
+                      pairs: List[Tuple[str, str]], model_id: str):
+        """Record the tokens a request used against the pairs it scored."""
+        documents = [(hash_text(cv_content), hash_text(job_description)) for cv_content, job_description in pairs]
+        self.usage_meter.settle(reservation, usage, model_id, documents)
+    
+    def match_stream(self, cv_content: str, job_description: str,
+                     on_scores: Callable[[Dict[str, float]], None] = None,
+                     on_reasoning: Callable[[str], None] = None) -> MatchResult:
+        """
+        Match a CV with a job description, reporting the answer while it is generated.
+        
+        The response is streamed: on_scores is called as soon as the four scores
+        have arrived (they come first), then on_reasoning with each new piece of
+        the reasoning. A cached pair, or a backend without streaming, reports
+        everything at once. Uses the same prompt and result cache as match().
+        
+        If the stream breaks off or its answer cannot be validated, the result is
+        a stand-in whose failed property is True; it is not reported through the
+        callbacks, and whatever was streamed before should be discarded.
+        
+        Args:
+            cv_content (str): Content of the CV
+            job_description (str): Content of the job description
+            on_scores (Callable[[Dict[str, float]], None], optional): Called once with the scores by field name
+            on_reasoning (Callable[[str], None], optional): Called with each new piece of the reasoning
+            
+        Returns:
+            MatchResult: The complete result (check failed before trusting what was streamed)
+        """
+        scores_reported = False
+        reasoning_reported = False
+        
+        def stream_pair(pairs):
+            nonlocal scores_reported, reasoning_reported
+            stream = MatchResultStream()
+            usage = []
+            try:
+                prefix, user_content = self._pair_prompt(*pairs[0])
+                request = GenerationRequest(system_prompt=self.system_prompt, prefix=prefix, user_content=user_content,
+                                            max_tokens=MAX_TOKENS, response_schema=MATCH_RESPONSE_SCHEMA)
+                reservation = self._reserve_usage(request)
+                backend = self._pick_backend()
+                try:
+                    for chunk in backend.generate_stream(request, on_usage=usage.append):
+                        scores, reasoning = stream.feed(chunk)
+                        if scores is not None and on_scores is not None:
+                            on_scores(scores)
+                            scores_reported = True
+                        if reasoning and on_reasoning is not None:
+                            on_reasoning(reasoning)
+                            reasoning_reported = True
+                finally:
+                    self._settle_usage(reservation, usage[-1] if usage else None, pairs, backend.model_id)
+                
+                result, valid = self.parse_response(stream.text)
+                if valid:
+                    self._store_result(*pairs[0], result, self.prompt_version, backend.model_id)
+                return [result]
+            except BudgetExceededError:
+                raise
+            except Exception as e:
+                print(f"Error calling API: {e}")
+                return [_error_result(e)]
+        
+        result = self.cached_result(cv_content, job_description)
+        if result is None:
+            # If the pair is already being scored elsewhere, its result is reported when it arrives
+            result = self._coalesce([(cv_content, job_description)], stream_pair)[0]
+        
+        if result.failed:
+            return result
+        if on_scores is not None and not scores_reported:
+            on_scores({field: getattr(result, field) for field in _SCORE_FIELDS})
+        if on_reasoning is not None and not reasoning_reported:
+            on_reasoning(result.reasoning)
+        return result
+    
+    async def match_async(self, cv_content: str, job_description: str,
+                          executor: ThreadPoolExecutor = None) -> MatchResult:
+        """
+        Match a CV with a job description without blocking the event loop.
+        
+        The blocking HTTP call runs in a worker thread; concurrency is bounded by
+        the caller (see match_many_async).
+        
+        Args:
+            cv_content (str): Content of the CV
+            job_description (str): Content of the job description
+            executor (ThreadPoolExecutor, optional): Thread pool to run the request in
+                (default: the event loop's default executor)
+            
+        Returns:
+            MatchResult: The match result containing scores and reasoning
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, self.match, cv_content, job_description)
+    
+    async def match_many_async(self, pairs: Iterable[Tuple[str, str]], max_concurrency: int = None,
+                               on_result: Optional[Callable[[int, MatchResult], None]] = None) -> List[MatchResult]:
+        """
+        Match many (CV content, job description) pairs with at most max_concurrency requests in flight.
+        
+        Args:
+            pairs: Iterable of (CV content, job description) tuples
+            max_concurrency (int, optional): Concurrent request limit (default: the backend's limit, e.g. ADAPTIVE_CONCURRENCY_MAX for Gemini)
+            on_result (Callable[[int, MatchResult], None], optional): Called with the pair index and
+                result as each pair finishes
+            
+        Returns:
+            List[MatchResult]: Results in the same order as the pairs
+        """
+        max_concurrency = max(1, max_concurrency or self.backend.max_concurrency)
+        semaphore = asyncio.Semaphore(max_concurrency)
+        
+        with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+            async def run(index, cv_content, job_description):
+                async with semaphore:
+                    result = await self.match_async(cv_content, job_description, executor)
+                if on_result is not None:
+                    on_result(index, result)
+                return result
+            
+            return await asyncio.gather(*(run(i, cv, job) for i, (cv, job) in enumerate(pairs)))
+    
+    def match_many(self, pairs: Iterable[Tuple[str, str]], max_concurrency: int = None,
+                   on_result: Optional[Callable[[int, MatchResult], None]] = None) -> List[MatchResult]:
+        """
+        Blocking wrapper around match_many_async for synchronous callers.
+        
+        Args:
+            pairs: Iterable of (CV content, job description) tuples
+            max_concurrency (int, optional): Concurrent request limit (default: the backend's limit, e.g. ADAPTIVE_CONCURRENCY_MAX for Gemini)
+            on_result (Callable[[int, MatchResult], None], optional): Called as each pair finishes
+            
+        Returns:
+            List[MatchResult]: Results in the same order as the pairs
+        """
+        return asyncio.run(self.match_many_async(pairs, max_concurrency, on_result))
+    
+    async def _match_fanout_async(self, cv_contents: List[str], job_descriptions: List[str], batch_size: int = None,
+                                  max_concurrency: int = None,
+                                  on_result: Optional[Callable[[int, MatchResult], None]] = None) -> List[MatchResult]:
+        """Score one job against many CVs (or one CV against many jobs) in groups of batch_size per request."""
+        if len(job_descriptions) == 1:
+            pairs, by_job = [(cv, job_descriptions[0]) for cv in cv_contents], True
+        else:
+            pairs, by_job = [(cv_contents[0], job) for job in job_descriptions], False
+        batch_size = max(1, batch_size or MATCH_BATCH_SIZE)
+        max_concurrency = max(1, max_concurrency or self.backend.max_concurrency)
+        semaphore = asyncio.Semaphore(max_concurrency)
+        loop = asyncio.get_running_loop()
+        
+        results = [self.cached_result(cv, job) for cv, job in pairs]
+        for index, result in enumerate(results):
+            if result is not None and on_result is not None:
+                on_result(index, result)
+        # Only cache misses are grouped, so every request carries a full batch where possible;
+        # near duplicates (same representative hashes) are scored once, as the first of them
+        missing = {}
+        for index, result in enumerate(results):
+            if result is None:
+                missing.setdefault(self.representative_pair(*pairs[index]), []).append(index)
+        distinct = [pairs[indices[0]] for indices in missing.values()]
+        indices = list(missing.values())
+        groups = [(distinct[start:start + batch_size], indices[start:start + batch_size])
+                  for start in range(0, len(distinct), batch_size)]
+        
+        with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+            # Every request starts with the shared document: cache it (with the system prompt) while the
+            # groups run, unless a single request is left to send
+            context_key = None
+            if len(groups) > 1:
+                shared, kind = (job_descriptions[0], "job") if by_job else (cv_contents[0], "cv")
+                context_key = await loop.run_in_executor(executor, self._acquire_context, shared, kind)
+            
+            async def run(group):
+                group_pairs, group_indices = group
+                async with semaphore:
+                    group_results = await loop.run_in_executor(executor, self._score_group, group_pairs, by_job)
+                for pair_indices, result in zip(group_indices, group_results):
+                    for index in pair_indices:
+                        results[index] = result
+                        if on_result is not None:
+                            on_result(index, result)
+            
+            try:
+                await asyncio.gather(*(run(group) for group in groups))
+            finally:
+                if context_key is not None:
+                    await loop.run_in_executor(executor, self._release_context, context_key)
+        return results
+    
+    def match_job_to_cvs(self, job_description: str, cv_contents: List[str], batch_size: int = None,
+                         max_concurrency: int = None,
+                         on_result: Optional[Callable[[int, MatchResult], None]] = None) -> List[MatchResult]:
+        """
+        Score one job description against many CVs, several CVs per request.
+        
+        Args:
+            job_description (str): Content of the job description
+            cv_contents (List[str]): Contents of the CVs
+            batch_size (int, optional): CVs per request (default: MATCH_BATCH_SIZE; 1 scores each CV on its own)
+            max_concurrency (int, optional): Concurrent request limit (default: the backend's limit, e.g. ADAPTIVE_CONCURRENCY_MAX for Gemini)
+            on_result (Callable[[int, MatchResult], None], optional): Called with the CV index and
+                result as each CV is scored
+            
+        Returns:
+            List[MatchResult]: Results in the same order as the CVs
+        """
+        if not cv_contents:
+            return []
+        self.backend.warm_up()
+        # The system prompt and job description are cached once for the whole run when more than one
+        # request is needed
+        return asyncio.run(self._match_fanout_async(cv_contents, [job_description], batch_size,
+                                                    max_concurrency, on_result))
+    
+    def match_cv_to_jobs(self, cv_content: str, job_descriptions: List[str], batch_size: int = None,
+                         max_concurrency: int = None,
+                         on_result: Optional[Callable[[int, MatchResult], None]] = None) -> List[MatchResult]:
+        """
+        Score one CV against many job descriptions, several job descriptions per request.
+        
+        Args:
+            cv_content (str): Content of the CV
+            job_descriptions (List[str]): Contents of the job descriptions
+            batch_size (int, optional): Job descriptions per request (default: MATCH_BATCH_SIZE)
+            max_concurrency (int, optional): Concurrent request limit (default: the backend's limit, e.g. ADAPTIVE_CONCURRENCY_MAX for Gemini)
+            on_result (Callable[[int, MatchResult], None], optional): Called with the job index and
+                result as each job description is scored
+            
+        Returns:
+            List[MatchResult]: Results in the same order as the job descriptions
+        """
+        if not job_descriptions:
+            return []
+        self.backend.warm_up()
+        return asyncio.run(self._match_fanout_async([cv_content], job_descriptions, batch_size,
+                                                    max_concurrency, on_result))
+    
+    def match_all(self, cvs: Union[Dict[str, str], Iterable[Tuple]], job_descriptions: Union[Dict[str, str], Iterable[Tuple]],
+                  max_concurrency: int = None) -> Dict[str, List[Tuple[str, MatchResult]]]:
         """
         Match all CVs with all job descriptions and return top matches for each job.
         
+        CVs may be given as a dictionary or streamed as (ID, content, ...) tuples,
+        e.g. from document_processor.iter_cvs; scoring then starts as soon as the
+        first CV is extracted, and the stream is only read ahead as far as the
+        concurrency limit allows. Job descriptions are materialised since every
+        CV is scored against all of them, MATCH_BATCH_SIZE job descriptions per request.
+        
+        With SKIP_NEAR_DUPLICATES enabled, a CV or job description that is a near
+        duplicate of one seen earlier is not sent to the API again; it gets the
+        results of its cluster representative.
+        
+        Token usage is recorded in the usage meter under the CV and job IDs.
+        
         Args:
-            cvs (Dict[str, str]): Dictionary of CV IDs to CV content
-            job_descriptions (Dict[str, str]): Dictionary of job description IDs to job description content
+            cvs: Dictionary of CV IDs to CV content, or an iterable of (CV ID, content, ...) tuples
+            job_descriptions: Dictionary of job description IDs to job description content,
+                or an iterable of (job ID, content, ...) tuples
+            max_concurrency (int, optional): Concurrent request limit (default: the backend's limit, e.g. ADAPTIVE_CONCURRENCY_MAX for Gemini)
             
         Returns:
             Dict[str, List[Tuple[str, MatchResult]]]: Dictionary mapping job IDs to list of (CV ID, match result) tuples
+            
+        Raises:
+            BudgetExceededError: If the usage budget ran out (pairs scored so far stay in the result cache)
         """
-        results = {}
+        self.backend.warm_up()
+        return asyncio.run(self._match_all_async(cvs, job_descriptions, max_concurrency))
+    
+    async def _match_all_async(self, cvs, job_descriptions, max_concurrency: int = None) -> Dict[str, List[Tuple[str, MatchResult]]]:
+        """Async implementation of match_all."""
+        jobs = dict(_iter_corpus(job_descriptions))
+        results = {job_id: [] for job_id in jobs}
+        for job_id, job_desc in jobs.items():
+            self.usage_meter.label("job", hash_text(job_desc), job_id)
         
-        total_comparisons = len(cvs) * len(job_descriptions)
+        # Near duplicates share the scores of their representatives; scores are keyed by the representatives'
+        # text hashes, and each cluster is scored as its first document
+        job_representatives = {job_id: self.representative(job_desc, "job") for job_id, job_desc in jobs.items()}
+        scored_jobs = {}
+        for job_id, job_hash in job_representatives.items():
+            scored_jobs.setdefault(job_hash, jobs[job_id])
+        cv_scores = {}
+        cv_order = []
+        skipped = 0
+        stopped = None
+        
+        total_comparisons = len(cvs) * len(jobs) if isinstance(cvs, dict) else None
         progress = tqdm(total=total_comparisons, desc="Matching CVs with Jobs")
         
-        for job_id, job_desc in job_descriptions.items():
-            job_results = []
+        max_concurrency = max(1, max_concurrency or self.backend.max_concurrency)
+        batch_size = max(1, MATCH_BATCH_SIZE)
+        semaphore = asyncio.Semaphore(max_concurrency)
+        loop = asyncio.get_running_loop()
+        tasks = []
+        
+        with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+            async def score(cv_content, group, scores):
+                try:
+                    group_results = await loop.run_in_executor(
+                        executor, self._score_group, [(cv_content, scored_jobs[job_hash]) for job_hash in group], False)
+                    scores.update(zip(group, group_results))
+                finally:
+                    semaphore.release()
+                    progress.update(len(group))
             
-            for cv_id, cv_content in cvs.items():
-                match_result = self.match(cv_content, job_desc)
-                job_results.append((cv_id, match_result))
-                progress.update(1)
+            async def release_context(key, cv_tasks):
+                await asyncio.gather(*cv_tasks)
+                await loop.run_in_executor(executor, self._release_context, key)
             
-            # Sort by total score in descending order
-            job_results.sort(key=lambda x: x[1].total_score, reverse=True)
-            results[job_id] = job_results
+            for cv_id, cv_content in _iter_corpus(cvs):
+                stopped = self.usage_meter.stopped
+                if stopped is not None:
+                    break  # Budget used up: stop reading CVs
+                self.usage_meter.label("cv", hash_text(cv_content), cv_id)
+                # Only the hash is kept: the CV text is released once its requests are sent
+                cv_hash = self.representative(cv_content, "cv")
+                if cv_hash not in cv_scores:
+                    scores = cv_scores[cv_hash] = {}
+                    missing = []
+                    for job_hash, job_desc in scored_jobs.items():
+                        cached = self.cached_result(cv_content, job_desc)
+                        if cached is not None:
+                            scores[job_hash] = cached
+                            progress.update(1)
+                        else:
+                            missing.append(job_hash)
+                    # Every request for this CV starts with the CV: cache it while its groups run
+                    context_key = None
+                    if len(missing) > batch_size:
+                        context_key = await loop.run_in_executor(executor, self._acquire_context, cv_content, "cv")
+                    cv_tasks = []
+                    for start in range(0, len(missing), batch_size):
+                        # Wait for a free slot before reading further into the stream
+                        await semaphore.acquire()
+                        cv_tasks.append(asyncio.ensure_future(
+                            score(cv_content, missing[start:start + batch_size], scores)))
+                    tasks.extend(cv_tasks)
+                    if context_key is not None:
+                        tasks.append(asyncio.ensure_future(release_context(context_key, cv_tasks)))
+                    reused = len(jobs) - len(scored_jobs)
+                else:
+                    reused = len(jobs)
+                cv_order.append((cv_id, cv_hash))
+                skipped += reused
+                progress.update(reused)
+            
+            # Let every task finish before raising, e.g. after BudgetExceededError
+            outcomes = await asyncio.gather(*tasks, return_exceptions=True)
         
         progress.close()
+        for outcome in outcomes:
+            if isinstance(outcome, BaseException):
+                raise outcome
+        if stopped is not None:
+            raise BudgetExceededError(stopped)
+        
+        for cv_id, cv_hash in cv_order:
+            scores = cv_scores[cv_hash]
+            for job_id in jobs:
+                results[job_id].append((cv_id, scores[job_representatives[job_id]]))
+        
+        # Sort by total score in descending order
+        for job_results in results.values():
+            job_results.sort(key=lambda x: x[1].total_score, reverse=True)
+        
+        if skipped:
+            print(f"Reused results for {skipped} comparisons of near-duplicate documents")
+        if self.result_cache is not None:
+            print(self.result_cache.summary())
+        backend_summary = self.backend.summary()
+        if backend_summary is not None:
+            print(backend_summary)
+        print(self.usage_meter.summary())
         return results
 
+def _error_result(error: Exception) -> MatchResult:
+    """Zero-score result reported when the API call fails (its failed property is True)."""
+    result = MatchResult(
+        industry_knowledge_score=0.0,
+        technical_skills_score=0.0,
+        job_description_match_score=0.0,
+        total_score=0.0,
+        reasoning=f"Error calling the API: {str(error)}"
+    )
+    result._error = str(error)
+    return result
+
+def _iter_corpus(corpus: Union[Dict[str, str], Iterable[Tuple]]) -> Iterator[Tuple[str, str]]:
+    """Yield (ID, content) pairs from a dictionary or a stream of (ID, content, ...) tuples."""
+    if isinstance(corpus, dict):
+        yield from corpus.items()
+    else:
+        for item in corpus:
+            yield item[0], item[1]
+
 def format_top_matches(matches: Dict[str, List[Tuple[str, MatchResult]]], top_n: int = 5) -> str:
     """
     Format the top matches for each job in a readable format.
@@ -0,0 +1,484 @@
+"""
+Local stand-in for the Gemini generateContent API, for offline benchmarking.
+
+The server answers generateContent (and streamGenerateContent, as server-sent
+events) with deterministic, correctly formatted scores: a single MatchResult,
+or one result per "## ITEM n" block when the request asks for the batched
+results schema. The same request always gets the
+same scores, so runs are reproducible without network access or an API key.
+
+To make performance tests realistic it can
+- delay responses (fixed, uniform, normal or lognormal latency, seeded),
+- fail a share of requests with 429 (with Retry-After and RetryInfo) or 500/503,
+- enforce a requests-per-minute quota like the real API (429 over the limit),
+  and optionally a limit on concurrent requests,
+- serve cachedContents (create, get, touch, delete) so explicit context
+  caching works against it.
+
+GET /stats returns request counters; POST /stats/reset clears them.
+
+Usage:
+    python mock_gemini_server.py --port 8765 --latency lognormal --latency-mean 1.5 --rpm 60
+    GEMINI_API_BASE_URL=http://127.0.0.1:8765/v1beta python main.py
+"""
+import re
+import json
+import math
+import time
+import random
+import hashlib
+import itertools
+import threading
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from config import (
+    INDUSTRY_KNOWLEDGE_WEIGHT,
+    TECHNICAL_SKILLS_WEIGHT,
+    JOB_DESCRIPTION_MATCH_WEIGHT
+)
+
+LATENCY_DISTRIBUTIONS = ("none", "fixed", "uniform", "normal", "lognormal")
+
+_MODEL_METHOD = re.compile(r"/models/([^/:]+):(\w+)$")
+_CACHED_CONTENT = re.compile(r"/(cachedContents/[^/:]+)$")
+_ITEM_HEADER = re.compile(r"^## ITEM (\d+):", re.MULTILINE)
+
+def _parse_ttl(value: Any, default: float = 3600.0) -> float:
+    """Parse a "300s" duration into seconds."""
+    match = re.match(r"^\s*(\d+(?:\.\d+)?)s?\s*$", str(value)) if value is not None else None
+    return float(match.group(1)) if match else default
+
+def _texts(contents: List[Dict[str, Any]]) -> List[str]:
+    """Text parts of a list of contents, in order."""
+    return [part.get("text", "") for content in contents or [] for part in content.get("parts", [])]
+
+def _score(seed_text: str) -> Dict[str, Any]:
+    """Deterministic MatchResult fields derived from a hash of seed_text."""
+    digest = hashlib.sha256(seed_text.encode("utf-8")).digest()
+    industry, technical, description = (round(b / 255, 2) for b in digest[:3])
+    total = (INDUSTRY_KNOWLEDGE_WEIGHT * industry + TECHNICAL_SKILLS_WEIGHT * technical
+             + JOB_DESCRIPTION_MATCH_WEIGHT * description)
+    return {
+        "industry_knowledge_score": industry,
+        "technical_skills_score": technical,
+        "job_description_match_score": description,
+        "total_score": round(min(1.0, total), 2),
+        "reasoning": "Deterministic score from the mock Gemini server."
+    }
+
+def mock_answer(system_instruction: str, texts: List[str], response_schema: Optional[Dict[str, Any]]) -> str:
+    """
+    Build the model answer for a prompt.
+
+    With a schema that has a "results" array, every "## ITEM n" block of the
+    prompt gets its own result, scored from the shared text plus that block (so
+    a pair gets the same scores whichever batch it is sent in).
+
+    Args:
+        system_instruction (str): System prompt
+        texts (List[str]): Prompt text parts (cached prefix first)
+        response_schema (Dict[str, Any], optional): generationConfig.responseSchema
+
+    Returns:
+        str: JSON answer
+    """
+    prompt = "\n".join(texts)
+    properties = (response_schema or {}).get("properties", {})
+    if "results" not in properties:
+        return json.dumps(_score(system_instruction + prompt))
+
+    headers = list(_ITEM_HEADER.finditer(prompt))
+    shared = prompt[:headers[0].start()] if headers else prompt
+    results = []
+    for i, header in enumerate(headers):
+        end = headers[i + 1].start() if i + 1 < len(headers) else len(prompt)
+        block = prompt[header.end():end]
+        if i + 1 == len(headers):
+            # Leave out the task paragraph after the last item so it does not change the score
+            block = block.rsplit("\n\n", 1)[0]
+        results.append(dict(item=int(header.group(1)), **_score(system_instruction + shared + block.strip())))
+    return json.dumps({"results": results})
+
+class MockGeminiServer(ThreadingHTTPServer):
+    """Threaded HTTP server holding the mock's settings, quota window, cached contents and counters."""
+
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int] = ("127.0.0.1", 8765), latency: str = "none",
+                 latency_mean: float = 0.5, latency_spread: float = 0.25, error_rate_429: float = 0.0,
+                 error_rate_5xx: float = 0.0, retry_after: float = 1.0, rpm: Optional[float] = None,
+                 max_in_flight: Optional[int] = None,
+                 stream_chunk_chars: int = 40, stream_chunk_delay: float = 0.02, seed: Optional[int] = 0,
+                 verbose: bool = False):
+        """
+        Initialize the server (call serve_forever() or start() to run it).
+
+        Args:
+            address (Tuple[str, int]): Host and port (port 0 picks a free one)
+            latency (str): "none", "fixed", "uniform", "normal" or "lognormal"
+            latency_mean (float): Mean response delay in seconds
+            latency_spread (float): Half-width (uniform), standard deviation (normal) or
+                sigma of the underlying normal (lognormal)
+            error_rate_429 (float): Share of requests answered with 429 RESOURCE_EXHAUSTED
+            error_rate_5xx (float): Share of requests answered with 500 or 503
+            retry_after (float): Seconds suggested in injected 429 responses
+            rpm (float, optional): Requests per minute accepted (sliding window), None for no quota
+            max_in_flight (int, optional): Concurrent requests accepted; more get 429 (None for no limit)
+            stream_chunk_chars (int): Characters per streamGenerateContent chunk
+            stream_chunk_delay (float): Seconds between streamed chunks (the latency applies to the first)
+            seed (int, optional): Seed for latency and fault injection (None for a random run)
+            verbose (bool): Log every request
+        """
+        if latency not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"latency must be one of {', '.join(LATENCY_DISTRIBUTIONS)}")
+        super().__init__(address, MockGeminiHandler)
+        self.latency = latency
+        self.latency_mean = latency_mean
+        self.latency_spread = latency_spread
+        self.error_rate_429 = error_rate_429
+        self.error_rate_5xx = error_rate_5xx
+        self.retry_after = retry_after
+        self.rpm = rpm
+        self.max_in_flight = max_in_flight
+        self.stream_chunk_chars = max(1, stream_chunk_chars)
+        self.stream_chunk_delay = stream_chunk_delay
+        self.verbose = verbose
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._window = deque()
+        self._cached = {}
+        self._cache_ids = itertools.count(1)
+        self._thread = None
+        self._delays = []
+        self.reset_stats()
+
+    @property
+    def base_url(self) -> str:
+        """Value for GEMINI_API_BASE_URL."""
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1beta"
+
+    def reset_stats(self):
+        """Clear the request counters."""
+        with self._lock:
+            self.stats = {"requests": 0, "ok": 0, "rate_limited": 0, "over_capacity": 0, "injected_429": 0, "injected_5xx": 0,
+                          "items": 0, "cache_hits": 0, "in_flight": 0, "max_in_flight": 0}
+            self._delays = []
+
+    def count(self, name: str, amount: int = 1):
+        with self._lock:
+            self.stats[name] += amount
+            if name == "in_flight":
+                self.stats["max_in_flight"] = max(self.stats["max_in_flight"], self.stats["in_flight"])
+
+    def stats_snapshot(self) -> Dict[str, Any]:
+        """Counters, plus the median and 95th percentile of the injected delays."""
+        with self._lock:
+            delays = sorted(self._delays)
+            snapshot = dict(self.stats, cached_contents=len(self._cached))
+        snapshot["latency_p50"] = delays[len(delays) // 2] if delays else 0.0
+        snapshot["latency_p95"] = delays[min(len(delays) - 1, int(len(delays) * 0.95))] if delays else 0.0
+        return snapshot
+
+    def sample_latency(self) -> float:
+        """Draw a response delay from the configured distribution."""
+        with self._lock:
+            if self.latency == "none":
+                delay = 0.0
+            elif self.latency == "fixed":
+                delay = self.latency_mean
+            elif self.latency == "uniform":
+                delay = self._random.uniform(self.latency_mean - self.latency_spread,
+                                             self.latency_mean + self.latency_spread)
+            elif self.latency == "normal":
+                delay = self._random.gauss(self.latency_mean, self.latency_spread)
+            else:
+                # Parameterised so the mean of the delay is latency_mean
+                mu = math.log(max(self.latency_mean, 1e-6)) - self.latency_spread ** 2 / 2
+                delay = self._random.lognormvariate(mu, self.latency_spread)
+            delay = max(0.0, delay)
+            self._delays.append(delay)
+        return delay
+
+    def admit(self) -> Tuple[Optional[int], Optional[float]]:
+        """
+        Decide whether a generateContent request fails.
+
+        Returns:
+            Tuple[Optional[int], Optional[float]]: Error status (None to answer normally) and Retry-After seconds
+        """
+        now = time.monotonic()
+        with self._lock:
+            if self.max_in_flight and self.stats["in_flight"] > self.max_in_flight:
+                self.stats["over_capacity"] += 1
+                return 429, self.retry_after
+            if self.rpm:
+                while self._window and now - self._window[0] >= 60.0:
+                    self._window.popleft()
+                if len(self._window) >= self.rpm:
+                    self.stats["rate_limited"] += 1
+                    return 429, max(0.0, 60.0 - (now - self._window[0]))
+                self._window.append(now)
+            draw = self._random.random()
+            if draw < self.error_rate_429:
+                self.stats["injected_429"] += 1
+                return 429, self.retry_after
+            if draw < self.error_rate_429 + self.error_rate_5xx:
+                self.stats["injected_5xx"] += 1
+                return self._random.choice((500, 503)), None
+        return None, None
+
+    def create_cached_content(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        with self._lock:
+            name = f"cachedContents/mock-{next(self._cache_ids)}"
+            self._cached[name] = dict(body, name=name, expires=time.time() + _parse_ttl(body.get("ttl")))
+            return self._public_cached_content(self._cached[name])
+
+    def get_cached_content(self, name: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._cached.get(name)
+            if entry is None or entry["expires"] < time.time():
+                self._cached.pop(name, None)
+                return None
+            return entry
+
+    def update_cached_content(self, name: str, body: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        entry = self.get_cached_content(name)
+        if entry is None:
+            return None
+        with self._lock:
+            entry["expires"] = time.time() + _parse_ttl(body.get("ttl"))
+            return self._public_cached_content(entry)
+
+    def delete_cached_content(self, name: str) -> bool:
+        with self._lock:
+            return self._cached.pop(name, None) is not None
+
+    @staticmethod
+    def _public_cached_content(entry: Dict[str, Any]) -> Dict[str, Any]:
+        expire_time = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(entry["expires"]))
+        return {"name": entry["name"], "model": entry.get("model"), "expireTime": expire_time}
+
+    def start(self) -> threading.Thread:
+        """Serve in a background thread (for benchmarks in the same process)."""
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def stop(self):
+        """Stop a server started with start()."""
+        self.shutdown()
+        self.server_close()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+class MockGeminiHandler(BaseHTTPRequestHandler):
+    """Request handler of MockGeminiServer."""
+
+    protocol_version = "HTTP/1.1"
+    server: MockGeminiServer
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _send_json(self, status: int, body: Dict[str, Any], headers: Dict[str, str] = None):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_error(self, status: int, message: str, retry_after: Optional[float] = None):
+        statuses = {400: "INVALID_ARGUMENT", 404: "NOT_FOUND", 429: "RESOURCE_EXHAUSTED",
+                    500: "INTERNAL", 503: "UNAVAILABLE"}
+        error = {"code": status, "message": message, "status": statuses.get(status, "UNKNOWN")}
+        headers = {}
+        if retry_after is not None:
+            error["details"] = [{"@type": "type.googleapis.com/google.rpc.RetryInfo",
+                                 "retryDelay": f"{int(math.ceil(retry_after))}s"}]
+            headers["Retry-After"] = str(int(math.ceil(retry_after)))
+        self._send_json(status, {"error": error}, headers)
+
+    def _read_body(self) -> Optional[Dict[str, Any]]:
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length else b""
+        if not raw:
+            return {}
+        try:
+            return json.loads(raw)
+        except ValueError:
+            self._send_error(400, "Invalid JSON payload")
+            return None
+
+    def do_GET(self):
+        path = urlsplit(self.path).path
+        if path == "/stats":
+            self._send_json(200, self.server.stats_snapshot())
+            return
+        match = _CACHED_CONTENT.search(path)
+        entry = self.server.get_cached_content(match.group(1)) if match else None
+        if entry is None:
+            self._send_error(404, f"{path} not found")
+            return
+        self._send_json(200, self.server._public_cached_content(entry))
+
+    def do_POST(self):
+        path = urlsplit(self.path).path
+        body = self._read_body()
+        if body is None:
+            return
+        if path == "/stats/reset":
+            self.server.reset_stats()
+            self._send_json(200, {})
+        elif path.endswith("/cachedContents"):
+            self._send_json(200, self.server.create_cached_content(body))
+        else:
+            match = _MODEL_METHOD.search(path)
+            if match is None or match.group(2) not in ("generateContent", "streamGenerateContent"):
+                self._send_error(404, f"{path} not found")
+                return
+            self._generate_content(match.group(1), body, stream=match.group(2) == "streamGenerateContent")
+
+    def do_PATCH(self):
+        match = _CACHED_CONTENT.search(urlsplit(self.path).path)
+        body = self._read_body()
+        if body is None:
+            return
+        entry = self.server.update_cached_content(match.group(1), body) if match else None
+        if entry is None:
+            self._send_error(404, "Cached content not found")
+            return
+        self._send_json(200, entry)
+
+    def do_DELETE(self):
+        match = _CACHED_CONTENT.search(urlsplit(self.path).path)
+        if match is None or not self.server.delete_cached_content(match.group(1)):
+            self._send_error(404, "Cached content not found")
+            return
+        self._send_json(200, {})
+
+    def _send_stream(self, answer: str, usage: Dict[str, int], model: str):
+        """Send an answer as server-sent events (alt=sse), a few tokens per event."""
+        server = self.server
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        size = server.stream_chunk_chars
+        pieces = [answer[i:i + size] for i in range(0, len(answer), size)] or [""]
+        for i, piece in enumerate(pieces):
+            if i:
+                time.sleep(server.stream_chunk_delay)
+            chunk = {"candidates": [{"content": {"parts": [{"text": piece}], "role": "model"}, "index": 0}],
+                     "modelVersion": model}
+            if i + 1 == len(pieces):
+                chunk["candidates"][0]["finishReason"] = "STOP"
+                chunk["usageMetadata"] = usage
+            event = f"data: {json.dumps(chunk)}\r\n\r\n".encode("utf-8")
+            self.wfile.write(f"{len(event):x}\r\n".encode("ascii") + event + b"\r\n")
+            self.wfile.flush()
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _generate_content(self, model: str, body: Dict[str, Any], stream: bool = False):
+        server = self.server
+        server.count("requests")
+        server.count("in_flight")
+        try:
+            status, retry_after = server.admit()
+            time.sleep(server.sample_latency())
+            if status is not None:
+                message = ("Resource has been exhausted (e.g. check quota)." if status == 429
+                           else "The model is overloaded. Please try again later." if status == 503
+                           else "An internal error has occurred.")
+                self._send_error(status, message, retry_after)
+                return
+
+            system_instruction = "".join(_texts([body.get("systemInstruction", {})]))
+            texts = _texts(body.get("contents"))
+            cached_tokens = 0
+            if body.get("cachedContent"):
+                entry = server.get_cached_content(body["cachedContent"])
+                if entry is None:
+                    self._send_error(404, f"{body['cachedContent']} not found")
+                    return
+                cached_texts = _texts(entry.get("contents"))
+                system_instruction = "".join(_texts([entry.get("systemInstruction", {})]))
+                cached_tokens = (len(system_instruction) + sum(len(t) for t in cached_texts)) // 4
+                # The mock sees the cached prefix and the request as one part, like an inline request
+                texts = ["\n".join(cached_texts + texts)] if cached_texts else texts
+                server.count("cache_hits")
+            else:
+                texts = ["\n".join(texts)] if texts else texts
+
+            config = body.get("generationConfig", {})
+            answer = mock_answer(system_instruction, texts, config.get("responseSchema"))
+            server.count("items", max(1, answer.count('"item"')))
+            prompt_tokens = (len(system_instruction) + sum(len(t) for t in texts)) // 4
+            answer_tokens = len(answer) // 4
+            usage = {
+                "promptTokenCount": prompt_tokens,
+                "cachedContentTokenCount": cached_tokens,
+                "candidatesTokenCount": answer_tokens,
+                "totalTokenCount": prompt_tokens + answer_tokens
+            }
+            if stream:
+                self._send_stream(answer, usage, model)
+            else:
+                self._send_json(200, {
+                    "candidates": [{"content": {"parts": [{"text": answer}], "role": "model"},
+                                    "finishReason": "STOP", "index": 0}],
+                    "usageMetadata": usage,
+                    "modelVersion": model
+                })
+            server.count("ok")
+        finally:
+            server.count("in_flight", -1)
+
+def main():
+    """Run the mock server until interrupted."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Local mock of the Gemini generateContent API")
+    parser.add_argument("--host", default="127.0.0.1", help="Interface to listen on (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8765, help="Port to listen on (default: 8765)")
+    parser.add_argument("--latency", choices=LATENCY_DISTRIBUTIONS, default="none",
+                        help="Response delay distribution (default: none)")
+    parser.add_argument("--latency-mean", type=float, default=0.5, help="Mean delay in seconds (default: 0.5)")
+    parser.add_argument("--latency-spread", type=float, default=0.25,
+                        help="Half-width, standard deviation or lognormal sigma (default: 0.25)")
+    parser.add_argument("--error-rate-429", type=float, default=0.0, help="Share of injected 429 responses")
+    parser.add_argument("--error-rate-5xx", type=float, default=0.0, help="Share of injected 500/503 responses")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After of injected 429s (default: 1)")
+    parser.add_argument("--rpm", type=float, default=None, help="Requests per minute quota (default: none)")
+    parser.add_argument("--max-in-flight", type=int, default=None,
+                        help="Concurrent requests accepted before answering 429 (default: no limit)")
+    parser.add_argument("--stream-chunk-delay", type=float, default=0.02,
+                        help="Seconds between streamed chunks (default: 0.02)")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed (default: 0)")
+    parser.add_argument("--verbose", action="store_true", help="Log every request")
+    args = parser.parse_args()
+
+    server = MockGeminiServer((args.host, args.port), latency=args.latency, latency_mean=args.latency_mean,
+                              latency_spread=args.latency_spread, error_rate_429=args.error_rate_429,
+                              error_rate_5xx=args.error_rate_5xx, retry_after=args.retry_after,
+                              rpm=args.rpm, max_in_flight=args.max_in_flight, stream_chunk_delay=args.stream_chunk_delay, seed=args.seed,
+                              verbose=args.verbose)
+    print(f"Mock Gemini API listening on {server.base_url}")
+    print(f"Point the matcher at it with: GEMINI_API_BASE_URL={server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nStopping mock server...")
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
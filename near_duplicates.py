@@ -0,0 +1,293 @@
+"""
+Near-duplicate detection for CVs and job descriptions.
+
+Each text is reduced to a MinHash signature over word shingles; signatures are
+split into LSH bands so candidate duplicates are found by bucket lookups
+instead of comparing every pair. Documents whose estimated Jaccard similarity
+reaches the threshold are put in the same cluster, and the first document of a
+cluster is its representative: matching scores the representative once and
+reuses its results for the other members.
+"""
+import os
+import re
+import hashlib
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+
+from config import NEAR_DUPLICATE_THRESHOLD, NEAR_DUPLICATE_NUM_PERM, NEAR_DUPLICATE_SHINGLE_SIZE
+
+_WORD_PATTERN = re.compile(r"\w+")
+
+def shingle_hashes(text: str, shingle_size: int = NEAR_DUPLICATE_SHINGLE_SIZE) -> np.ndarray:
+    """
+    Hash the word shingles of a text.
+
+    Args:
+        text (str): Document text
+        shingle_size (int): Number of consecutive words per shingle
+
+    Returns:
+        np.ndarray: Unique 64-bit shingle hashes
+    """
+    words = _WORD_PATTERN.findall(text.lower())
+    if len(words) < shingle_size:
+        shingles = [" ".join(words)] if words else []
+    else:
+        shingles = {" ".join(words[i:i + shingle_size]) for i in range(len(words) - shingle_size + 1)}
+    hashes = [int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "little")
+              for s in shingles]
+    return np.unique(np.array(hashes, dtype=np.uint64))
+
+def _choose_bands(num_perm: int, threshold: float) -> Tuple[int, int]:
+    """Pick (bands, rows) so the LSH S-curve, (1/bands)^(1/rows), is closest to the threshold."""
+    options = [(b, num_perm // b) for b in range(1, num_perm + 1) if num_perm % b == 0]
+    return min(options, key=lambda option: abs((1.0 / option[0]) ** (1.0 / option[1]) - threshold))
+
+class MinHasher:
+    """Computes fixed-length MinHash signatures with multiply-shift hash functions."""
+
+    def __init__(self, num_perm: int = NEAR_DUPLICATE_NUM_PERM, shingle_size: int = NEAR_DUPLICATE_SHINGLE_SIZE,
+                 seed: int = 1):
+        """
+        Initialize the hasher.
+
+        Args:
+            num_perm (int): Signature length (more is more accurate but slower)
+            shingle_size (int): Number of consecutive words per shingle
+            seed (int): Seed of the hash functions; signatures are only comparable for equal seeds
+        """
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, 2 ** 63, size=num_perm, dtype=np.uint64) | np.uint64(1)
+        self._b = rng.integers(0, 2 ** 63, size=num_perm, dtype=np.uint64)
+
+    def signature(self, text: str) -> np.ndarray:
+        """
+        Compute the MinHash signature of a text.
+
+        Args:
+            text (str): Document text
+
+        Returns:
+            np.ndarray: uint32 array of length num_perm
+        """
+        hashes = shingle_hashes(text, self.shingle_size)
+        if hashes.size == 0:
+            return np.full(self.num_perm, np.iinfo(np.uint32).max, dtype=np.uint32)
+        # (a * x + b) mod 2^64, top 32 bits; one row per hash function
+        with np.errstate(over="ignore"):
+            values = (self._a[:, None] * hashes[None, :] + self._b[:, None]) >> np.uint64(32)
+        return values.min(axis=1).astype(np.uint32)
+
+def estimate_similarity(signature_a: np.ndarray, signature_b: np.ndarray) -> float:
+    """Estimate the Jaccard similarity of two documents from their signatures."""
+    return float(np.mean(signature_a == signature_b))
+
+class NearDuplicateIndex:
+    """
+    Incremental LSH index that groups near-duplicate documents into clusters.
+
+    Documents are added one at a time (so it works with streamed corpora);
+    add() returns the representative the new document should share results with.
+    """
+
+    def __init__(self, threshold: float = NEAR_DUPLICATE_THRESHOLD, hasher: MinHasher = None):
+        """
+        Initialize the index.
+
+        Args:
+            threshold (float): Minimum estimated Jaccard similarity to treat two documents as duplicates
+            hasher (MinHasher, optional): Signature generator (default: one with the config settings)
+        """
+        self.threshold = threshold
+        self.hasher = hasher or MinHasher()
+        self.bands, self.rows = _choose_bands(self.hasher.num_perm, threshold)
+        self._buckets = [{} for _ in range(self.bands)]
+        self._signatures = {}
+        self._representatives = {}
+        self._clusters = {}
+
+    def __len__(self):
+        return len(self._signatures)
+
+    def __contains__(self, doc_id: str):
+        return doc_id in self._signatures
+
+    def _band_keys(self, signature: np.ndarray) -> List[bytes]:
+        return [signature[i * self.rows:(i + 1) * self.rows].tobytes() for i in range(self.bands)]
+
+    def query(self, text: str = None, signature: np.ndarray = None) -> List[Tuple[str, float]]:
+        """
+        Find indexed documents similar to a text.
+
+        Args:
+            text (str, optional): Document text (ignored if a signature is given)
+            signature (np.ndarray, optional): Precomputed signature
+
+        Returns:
+            List[Tuple[str, float]]: (document ID, estimated similarity) at or above the threshold, best first
+        """
+        if signature is None:
+            signature = self.hasher.signature(text)
+        candidates = set()
+        for bucket, key in zip(self._buckets, self._band_keys(signature)):
+            candidates.update(bucket.get(key, ()))
+        similar = [(doc_id, estimate_similarity(signature, self._signatures[doc_id])) for doc_id in candidates]
+        similar = [(doc_id, score) for doc_id, score in similar if score >= self.threshold]
+        similar.sort(key=lambda x: x[1], reverse=True)
+        return similar
+
+    def add(self, doc_id: str, text: str) -> str:
+        """
+        Add a document to the index.
+
+        Args:
+            doc_id (str): Document ID
+            text (str): Document text
+
+        Returns:
+            str: ID of the cluster representative (doc_id itself if the document is not a duplicate)
+        """
+        if doc_id in self._signatures:
+            return self._representatives[doc_id]
+
+        signature = self.hasher.signature(text)
+        similar = self.query(signature=signature)
+        representative = self._representatives[similar[0][0]] if similar else doc_id
+
+        self._signatures[doc_id] = signature
+        self._representatives[doc_id] = representative
+        self._clusters.setdefault(representative, []).append(doc_id)
+        for bucket, key in zip(self._buckets, self._band_keys(signature)):
+            bucket.setdefault(key, []).append(doc_id)
+        return representative
+
+    def representative(self, doc_id: str) -> Optional[str]:
+        """Get the representative of an indexed document, or None if it is not indexed."""
+        return self._representatives.get(doc_id)
+
+    def clusters(self, min_size: int = 2) -> List[List[str]]:
+        """
+        List the clusters of near-duplicate documents.
+
+        Args:
+            min_size (int): Only return clusters with at least this many documents
+
+        Returns:
+            List[List[str]]: Document IDs per cluster, representative first, largest clusters first
+        """
+        clusters = [members for members in self._clusters.values() if len(members) >= min_size]
+        clusters.sort(key=len, reverse=True)
+        return clusters
+
+    def similarity(self, doc_id_a: str, doc_id_b: str) -> float:
+        """Estimated similarity of two indexed documents."""
+        return estimate_similarity(self._signatures[doc_id_a], self._signatures[doc_id_b])
+
+class RepresentativeHashes:
+    """
+    Thread-safe map from a document text to the text hash of its cluster representative.
+
+    Documents are identified by the hash of their text, so callers that only
+    have contents (no IDs) can share the results of near duplicates: caching
+    results under the representative's hash instead of the duplicate's makes
+    every later duplicate a cache hit. Only hashes and signatures are kept,
+    never the texts.
+    """
+
+    def __init__(self, threshold: float = NEAR_DUPLICATE_THRESHOLD):
+        """
+        Initialize the map.
+
+        Args:
+            threshold (float): Minimum estimated Jaccard similarity to treat two documents as duplicates
+        """
+        self._index = NearDuplicateIndex(threshold)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._index)
+
+    def representative(self, text: str) -> str:
+        """
+        Get the hash of a document's representative, adding the document if it is new.
+
+        Args:
+            text (str): Document text
+
+        Returns:
+            str: Hex SHA-256 digest of the representative's text (of text itself if it is not a near
+                duplicate of an earlier document)
+        """
+        doc_id = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        with self._lock:
+            return self._index.add(doc_id, text)
+
+def build_index(corpus: Union[Dict[str, str], Iterable[Tuple]], threshold: float = NEAR_DUPLICATE_THRESHOLD) -> NearDuplicateIndex:
+    """
+    Index a whole corpus.
+
+    Args:
+        corpus: Dictionary of document IDs to content, or an iterable of (ID, content, ...) tuples
+        threshold (float): Minimum estimated Jaccard similarity to treat two documents as duplicates
+
+    Returns:
+        NearDuplicateIndex: Index with every document added
+    """
+    index = NearDuplicateIndex(threshold)
+    items = corpus.items() if isinstance(corpus, dict) else ((item[0], item[1]) for item in corpus)
+    for doc_id, text in items:
+        index.add(doc_id, text)
+    return index
+
+def format_cluster_report(index: NearDuplicateIndex, title: str = "Documents") -> str:
+    """
+    Format the near-duplicate clusters of an index in a readable format.
+
+    Args:
+        index (NearDuplicateIndex): Index to report on
+        title (str): Heading of the report
+
+    Returns:
+        str: Formatted report
+    """
+    clusters = index.clusters()
+    duplicates = sum(len(members) - 1 for members in clusters)
+    output = [f"## {title}: {len(index)} documents, {len(clusters)} near-duplicate clusters, "
+              f"{duplicates} redundant documents (threshold {index.threshold:.2f})"]
+    for i, members in enumerate(clusters):
+        representative = members[0]
+        output.append(f"{i+1}. {representative} ({len(members)} documents)")
+        for doc_id in members[1:]:
+            output.append(f"   - {doc_id} (similarity {index.similarity(representative, doc_id):.2f})")
+    output.append("")
+    return "\n".join(output)
+
+def main():
+    """Print and save the near-duplicate clusters of the CV and job description folders."""
+    import argparse
+    from document_processor import iter_cvs, iter_job_descriptions
+    from config import CV_DIR, JOB_DESCRIPTIONS_DIR, OUTPUT_DIR
+
+    parser = argparse.ArgumentParser(description="Report near-duplicate CVs and job descriptions")
+    parser.add_argument("--threshold", type=float, default=NEAR_DUPLICATE_THRESHOLD,
+                        help=f"Minimum estimated Jaccard similarity (default: {NEAR_DUPLICATE_THRESHOLD})")
+    args = parser.parse_args()
+
+    report = "\n".join([
+        format_cluster_report(build_index(iter_cvs(CV_DIR), args.threshold), "CVs"),
+        format_cluster_report(build_index(iter_job_descriptions(JOB_DESCRIPTIONS_DIR), args.threshold), "Job descriptions"),
+    ])
+    print(report)
+
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    output_file = os.path.join(OUTPUT_DIR, "near_duplicates.txt")
+    with open(output_file, "w", encoding="utf-8") as f:
+        f.write(report)
+    print(f"Report saved to '{output_file}'.")
+
+if __name__ == "__main__":
+    main()
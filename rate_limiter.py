@@ -0,0 +1,229 @@
+"""
+Token-bucket rate limiter shared by every Gemini caller.
+
+The bucket holds up to `burst` tokens and refills at `rpm` tokens per minute;
+each request takes one token. Threads and asyncio tasks of a process share one
+limiter (see get_rate_limiter), and processes can share the bucket through a
+small state file guarded by an OS file lock, so parallel scripts draw from the
+same per-minute quota instead of each assuming they have all of it.
+"""
+import os
+import json
+import time
+import asyncio
+import threading
+from typing import Any, Callable, Optional, Tuple
+
+from config import RATE_LIMIT_RPM, RATE_LIMIT_BURST, RATE_LIMIT_SHARED, RATE_LIMIT_STATE_PATH
+
+if os.name == "nt":
+    import msvcrt
+
+    def _lock_file(f):
+        f.seek(0)
+        # Blocks (retrying for ~10 s at a time) until the first byte can be locked
+        while True:
+            try:
+                msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                return
+            except OSError:
+                continue
+
+    def _unlock_file(f):
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+else:
+    import fcntl
+
+    def _lock_file(f):
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+
+    def _unlock_file(f):
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+def get_base_dir():
+    """Get the base directory of the project."""
+    return os.path.dirname(os.path.abspath(__file__))
+
+class RateLimiter:
+    """
+    Thread-safe, asyncio-friendly token bucket, optionally shared across processes.
+
+    acquire() blocks the calling thread until a token is available and
+    acquire_async() waits with asyncio.sleep (taking the bucket's file lock in a
+    worker thread), so neither busy-waits nor holds a lock while waiting. penalize() pauses every user of the bucket, e.g. after
+    the API answers 429.
+    """
+
+    def __init__(self, rpm: float = RATE_LIMIT_RPM, burst: int = RATE_LIMIT_BURST, state_path: str = None):
+        """
+        Initialize the limiter.
+
+        Args:
+            rpm (float): Sustained requests per minute
+            burst (int): Maximum number of requests that may be sent back to back
+            state_path (str, optional): JSON file used to share the bucket between processes
+                (None keeps the bucket in this process only)
+        """
+        if rpm <= 0:
+            raise ValueError("rpm must be positive")
+        self.rpm = rpm
+        self.burst = max(1, burst)
+        self.rate = rpm / 60.0
+        if state_path and not os.path.isabs(state_path):
+            state_path = os.path.join(get_base_dir(), state_path)
+        self.state_path = state_path
+        self._lock = threading.Lock()
+        # In-process state (also the fallback if the state file is unusable)
+        self._tokens = float(self.burst)
+        self._updated = time.time()
+        self._blocked_until = 0.0
+
+    def _update(self, operation: Callable[[float], Any]) -> Any:
+        """Run operation(now) on the bucket state, under the thread lock and (if shared) the file lock."""
+        with self._lock:
+            if self.state_path:
+                try:
+                    return self._update_shared(operation)
+                except OSError as e:
+                    print(f"Rate limiter state file unavailable ({e}); limiting this process only")
+                    self.state_path = None
+            return operation(time.time())
+
+    def _update_shared(self, operation: Callable[[float], Any]) -> Any:
+        os.makedirs(os.path.dirname(self.state_path), exist_ok=True)
+        with open(self.state_path, "a+b") as f:
+            _lock_file(f)
+            try:
+                f.seek(0)
+                raw = f.read()
+                if raw:
+                    try:
+                        state = json.loads(raw.decode("utf-8"))
+                        self._tokens = min(float(state['tokens']), self.burst)
+                        self._updated = float(state['updated'])
+                        self._blocked_until = float(state.get('blocked_until', 0.0))
+                    except (ValueError, KeyError, TypeError):
+                        pass  # Corrupt state: continue from the in-process values
+                result = operation(time.time())
+                f.seek(0)
+                f.truncate()
+                f.write(json.dumps({
+                    'tokens': self._tokens,
+                    'updated': self._updated,
+                    'blocked_until': self._blocked_until
+                }).encode("utf-8"))
+                f.flush()
+                return result
+            finally:
+                _unlock_file(f)
+
+    def _refill(self, now: float):
+        elapsed = max(0.0, now - self._updated)
+        self._tokens = min(float(self.burst), self._tokens + elapsed * self.rate)
+        self._updated = now
+
+    def try_acquire(self, tokens: int = 1) -> Tuple[bool, float]:
+        """
+        Take tokens if they are available, without waiting.
+
+        Args:
+            tokens (int): Number of tokens to take
+
+        Returns:
+            Tuple[bool, float]: Whether the tokens were taken, and otherwise how many seconds to wait before retrying
+        """
+        if tokens > self.burst:
+            raise ValueError(f"Cannot take {tokens} tokens from a bucket of {self.burst}")
+
+        def take(now):
+            self._refill(now)
+            if now < self._blocked_until:
+                return False, self._blocked_until - now
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return True, 0.0
+            return False, (tokens - self._tokens) / self.rate
+
+        return self._update(take)
+
+    def acquire(self, tokens: int = 1, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until tokens are available and take them.
+
+        Args:
+            tokens (int): Number of tokens to take
+            timeout (float, optional): Give up after this many seconds
+
+        Returns:
+            bool: True if the tokens were taken, False on timeout
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            acquired, wait = self.try_acquire(tokens)
+            if acquired:
+                return True
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            time.sleep(wait)
+
+    async def acquire_async(self, tokens: int = 1, timeout: Optional[float] = None) -> bool:
+        """
+        Asyncio version of acquire(); waits without blocking the event loop.
+
+        Each attempt runs in the default executor, since a shared bucket locks
+        and rewrites its state file.
+
+        Args:
+            tokens (int): Number of tokens to take
+            timeout (float, optional): Give up after this many seconds
+
+        Returns:
+            bool: True if the tokens were taken, False on timeout
+        """
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            acquired, wait = await loop.run_in_executor(None, self.try_acquire, tokens)
+            if acquired:
+                return True
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            await asyncio.sleep(wait)
+
+    def penalize(self, seconds: float):
+        """
+        Stop handing out tokens for a while (shared with other processes).
+
+        Args:
+            seconds (float): Pause length, e.g. the server's Retry-After
+        """
+        def block(now):
+            self._refill(now)
+            self._blocked_until = max(self._blocked_until, now + seconds)
+            self._tokens = 0.0
+
+        self._update(block)
+
+_rate_limiter = None
+_rate_limiter_lock = threading.Lock()
+
+def get_rate_limiter() -> RateLimiter:
+    """
+    Get the rate limiter shared by all Gemini callers of this process.
+
+    Returns:
+        RateLimiter: Limiter configured from RATE_LIMIT_* in config
+    """
+    global _rate_limiter
+    with _rate_limiter_lock:
+        if _rate_limiter is None:
+            _rate_limiter = RateLimiter(RATE_LIMIT_RPM, RATE_LIMIT_BURST,
+                                        RATE_LIMIT_STATE_PATH if RATE_LIMIT_SHARED else None)
+        return _rate_limiter
@@ -0,0 +1,314 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from config import RESULT_CACHE_ENABLED, RESULT_CACHE_PATH, RESULT_CACHE_MAX_ENTRIES, RESULT_CACHE_CLAIM_TTL
+
+# Check the size bound after this many stores instead of on every insert
+_EVICTION_CHECK_INTERVAL = 64
+
+def get_base_dir():
+    """Get the base directory of the project."""
+    return os.path.dirname(os.path.abspath(__file__))
+
+def hash_text(text: str) -> str:
+    """
+    Hash a document text for use in a result cache key.
+
+    Args:
+        text (str): CV or job description text
+
+    Returns:
+        str: Hex encoded SHA-256 digest of the UTF-8 text
+    """
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+class ResultCache:
+    """
+    SQLite backed cache of scoring results.
+
+    Results are keyed by (CV text hash, job text hash, prompt version, model,
+    temperature), so a pair is only sent to the model again when one of the
+    documents, the prompt or the model settings change. The cache keeps at most
+    max_entries results and evicts the least recently used ones beyond that.
+
+    Processes sharing the database can also claim a key while they score it
+    (claim / release_claim), so the others wait for the result instead of
+    paying for the same API call. Claims expire, so a crashed process cannot
+    block a pair for long.
+    """
+
+    def __init__(self, db_path: str = None, max_entries: int = RESULT_CACHE_MAX_ENTRIES):
+        """
+        Initialize the cache.
+
+        Args:
+            db_path (str, optional): Path to the SQLite database (defaults to RESULT_CACHE_PATH)
+            max_entries (int): Maximum number of results kept
+        """
+        db_path = db_path or RESULT_CACHE_PATH
+        if not os.path.isabs(db_path):
+            db_path = os.path.join(get_base_dir(), db_path)
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self._local = threading.local()
+        self._init_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._initialized = False
+
+    def _connect(self) -> sqlite3.Connection:
+        """Return a connection owned by the current thread and process."""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        with self._init_lock:
+            if not self._initialized:
+                conn.executescript("""
+                    CREATE TABLE IF NOT EXISTS results (
+                        cv_hash TEXT NOT NULL,
+                        job_hash TEXT NOT NULL,
+                        prompt_version TEXT NOT NULL,
+                        model TEXT NOT NULL,
+                        temperature TEXT NOT NULL,
+                        result TEXT NOT NULL,
+                        created REAL NOT NULL,
+                        last_used REAL NOT NULL,
+                        PRIMARY KEY (cv_hash, job_hash, prompt_version, model, temperature)
+                    );
+                    CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used);
+                    CREATE TABLE IF NOT EXISTS claims (
+                        cv_hash TEXT NOT NULL,
+                        job_hash TEXT NOT NULL,
+                        prompt_version TEXT NOT NULL,
+                        model TEXT NOT NULL,
+                        temperature TEXT NOT NULL,
+                        owner TEXT NOT NULL,
+                        expires REAL NOT NULL,
+                        PRIMARY KEY (cv_hash, job_hash, prompt_version, model, temperature)
+                    );
+                """)
+                conn.commit()
+                self._initialized = True
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    @staticmethod
+    def make_key(cv_text: str, job_text: str, prompt_version: str, model: str,
+                 temperature: float) -> Tuple[str, str, str, str, str]:
+        """
+        Build the cache key of a CV / job pair.
+
+        Args:
+            cv_text (str): CV text
+            job_text (str): Job description text
+            prompt_version (str): Identifier of the prompt used for scoring
+            model (str): Model name
+            temperature (float): Sampling temperature
+
+        Returns:
+            Tuple[str, str, str, str, str]: Key accepted by get() and put()
+        """
+        return ResultCache.key_from_hashes(hash_text(cv_text), hash_text(job_text), prompt_version, model, temperature)
+
+    @staticmethod
+    def key_from_hashes(cv_hash: str, job_hash: str, prompt_version: str, model: str,
+                        temperature: float) -> Tuple[str, str, str, str, str]:
+        """Build a cache key from precomputed text hashes (see make_key)."""
+        return cv_hash, job_hash, prompt_version, model, repr(float(temperature))
+
+    def get(self, key: Tuple[str, str, str, str, str]) -> Optional[Dict[str, Any]]:
+        """
+        Look up a result.
+
+        Args:
+            key: Key from make_key()
+
+        Returns:
+            Optional[Dict[str, Any]]: The stored result, or None on a miss
+        """
+        return self.lookup([key])
+
+    def lookup(self, keys: List[Tuple[str, str, str, str, str]], record_stats: bool = True) -> Optional[Dict[str, Any]]:
+        """
+        Look up a result stored under any of several keys (counted as one lookup).
+
+        Args:
+            keys: Keys from make_key(), in order of preference
+            record_stats (bool): Count the lookup as a hit or miss (False e.g. while polling for a claimed key)
+
+        Returns:
+            Optional[Dict[str, Any]]: The first stored result found, or None on a miss
+        """
+        conn = self._connect()
+        for key in keys:
+            row = conn.execute(
+                "SELECT result FROM results WHERE cv_hash = ? AND job_hash = ? AND prompt_version = ? "
+                "AND model = ? AND temperature = ?", key
+            ).fetchone()
+            if row is None:
+                continue
+
+            with conn:
+                conn.execute(
+                    "UPDATE results SET last_used = ? WHERE cv_hash = ? AND job_hash = ? AND prompt_version = ? "
+                    "AND model = ? AND temperature = ?", (time.time(),) + tuple(key)
+                )
+            if record_stats:
+                with self._stats_lock:
+                    self.hits += 1
+            return json.loads(row[0])
+
+        if record_stats:
+            with self._stats_lock:
+                self.misses += 1
+        return None
+
+    def put(self, key: Tuple[str, str, str, str, str], result: Dict[str, Any]):
+        """
+        Store a successful result.
+
+        Args:
+            key: Key from make_key()
+            result (Dict[str, Any]): JSON-serializable result
+        """
+        now = time.time()
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO results (cv_hash, job_hash, prompt_version, model, temperature, "
+                "result, created, last_used) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                tuple(key) + (json.dumps(result, ensure_ascii=False), now, now)
+            )
+        with self._stats_lock:
+            self.stores += 1
+            check = self.stores % _EVICTION_CHECK_INTERVAL == 1
+        if check:
+            self.evict()
+
+    @property
+    def owner(self) -> str:
+        """Identity recorded with this process's claims."""
+        return f"{os.getpid()}:{id(self):x}"
+
+    def claim(self, key: Tuple[str, str, str, str, str], ttl: float = RESULT_CACHE_CLAIM_TTL) -> bool:
+        """
+        Claim a key before scoring it, so other processes wait for its result.
+
+        Args:
+            key: Key from make_key()
+            ttl (float): Seconds after which the claim lapses if it is not released
+
+        Returns:
+            bool: True if the claim was taken, False if another live claim holds the key
+        """
+        now = time.time()
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "DELETE FROM claims WHERE cv_hash = ? AND job_hash = ? AND prompt_version = ? "
+                "AND model = ? AND temperature = ? AND expires < ?", tuple(key) + (now,)
+            )
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO claims (cv_hash, job_hash, prompt_version, model, temperature, "
+                "owner, expires) VALUES (?, ?, ?, ?, ?, ?, ?)", tuple(key) + (self.owner, now + ttl)
+            )
+        return cursor.rowcount == 1
+
+    def release_claim(self, key: Tuple[str, str, str, str, str]):
+        """
+        Release a claim taken with claim().
+
+        Args:
+            key: Key from make_key()
+        """
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "DELETE FROM claims WHERE cv_hash = ? AND job_hash = ? AND prompt_version = ? "
+                "AND model = ? AND temperature = ? AND owner = ?", tuple(key) + (self.owner,)
+            )
+
+    def evict(self) -> int:
+        """
+        Remove the least recently used results beyond max_entries.
+
+        Returns:
+            int: Number of results removed
+        """
+        conn = self._connect()
+        with conn:
+            count = conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+            excess = count - self.max_entries
+            if excess <= 0:
+                return 0
+            conn.execute(
+                "DELETE FROM results WHERE rowid IN (SELECT rowid FROM results ORDER BY last_used LIMIT ?)",
+                (excess,)
+            )
+        with self._stats_lock:
+            self.evictions += excess
+        return excess
+
+    def __len__(self):
+        return self._connect().execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def clear(self):
+        """Remove every cached result."""
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM results")
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get the hit/miss statistics of this process.
+
+        Returns:
+            Dict[str, Any]: hits, misses, hit_rate, stores and evictions
+        """
+        with self._stats_lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'stores': self.stores,
+                'evictions': self.evictions
+            }
+
+    def summary(self) -> str:
+        """One-line description of the statistics."""
+        stats = self.stats()
+        return (f"Result cache: {stats['hits']} hits, {stats['misses']} misses "
+                f"({stats['hit_rate']:.0%} hit rate), {stats['stores']} stored, {stats['evictions']} evicted")
+
+_result_cache = None
+_result_cache_lock = threading.Lock()
+
+def get_result_cache() -> Optional[ResultCache]:
+    """
+    Get the shared result cache for this process.
+
+    Returns:
+        Optional[ResultCache]: The cache, or None if result caching is disabled in config
+    """
+    global _result_cache
+    if not RESULT_CACHE_ENABLED:
+        return None
+    with _result_cache_lock:
+        if _result_cache is None:
+            _result_cache = ResultCache()
+        return _result_cache
@@ -0,0 +1,546 @@
+"""
+Pluggable model backends for scoring.
+
+CVJobMatcher builds the prompts and parses the answers; a ScoringBackend turns
+a GenerationRequest into response text. GeminiBackend talks to the Gemini API
+(rate limited, with explicit context caching); OllamaBackend talks to a local
+Ollama server, which has no rate limits and runs several requests in parallel.
+The backend is chosen with SCORING_BACKEND in config. Backends also report the
+tokens each call used (see usage_meter.py).
+"""
+import json
+import time
+import threading
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+import requests
+from requests.adapters import HTTPAdapter
+from pydantic import BaseModel
+
+from config import (
+    GEMINI_API_KEY,
+    GEMINI_API_BASE_URL,
+    GEMINI_MODEL,
+    GEMINI_EMBEDDING_MODEL,
+    TEMPERATURE,
+    MAX_CONCURRENT_REQUESTS,
+    CONTEXT_CACHE_TTL,
+    CONTEXT_CACHE_MIN_TOKENS,
+    SCORING_BACKEND,
+    OLLAMA_BASE_URL,
+    OLLAMA_MODEL,
+    OLLAMA_EMBEDDING_MODEL,
+    OLLAMA_KEEP_ALIVE,
+    OLLAMA_NUM_PARALLEL,
+    OLLAMA_NUM_CTX,
+    OLLAMA_TIMEOUT
+)
+from rate_limiter import RateLimiter, get_rate_limiter
+from gemini_transport import GeminiAPIError, GeminiTransport, response_text
+from context_cache import ContextCache, get_context_cache, estimate_tokens
+from result_cache import hash_text
+from usage_meter import TokenUsage
+
+class GenerationRequest(BaseModel):
+    """One model call: the system prompt, the shared prompt prefix and the per-request content."""
+    system_prompt: str
+    prefix: str
+    user_content: str
+    max_tokens: int
+    response_schema: Optional[Dict[str, Any]] = None
+
+class ScoringBackendError(Exception):
+    """Error returned by (or while reaching) a scoring backend other than Gemini."""
+
+class ScoringBackend(ABC):
+    """Model service that answers generation requests and computes embeddings."""
+
+    # Identifies the model in result cache keys
+    model_id: str = ""
+    # Default number of requests in flight for this backend
+    max_concurrency: int = 1
+
+    @abstractmethod
+    def generate_with_usage(self, request: GenerationRequest,
+                            on_discarded_usage: Callable[[TokenUsage], None] = None) -> Tuple[str, Optional[TokenUsage]]:
+        """
+        Run one generation request.
+
+        Args:
+            request (GenerationRequest): Prompt and output settings
+            on_discarded_usage (Callable[[TokenUsage], None], optional): Called with the tokens used by
+                extra calls whose answers were discarded (e.g. the slower of two hedged calls)
+
+        Returns:
+            Tuple[str, Optional[TokenUsage]]: Response text (JSON matching request.response_schema
+                when one is given), and the tokens used if the service reported them
+        """
+
+    def generate(self, request: GenerationRequest) -> str:
+        """
+        Run one generation request.
+
+        Args:
+            request (GenerationRequest): Prompt and output settings
+
+        Returns:
+            str: Response text (JSON matching request.response_schema when one is given)
+        """
+        return self.generate_with_usage(request)[0]
+
+    def generate_stream(self, request: GenerationRequest,
+                        on_usage: Callable[[TokenUsage], None] = None) -> Iterator[str]:
+        """
+        Run one generation request, yielding the response text as it is generated.
+
+        Backends without streaming yield the whole response at once.
+
+        Args:
+            request (GenerationRequest): Prompt and output settings
+            on_usage (Callable[[TokenUsage], None], optional): Called with the tokens used once the
+                response is complete (if the service reported them)
+
+        Yields:
+            str: Consecutive pieces of the response text
+        """
+        text, usage = self.generate_with_usage(request)
+        if usage is not None and on_usage is not None:
+            on_usage(usage)
+        yield text
+
+    def batch_generate(self, requests: List[GenerationRequest],
+                       max_concurrency: int = None) -> List[Union[str, Exception]]:
+        """
+        Run several generation requests, up to max_concurrency at a time.
+
+        Args:
+            requests (List[GenerationRequest]): Requests to run
+            max_concurrency (int, optional): Requests in flight (default: the backend's max_concurrency)
+
+        Returns:
+            List[Union[str, Exception]]: Response text or the raised exception, in request order
+        """
+        def run(request):
+            try:
+                return self.generate(request)
+            except Exception as e:
+                return e
+
+        with ThreadPoolExecutor(max_workers=max(1, max_concurrency or self.max_concurrency)) as executor:
+            return list(executor.map(run, requests))
+
+    @abstractmethod
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        """
+        Compute embeddings.
+
+        Args:
+            texts (List[str]): Texts to embed
+
+        Returns:
+            List[List[float]]: One vector per text
+        """
+
+    def acquire_context(self, system_prompt: str, prefix: str) -> Optional[str]:
+        """Take a reference to a cached prompt prefix (no-op for backends without context caching)."""
+        return None
+
+    def release_context(self, key: str):
+        """Drop a reference taken by acquire_context."""
+
+    @contextmanager
+    def cached_context(self, system_prompt: str, prefix: str):
+        """
+        Keep a prompt prefix cached on the backend while the block runs.
+
+        Args:
+            system_prompt (str): System prompt
+            prefix (str): Shared document block sent first in every request
+        """
+        key = self.acquire_context(system_prompt, prefix)
+        try:
+            yield
+        finally:
+            if key is not None:
+                self.release_context(key)
+
+    def warm_up(self):
+        """Prepare the backend for a bulk run (e.g. load the model)."""
+
+    def available(self) -> bool:
+        """Whether requests are being accepted (False while a circuit breaker fails them fast)."""
+        return True
+
+    def summary(self) -> Optional[str]:
+        """One-line report on the backend's request handling after a run (None if there is nothing to report)."""
+        return None
+
+    def close(self):
+        """Release the backend's connections."""
+
+class GeminiBackend(ScoringBackend):
+    """
+    Backend for the Gemini API, with rate limiting, adaptive concurrency, retries, hedging,
+    a circuit breaker and explicit context caching.
+    """
+
+    def __init__(self, api_key: str = None, rate_limiter: RateLimiter = None,
+                 context_cache: ContextCache = None, model: str = GEMINI_MODEL,
+                 embedding_model: str = GEMINI_EMBEDDING_MODEL, base_url: str = GEMINI_API_BASE_URL):
+        """
+        Initialize the backend.
+
+        Args:
+            api_key (str, optional): Gemini API key (default: GEMINI_API_KEY)
+            rate_limiter (RateLimiter, optional): Limiter for API requests (default: the shared one)
+            context_cache (ContextCache, optional): Store for cached prompt prefixes
+                (default: the one from config; disabled if CONTEXT_CACHE_ENABLED is False)
+            model (str): Generation model
+            embedding_model (str): Embedding model
+            base_url (str): API root (default: GEMINI_API_BASE_URL, e.g. a mock_gemini_server.py URL)
+        """
+        self.rate_limiter = rate_limiter or get_rate_limiter()
+        self.transport = GeminiTransport(api_key or GEMINI_API_KEY, model=model, base_url=base_url,
+                                         rate_limiter=self.rate_limiter)
+        self.context_cache = context_cache if context_cache is not None else get_context_cache(self.transport)
+        self.model_id = model
+        self.embedding_model = embedding_model
+        # With adaptive concurrency the transport decides how many requests are in flight;
+        # callers keep enough requests queued for it to reach its ceiling
+        limiter = self.transport.concurrency_limiter
+        self.max_concurrency = limiter.max_limit if limiter is not None else MAX_CONCURRENT_REQUESTS
+        # Prompt prefix hash -> {"name", "refs", "expires"} of the cached contexts in use
+        self._contexts = {}
+        self._context_lock = threading.Lock()
+
+    def acquire_context(self, system_prompt: str, prefix: str) -> Optional[str]:
+        """Take a reference to the cached context of a prefix, creating it if needed; returns its key."""
+        if self.context_cache is None:
+            return None
+        key = hash_text(prefix)
+        with self._context_lock:
+            entry = self._contexts.get(key)
+            if entry is not None:
+                entry["refs"] += 1
+                return key
+            entry = self._contexts[key] = {"name": None, "refs": 1, "expires": 0.0}
+
+        if estimate_tokens(system_prompt + prefix) < CONTEXT_CACHE_MIN_TOKENS:
+            # Below the model's caching minimum; the prefix is sent inline (implicit caching may still apply)
+            return key
+        try:
+            name = self.context_cache.create(system_prompt, prefix, CONTEXT_CACHE_TTL)
+        except Exception as e:
+            print(f"Error creating cached context: {e}")
+            return key
+        with self._context_lock:
+            entry["name"] = name
+            entry["expires"] = time.time() + CONTEXT_CACHE_TTL
+        return key
+
+    def release_context(self, key: str):
+        """Drop a reference taken by acquire_context, deleting the cache entry after the last one."""
+        with self._context_lock:
+            entry = self._contexts.get(key)
+            if entry is None:
+                return
+            entry["refs"] -= 1
+            if entry["refs"] > 0:
+                return
+            del self._contexts[key]
+            name = entry["name"]
+        if name is not None:
+            try:
+                self.context_cache.delete(name)
+            except Exception as e:
+                print(f"Error deleting cached context {name}: {e}")
+
+    def _context_name(self, prefix: str) -> Optional[str]:
+        """Name of the live cached context for a prompt prefix, extending its lifetime when it runs low."""
+        key = hash_text(prefix)
+        with self._context_lock:
+            entry = self._contexts.get(key)
+            if entry is None or entry["name"] is None:
+                return None
+            name = entry["name"]
+            now = time.time()
+            refresh = entry["expires"] - now < CONTEXT_CACHE_TTL / 3
+            if refresh:
+                # Claim the refresh so concurrent callers do not all extend it
+                entry["expires"] = now + CONTEXT_CACHE_TTL
+        if refresh:
+            try:
+                self.context_cache.touch(name, CONTEXT_CACHE_TTL)
+            except Exception as e:
+                print(f"Error extending cached context {name}: {e}")
+                self._forget_context(key)
+                return None
+        return name
+
+    def _forget_context(self, key: str):
+        """Stop using the cached context of a prefix (e.g. after it expired); the prefix is sent inline."""
+        with self._context_lock:
+            entry = self._contexts.get(key)
+            if entry is not None:
+                entry["name"] = None
+
+    def request_payload(self, request: GenerationRequest, cached_content: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Build a generateContent request body.
+
+        Args:
+            request (GenerationRequest): Prompt and output settings
+            cached_content (str, optional): Name of a cached context holding the system prompt and prefix
+
+        Returns:
+            Dict[str, Any]: Request body
+        """
+        payload = {
+            "generationConfig": {
+                "temperature": TEMPERATURE,
+                "maxOutputTokens": request.max_tokens
+            }
+        }
+        if request.response_schema is not None:
+            payload["generationConfig"]["responseMimeType"] = "application/json"
+            payload["generationConfig"]["responseSchema"] = request.response_schema
+        if cached_content is not None:
+            # The system instruction and prefix are part of the cached content
+            payload["cachedContent"] = cached_content
+            payload["contents"] = [{"role": "user", "parts": [{"text": request.user_content}]}]
+        else:
+            # Stable prefix first (system instruction, then the shared document) for implicit caching
+            payload["systemInstruction"] = {"parts": [{"text": request.system_prompt}]}
+            payload["contents"] = [{"role": "user", "parts": [{"text": request.prefix},
+                                                              {"text": request.user_content}]}]
+        return payload
+
+    def generate_with_usage(self, request: GenerationRequest,
+                            on_discarded_usage: Callable[[TokenUsage], None] = None) -> Tuple[str, Optional[TokenUsage]]:
+        cached_content = self._context_name(request.prefix)
+        payload = self.request_payload(request, cached_content)
+
+        def report_discarded(response_json):
+            usage = TokenUsage.from_gemini(response_json.get("usageMetadata"))
+            if usage is not None and on_discarded_usage is not None:
+                on_discarded_usage(usage)
+
+        # Pooled session with timeouts, rate limiting and retries (see gemini_transport.py)
+        try:
+            if self.context_cache is not None:
+                payload = self.context_cache.expand(payload)
+            response_json = self.transport.generate_content(payload, on_discard=report_discarded)
+        except GeminiAPIError as e:
+            if cached_content is None or e.status_code not in (400, 403, 404):
+                raise
+            # The cached context expired or was removed: send the prefix inline from now on
+            print(f"Cached context {cached_content} unavailable ({e}); sending the prompt in full")
+            self._forget_context(hash_text(request.prefix))
+            response_json = self.transport.generate_content(self.request_payload(request), on_discard=report_discarded)
+
+        # Extract the text and the token counts from the response
+        return response_text(response_json), TokenUsage.from_gemini(response_json.get("usageMetadata"))
+
+    def generate_stream(self, request: GenerationRequest,
+                        on_usage: Callable[[TokenUsage], None] = None) -> Iterator[str]:
+        # Interactive one-off requests: the prompt is always sent inline
+        payload = self.request_payload(request)
+
+        def report_usage(usage_metadata):
+            usage = TokenUsage.from_gemini(usage_metadata)
+            if usage is not None and on_usage is not None:
+                on_usage(usage)
+
+        yield from self.transport.stream_generate_content(payload, on_usage=report_usage)
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        model = f"models/{self.embedding_model}"
+        response = self.transport.request(
+            "POST", f"{self.transport.base_url}/{model}:batchEmbedContents",
+            {"requests": [{"model": model, "content": {"parts": [{"text": text}]}} for text in texts]}
+        )
+        return [embedding["values"] for embedding in response["embeddings"]]
+
+    def available(self) -> bool:
+        breaker = self.transport.circuit_breaker
+        return breaker is None or breaker.available()
+
+    def summary(self) -> Optional[str]:
+        parts = [self.transport.concurrency_limiter, self.transport.hedger, self.transport.circuit_breaker]
+        lines = [part.summary() for part in parts if part is not None]
+        return "\n".join(lines) if lines else None
+
+    def close(self):
+        self.transport.close()
+
+def _json_schema(schema: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert a Gemini response schema (OpenAPI subset) into the JSON schema Ollama's format expects."""
+    converted = {}
+    for key, value in schema.items():
+        if key == "propertyOrdering":
+            continue
+        if key == "type":
+            converted[key] = value.lower()
+        elif key == "properties":
+            converted[key] = {name: _json_schema(prop) for name, prop in value.items()}
+        elif key == "items":
+            converted[key] = _json_schema(value)
+        else:
+            converted[key] = value
+    return converted
+
+class OllamaBackend(ScoringBackend):
+    """
+    Backend for a local Ollama server.
+
+    Up to num_parallel requests are in flight at once (set the server's
+    OLLAMA_NUM_PARALLEL to match), and every request passes keep_alive so the
+    model stays loaded between requests; warm_up() loads it before a bulk run.
+    """
+
+    def __init__(self, base_url: str = OLLAMA_BASE_URL, model: str = OLLAMA_MODEL,
+                 embedding_model: str = OLLAMA_EMBEDDING_MODEL, keep_alive: Union[str, int] = OLLAMA_KEEP_ALIVE,
+                 num_parallel: int = OLLAMA_NUM_PARALLEL, num_ctx: int = OLLAMA_NUM_CTX,
+                 timeout: float = OLLAMA_TIMEOUT):
+        """
+        Initialize the backend.
+
+        Args:
+            base_url (str): Server URL, e.g. http://localhost:11434
+            model (str): Generation model, e.g. "mistral"
+            embedding_model (str): Embedding model, e.g. "nomic-embed-text"
+            keep_alive (Union[str, int]): How long the model stays loaded after a request ("30m"; -1 pins it)
+            num_parallel (int): Maximum number of requests in flight
+            num_ctx (int): Context window in tokens (the Ollama default is too small for a CV and a job)
+            timeout (float): Seconds to wait for a response
+        """
+        self.base_url = base_url.rstrip("/")
+        self.model = model
+        self.embedding_model = embedding_model
+        self.keep_alive = keep_alive
+        self.num_ctx = num_ctx
+        self.timeout = timeout
+        self.model_id = f"ollama/{model}"
+        self.max_concurrency = max(1, num_parallel)
+        self._slots = threading.BoundedSemaphore(self.max_concurrency)
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_concurrency, max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def _post(self, path: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """POST to the Ollama API, holding one of the parallel request slots."""
+        with self._slots:
+            try:
+                response = self.session.post(f"{self.base_url}{path}", json=payload, timeout=self.timeout)
+            except requests.exceptions.RequestException as e:
+                raise ScoringBackendError(f"Could not reach Ollama at {self.base_url}: {e}")
+        if response.status_code != 200:
+            raise ScoringBackendError(f"Ollama error: {response.status_code} - {response.text[:500]}")
+        try:
+            return response.json()
+        except ValueError:
+            raise ScoringBackendError(f"Invalid JSON from Ollama: {response.text[:200]}")
+
+    def _generate_payload(self, request: GenerationRequest, stream: bool) -> Dict[str, Any]:
+        """Build an /api/generate request body."""
+        payload = {
+            "model": self.model,
+            "system": request.system_prompt,
+            # Shared document first, as with Gemini, so Ollama can reuse the prompt's KV cache
+            "prompt": f"{request.prefix}\n\n{request.user_content}",
+            "stream": stream,
+            "keep_alive": self.keep_alive,
+            "options": {
+                "temperature": TEMPERATURE,
+                "num_predict": request.max_tokens,
+                "num_ctx": self.num_ctx
+            }
+        }
+        if request.response_schema is not None:
+            payload["format"] = _json_schema(request.response_schema)
+        return payload
+
+    def generate_with_usage(self, request: GenerationRequest,
+                            on_discarded_usage: Callable[[TokenUsage], None] = None) -> Tuple[str, Optional[TokenUsage]]:
+        response = self._post("/api/generate", self._generate_payload(request, stream=False))
+        return response.get("response", ""), TokenUsage.from_ollama(response)
+
+    def generate_stream(self, request: GenerationRequest,
+                        on_usage: Callable[[TokenUsage], None] = None) -> Iterator[str]:
+        with self._slots:
+            try:
+                response = self.session.post(f"{self.base_url}/api/generate",
+                                             json=self._generate_payload(request, stream=True),
+                                             timeout=self.timeout, stream=True)
+            except requests.exceptions.RequestException as e:
+                raise ScoringBackendError(f"Could not reach Ollama at {self.base_url}: {e}")
+            with response:
+                if response.status_code != 200:
+                    raise ScoringBackendError(f"Ollama error: {response.status_code} - {response.text[:500]}")
+                try:
+                    # One JSON object per line, the last one with "done": true
+                    for line in response.iter_lines(chunk_size=None):
+                        if not line:
+                            continue
+                        chunk = json.loads(line)
+                        if chunk.get("error"):
+                            raise ScoringBackendError(f"Ollama error: {chunk['error']}")
+                        if chunk.get("response"):
+                            yield chunk["response"]
+                        if chunk.get("done") and on_usage is not None:
+                            usage = TokenUsage.from_ollama(chunk)
+                            if usage is not None:
+                                on_usage(usage)
+                except ValueError:
+                    raise ScoringBackendError(f"Invalid JSON in Ollama stream: {line[:200]}")
+                except requests.exceptions.RequestException as e:
+                    raise ScoringBackendError(f"Ollama stream interrupted: {e}")
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        response = self._post("/api/embed", {"model": self.embedding_model, "input": texts,
+                                             "keep_alive": self.keep_alive})
+        return response["embeddings"]
+
+    def warm_up(self):
+        """Load the model now (an empty prompt only loads it) so the first requests do not wait for it."""
+        try:
+            self._post("/api/generate", {"model": self.model, "keep_alive": self.keep_alive})
+        except ScoringBackendError as e:
+            print(f"Could not preload Ollama model {self.model}: {e}")
+
+    def unload(self):
+        """Unload the model from the server's memory."""
+        self._post("/api/generate", {"model": self.model, "keep_alive": 0})
+
+    def close(self):
+        self.session.close()
+
+def get_scoring_backend(api_key: str = None, rate_limiter: RateLimiter = None,
+                        context_cache: ContextCache = None, backend: str = None) -> ScoringBackend:
+    """
+    Create the scoring backend configured in config.
+
+    Args:
+        api_key (str, optional): Gemini API key
+        rate_limiter (RateLimiter, optional): Limiter for Gemini requests
+        context_cache (ContextCache, optional): Store for cached Gemini prompt prefixes
+        backend (str, optional): "gemini" or "ollama" (default: SCORING_BACKEND)
+
+    Returns:
+        ScoringBackend: The backend
+    """
+    backend = backend or SCORING_BACKEND
+    if backend == "ollama":
+        return OllamaBackend()
+    if backend == "gemini":
+        return GeminiBackend(api_key, rate_limiter, context_cache)
+    raise ValueError(f"Unknown scoring backend: {backend}")
@@ -0,0 +1,71 @@
+"""
+Single-flight coalescing of identical in-flight calls.
+
+When several threads ask for the same key at the same time, the first one
+(the leader) does the work and the others wait for its result instead of
+repeating it. CVJobMatcher uses one shared SingleFlight per process, keyed by
+result cache key, so concurrent requests for the same CV / job pair (from the
+GUI dialogs, a batch run, ...) cost a single API call. Coalescing across
+processes goes through claims in the result cache (see ResultCache.claim).
+"""
+import threading
+from concurrent.futures import Future
+from typing import Any, Hashable, Tuple
+
+class SingleFlight:
+    """Registry of in-flight calls by key."""
+
+    def __init__(self):
+        """Initialize an empty registry."""
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.coalesced = 0
+
+    def __len__(self):
+        return len(self._calls)
+
+    def begin(self, key: Hashable) -> Tuple[bool, Future]:
+        """
+        Join the call for a key, starting it if none is in flight.
+
+        Args:
+            key (Hashable): Identity of the call
+
+        Returns:
+            Tuple[bool, Future]: Whether the caller is the leader (and must call finish()),
+                and the future every caller can wait on
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                self.coalesced += 1
+                return False, future
+            future = self._calls[key] = Future()
+            return True, future
+
+    def finish(self, key: Hashable, result: Any = None, error: BaseException = None):
+        """
+        Complete the call for a key (leader only); waiting callers receive the result or the error.
+
+        Args:
+            key (Hashable): Key passed to begin()
+            result (Any): Result of the call
+            error (BaseException, optional): Exception raised by the call instead
+        """
+        with self._lock:
+            future = self._calls.pop(key)
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+_single_flight = SingleFlight()
+
+def get_single_flight() -> SingleFlight:
+    """
+    Get the registry shared by every matcher of this process.
+
+    Returns:
+        SingleFlight: The shared registry
+    """
+    return _single_flight
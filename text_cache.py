@@ -0,0 +1,250 @@
+import os
+import sqlite3
+import hashlib
+import threading
+import time
+from typing import Callable, Optional
+
+from config import TEXT_CACHE_ENABLED, TEXT_CACHE_PATH
+
+# Bump this whenever the extraction logic changes so stale texts are not reused
+EXTRACTOR_VERSION = "1"
+
+def get_base_dir():
+    """Get the base directory of the project."""
+    return os.path.dirname(os.path.abspath(__file__))
+
+def hash_bytes(data: bytes) -> str:
+    """
+    Compute the content hash used as the cache key for a document.
+
+    Args:
+        data (bytes): Raw file contents
+
+    Returns:
+        str: Hex encoded SHA-256 digest
+    """
+    return hashlib.sha256(data).hexdigest()
+
+class TextCache:
+    """
+    SQLite backed cache of extracted document text.
+
+    Texts are keyed by the SHA-256 of the file contents, so renamed or copied
+    files are only parsed once. A second table remembers the (mtime, size) of
+    every path seen, which lets unchanged files skip reading and hashing entirely.
+    """
+
+    def __init__(self, db_path: str = None):
+        """
+        Initialize the cache.
+
+        Args:
+            db_path (str, optional): Path to the SQLite database (defaults to TEXT_CACHE_PATH)
+        """
+        db_path = db_path or TEXT_CACHE_PATH
+        if not os.path.isabs(db_path):
+            db_path = os.path.join(get_base_dir(), db_path)
+        self.db_path = db_path
+        self.hits = 0
+        self.misses = 0
+        self._local = threading.local()
+        self._init_lock = threading.Lock()
+        self._initialized = False
+
+    def _connect(self) -> sqlite3.Connection:
+        """Return a connection owned by the current thread and process."""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        with self._init_lock:
+            if not self._initialized:
+                conn.executescript("""
+                    CREATE TABLE IF NOT EXISTS files (
+                        path TEXT PRIMARY KEY,
+                        mtime_ns INTEGER NOT NULL,
+                        size INTEGER NOT NULL,
+                        content_hash TEXT NOT NULL
+                    );
+                    CREATE TABLE IF NOT EXISTS texts (
+                        content_hash TEXT NOT NULL,
+                        extractor TEXT NOT NULL,
+                        text TEXT NOT NULL,
+                        created REAL NOT NULL,
+                        PRIMARY KEY (content_hash, extractor)
+                    );
+                    CREATE TABLE IF NOT EXISTS sections (
+                        text_hash TEXT NOT NULL,
+                        segmenter TEXT NOT NULL,
+                        record TEXT NOT NULL,
+                        PRIMARY KEY (text_hash, segmenter)
+                    );
+                """)
+                conn.commit()
+                self._initialized = True
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    def lookup_hash(self, file_path: str, stat: os.stat_result) -> Optional[str]:
+        """
+        Return the known content hash of a file if its mtime and size are unchanged.
+
+        Args:
+            file_path (str): Absolute path to the file
+            stat (os.stat_result): Current stat of the file
+
+        Returns:
+            Optional[str]: Content hash, or None if the file is new or changed
+        """
+        row = self._connect().execute(
+            "SELECT content_hash FROM files WHERE path = ? AND mtime_ns = ? AND size = ?",
+            (file_path, stat.st_mtime_ns, stat.st_size)
+        ).fetchone()
+        return row[0] if row else None
+
+    def get_text(self, content_hash: str, extractor: str = EXTRACTOR_VERSION) -> Optional[str]:
+        """Return the cached text for a content hash, or None on a miss."""
+        row = self._connect().execute(
+            "SELECT text FROM texts WHERE content_hash = ? AND extractor = ?",
+            (content_hash, extractor)
+        ).fetchone()
+        return row[0] if row else None
+
+    def put(self, file_path: str, stat: os.stat_result, content_hash: str, text: str,
+            extractor: str = EXTRACTOR_VERSION):
+        """Store an extracted text and remember the file's fingerprint."""
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO texts (content_hash, extractor, text, created) VALUES (?, ?, ?, ?)",
+                (content_hash, extractor, text, time.time())
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO files (path, mtime_ns, size, content_hash) VALUES (?, ?, ?, ?)",
+                (file_path, stat.st_mtime_ns, stat.st_size, content_hash)
+            )
+
+    def remember_file(self, file_path: str, stat: os.stat_result, content_hash: str):
+        """Record the fingerprint of a file whose content is already cached."""
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO files (path, mtime_ns, size, content_hash) VALUES (?, ?, ?, ?)",
+                (file_path, stat.st_mtime_ns, stat.st_size, content_hash)
+            )
+
+    def peek(self, file_path: str, extractor_version: str = EXTRACTOR_VERSION) -> Optional[str]:
+        """
+        Return the cached text of an unchanged file without reading the file itself.
+
+        Args:
+            file_path (str): Absolute path to the document
+            extractor_version (str): Identifier of the extraction logic in use
+
+        Returns:
+            Optional[str]: Cached text, or None if the file would need to be parsed
+        """
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return None
+        content_hash = self.lookup_hash(file_path, stat)
+        if content_hash is None:
+            return None
+        text = self.get_text(content_hash, extractor_version)
+        if text is not None:
+            self.hits += 1
+        return text
+
+    def get_or_extract(self, file_path: str, extractor: Callable[..., str],
+                       extractor_version: str = EXTRACTOR_VERSION) -> str:
+        """
+        Return the text of a document, extracting it only on a cache miss.
+
+        Args:
+            file_path (str): Absolute path to the document
+            extractor (Callable[[str, bytes], str]): Function that parses the document; on a miss
+                it receives the file contents already read for hashing
+            extractor_version (str): Identifier of the extraction logic in use
+
+        Returns:
+            str: Extracted text
+        """
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            # Let the extractor report missing or unreadable files as before
+            return extractor(file_path)
+
+        # Fast path: unchanged file, no need to read or hash it
+        content_hash = self.lookup_hash(file_path, stat)
+        if content_hash is not None:
+            text = self.get_text(content_hash, extractor_version)
+            if text is not None:
+                self.hits += 1
+                return text
+
+        with open(file_path, "rb") as f:
+            data = f.read()
+        content_hash = hash_bytes(data)
+
+        # Same content seen under another path (or before a touch)
+        text = self.get_text(content_hash, extractor_version)
+        if text is not None:
+            self.hits += 1
+            self.remember_file(file_path, stat, content_hash)
+            return text
+
+        self.misses += 1
+        text = extractor(file_path, data)
+        # Empty output means the extractor failed; don't pin that result
+        if text:
+            self.put(file_path, stat, content_hash, text, extractor_version)
+        return text
+
+    def get_sections(self, text_hash: str, segmenter: str) -> Optional[str]:
+        """Return the stored section record (JSON) of a text, or None on a miss."""
+        row = self._connect().execute(
+            "SELECT record FROM sections WHERE text_hash = ? AND segmenter = ?",
+            (text_hash, segmenter)
+        ).fetchone()
+        return row[0] if row else None
+
+    def put_sections(self, text_hash: str, segmenter: str, record: str):
+        """Store the section record (JSON) of a text."""
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO sections (text_hash, segmenter, record) VALUES (?, ?, ?)",
+                (text_hash, segmenter, record)
+            )
+
+    def clear(self):
+        """Remove every cached text, file fingerprint and section record."""
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM files")
+            conn.execute("DELETE FROM texts")
+            conn.execute("DELETE FROM sections")
+
+_text_cache = None
+
+def get_text_cache() -> Optional[TextCache]:
+    """
+    Get the shared text cache for this process.
+
+    Returns:
+        Optional[TextCache]: The cache, or None if caching is disabled in config
+    """
+    global _text_cache
+    if not TEXT_CACHE_ENABLED:
+        return None
+    if _text_cache is None:
+        _text_cache = TextCache()
+    return _text_cache
@@ -0,0 +1,343 @@
+"""
+Token accounting, cost metering and budgets.
+
+Every scoring response reports how many tokens it used (usageMetadata from
+Gemini, prompt_eval_count / eval_count from Ollama). CVJobMatcher passes these
+counts to a UsageMeter, which adds them up for the run, and per CV and per job
+description: a request scoring several pairs is split evenly across them.
+Costs come from USAGE_PRICES in config; Batch API results are billed at
+USAGE_BATCH_PRICE_FACTOR of that.
+
+Before each request the matcher reserves the estimated prompt tokens. Once the
+run's tokens or cost (plus what is reserved by requests in flight) reach
+USAGE_TOKEN_BUDGET or USAGE_COST_BUDGET, the next request either raises
+BudgetExceededError ("stop") or waits until the sliding USAGE_BUDGET_WINDOW has
+room again ("pause"). Responses of requests already in flight can overshoot a
+budget by their output tokens.
+
+write_summary() saves the totals and the per-document breakdown as JSON in
+the output directory.
+"""
+import os
+import json
+import time
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from pydantic import BaseModel
+
+from config import (
+    OUTPUT_DIR,
+    USAGE_PRICES,
+    USAGE_BATCH_PRICE_FACTOR,
+    USAGE_TOKEN_BUDGET,
+    USAGE_COST_BUDGET,
+    USAGE_BUDGET_WINDOW,
+    USAGE_BUDGET_ACTION
+)
+
+BUDGET_ACTIONS = ("stop", "pause")
+
+class TokenUsage(BaseModel):
+    """Tokens used by one model call."""
+    prompt_tokens: int = 0
+    # Part of prompt_tokens read from a cached context (billed at the cached rate)
+    cached_tokens: int = 0
+    # Response tokens, including thinking tokens
+    output_tokens: int = 0
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.output_tokens
+
+    @classmethod
+    def from_gemini(cls, usage_metadata: Optional[Dict[str, Any]]) -> Optional["TokenUsage"]:
+        """Read the usageMetadata of a Gemini response (None if the response has none)."""
+        if not usage_metadata:
+            return None
+        return cls(prompt_tokens=usage_metadata.get("promptTokenCount", 0),
+                   cached_tokens=usage_metadata.get("cachedContentTokenCount", 0),
+                   output_tokens=(usage_metadata.get("candidatesTokenCount", 0)
+                                  + usage_metadata.get("thoughtsTokenCount", 0)))
+
+    @classmethod
+    def from_ollama(cls, response: Dict[str, Any]) -> Optional["TokenUsage"]:
+        """Read the counts of a (final) Ollama /api/generate response (None if it has none)."""
+        if "prompt_eval_count" not in response and "eval_count" not in response:
+            return None
+        return cls(prompt_tokens=response.get("prompt_eval_count", 0),
+                   output_tokens=response.get("eval_count", 0))
+
+def usage_cost(usage: TokenUsage, model_id: str, batch: bool = False) -> float:
+    """
+    Price a call.
+
+    Args:
+        usage (TokenUsage): Tokens used
+        model_id (str): Model that answered (models missing from USAGE_PRICES are free, e.g. local ones)
+        batch (bool): Whether the call went through the Batch API
+
+    Returns:
+        float: Cost in USD
+    """
+    prices = USAGE_PRICES.get(model_id)
+    if prices is None:
+        return 0.0
+    input_price, cached_price, output_price = prices
+    cost = ((usage.prompt_tokens - usage.cached_tokens) * input_price + usage.cached_tokens * cached_price
+            + usage.output_tokens * output_price) / 1_000_000
+    return cost * USAGE_BATCH_PRICE_FACTOR if batch else cost
+
+class BudgetExceededError(Exception):
+    """Raised instead of sending a request once the run's token or cost budget is used up."""
+
+def _tally() -> Dict[str, float]:
+    return {"requests": 0.0, "prompt_tokens": 0.0, "cached_tokens": 0.0, "output_tokens": 0.0, "cost": 0.0}
+
+class UsageMeter:
+    """Thread-safe tally of the tokens and cost of a run, with optional budgets."""
+
+    def __init__(self, token_budget: Optional[int] = USAGE_TOKEN_BUDGET,
+                 cost_budget: Optional[float] = USAGE_COST_BUDGET, window: Optional[float] = USAGE_BUDGET_WINDOW,
+                 action: str = USAGE_BUDGET_ACTION):
+        """
+        Initialize the meter.
+
+        Args:
+            token_budget (int, optional): Maximum tokens (None: no limit)
+            cost_budget (float, optional): Maximum cost in USD (None: no limit)
+            window (float, optional): Apply the budgets to the last `window` seconds instead of the whole run
+            action (str): "stop" raises BudgetExceededError at the budget; "pause" waits for the window
+                to have room again (needs a window; without one it stops)
+        """
+        if action not in BUDGET_ACTIONS:
+            raise ValueError(f"Unknown budget action: {action}")
+        self.token_budget = token_budget
+        self.cost_budget = cost_budget
+        self.window = window
+        self.action = action
+        self.started = datetime.now()
+        self.totals = _tally()
+        self.by_model = {}
+        self.by_cv = {}
+        self.by_job = {}
+        # Text hash -> document ID, for the per-document breakdown
+        self.labels = {"cv": {}, "job": {}}
+        self.paused_seconds = 0.0
+        self.pauses = 0
+        self.stopped = None
+        # (time.monotonic(), tokens, cost) of each call, while budgets apply to a window
+        self._events = deque()
+        self._reserved_tokens = 0
+        self._reserved_cost = 0.0
+        self._waiting = 0
+        self._pause_started = None
+        self._condition = threading.Condition()
+
+    def label(self, kind: str, text_hash: str, name: str):
+        """
+        Name a document in the breakdown (otherwise it is listed by text hash).
+
+        Args:
+            kind (str): "cv" or "job"
+            text_hash (str): result_cache.hash_text of the document
+            name (str): Document ID, e.g. its file name
+        """
+        with self._condition:
+            self.labels[kind][text_hash] = name
+
+    def _spent(self) -> Tuple[float, float]:
+        """Tokens and cost counted against the budgets (the window, or the whole run)."""
+        if self.window is None:
+            return self.totals["prompt_tokens"] + self.totals["output_tokens"], self.totals["cost"]
+        cutoff = time.monotonic() - self.window
+        while self._events and self._events[0][0] < cutoff:
+            self._events.popleft()
+        return sum(event[1] for event in self._events), sum(event[2] for event in self._events)
+
+    def _over_budget(self, tokens: int, cost: float) -> Optional[str]:
+        """Describe the budget a request of this size would exceed (None if it fits)."""
+        spent_tokens, spent_cost = self._spent()
+        spent_tokens += self._reserved_tokens
+        spent_cost += self._reserved_cost
+        if self.token_budget is not None and spent_tokens + tokens > self.token_budget:
+            return f"token budget of {self.token_budget:,} reached ({int(spent_tokens):,} used or in flight)"
+        if self.cost_budget is not None and spent_cost + cost > self.cost_budget:
+            return f"cost budget of ${self.cost_budget:.2f} reached (${spent_cost:.4f} spent or in flight)"
+        return None
+
+    def reserve(self, prompt_tokens: int, model_id: str) -> Tuple[int, float]:
+        """
+        Wait until a request fits the budgets and reserve its estimated prompt.
+
+        Args:
+            prompt_tokens (int): Estimated prompt size
+            model_id (str): Model the request goes to
+
+        Returns:
+            Tuple[int, float]: Reservation to pass to settle()
+
+        Raises:
+            BudgetExceededError: If the budget is used up and the action is "stop"
+        """
+        if self.token_budget is None and self.cost_budget is None:
+            return 0, 0.0
+        cost = usage_cost(TokenUsage(prompt_tokens=prompt_tokens), model_id)
+        with self._condition:
+            waiting = False
+            try:
+                while True:
+                    if self.stopped is not None:
+                        raise BudgetExceededError(self.stopped)
+                    reason = self._over_budget(prompt_tokens, cost)
+                    if reason is None:
+                        break
+                    # Pausing only helps while calls can still leave the window or requests in flight finish
+                    if (self.action != "pause" or self.window is None
+                            or not (self._events or self._reserved_tokens)):
+                        self.stopped = reason
+                        self._condition.notify_all()
+                        raise BudgetExceededError(reason)
+                    if not waiting:
+                        waiting = True
+                        self._pause(reason)
+                    # Wake up when the oldest call leaves the window (or a reservation is settled)
+                    timeout = self._events[0][0] + self.window - time.monotonic() if self._events else 1.0
+                    self._condition.wait(max(0.1, timeout))
+            finally:
+                if waiting:
+                    self._resume()
+            self._reserved_tokens += prompt_tokens
+            self._reserved_cost += cost
+        return prompt_tokens, cost
+
+    def _pause(self, reason: str):
+        """Count a caller that starts waiting for the budget (the first one starts a pause)."""
+        self._waiting += 1
+        if self._waiting == 1:
+            self._pause_started = time.monotonic()
+            self.pauses += 1
+            print(f"Usage {reason}; pausing until the {self.window:g}s window has room")
+
+    def _resume(self):
+        """Count a caller that stops waiting (the last one ends the pause)."""
+        self._waiting -= 1
+        if self._waiting == 0:
+            self.paused_seconds += time.monotonic() - self._pause_started
+
+    def settle(self, reservation: Tuple[int, float], usage: Optional[TokenUsage] = None, model_id: str = "",
+               documents: Iterable[Tuple[str, str]] = (), batch: bool = False):
+        """
+        Release a reservation and record what the request actually used.
+
+        Args:
+            reservation (Tuple[int, float]): Value returned by reserve()
+            usage (TokenUsage, optional): Tokens used (None if the request failed without a response)
+            model_id (str): Model that answered
+            documents (Iterable[Tuple[str, str]]): (CV hash, job hash) of each pair the request scored
+            batch (bool): Whether the request went through the Batch API
+        """
+        with self._condition:
+            self._reserved_tokens -= reservation[0]
+            self._reserved_cost -= reservation[1]
+            if usage is not None:
+                self._record(usage, model_id, list(documents), batch)
+            self._condition.notify_all()
+
+    def record(self, usage: Optional[TokenUsage], model_id: str, documents: Iterable[Tuple[str, str]] = (),
+               batch: bool = False):
+        """Record a call made without a reservation (e.g. a Batch API result)."""
+        self.settle((0, 0.0), usage, model_id, documents, batch)
+
+    def _record(self, usage: TokenUsage, model_id: str, documents, batch: bool):
+        cost = usage_cost(usage, model_id, batch)
+        amounts = {"requests": 1, "prompt_tokens": usage.prompt_tokens, "cached_tokens": usage.cached_tokens,
+                   "output_tokens": usage.output_tokens, "cost": cost}
+        for tally in (self.totals, self.by_model.setdefault(model_id, _tally())):
+            for field, amount in amounts.items():
+                tally[field] += amount
+        # A request scoring several pairs is split evenly across them
+        share = 1.0 / len(documents) if documents else 0.0
+        for cv_hash, job_hash in documents:
+            for tally in (self.by_cv.setdefault(cv_hash, _tally()), self.by_job.setdefault(job_hash, _tally())):
+                for field, amount in amounts.items():
+                    tally[field] += amount * share
+        if self.window is not None:
+            self._events.append((time.monotonic(), usage.total_tokens, cost))
+
+    def report(self) -> Dict[str, Any]:
+        """
+        Totals, budgets and the per-model, per-job and per-CV breakdown.
+
+        Returns:
+            Dict[str, Any]: JSON-serialisable report
+        """
+        def rounded(tally):
+            return {field: round(value, 6) if field == "cost" else round(value, 2) for field, value in tally.items()}
+
+        def breakdown(kind, tallies):
+            return {self.labels[kind].get(text_hash, text_hash[:16]): rounded(tally)
+                    for text_hash, tally in sorted(tallies.items(), key=lambda item: (
+                        -item[1]["cost"], -(item[1]["prompt_tokens"] + item[1]["output_tokens"])))}
+
+        with self._condition:
+            totals = rounded(self.totals)
+            totals["total_tokens"] = totals["prompt_tokens"] + totals["output_tokens"]
+            return {
+                "started": self.started.isoformat(timespec="seconds"),
+                "finished": datetime.now().isoformat(timespec="seconds"),
+                "totals": totals,
+                "budget": {"tokens": self.token_budget, "cost": self.cost_budget, "window": self.window,
+                           "action": self.action, "pauses": self.pauses,
+                           "paused_seconds": round(self.paused_seconds, 1),
+                           "stopped": self.stopped},
+                "by_model": {model_id: rounded(tally) for model_id, tally in self.by_model.items()},
+                "by_job": breakdown("job", self.by_job),
+                "by_cv": breakdown("cv", self.by_cv)
+            }
+
+    def summary(self) -> str:
+        """One-line description of the run's usage."""
+        with self._condition:
+            totals = dict(self.totals)
+            stopped = self.stopped
+        line = (f"Token usage: {int(totals['requests'])} requests, {int(totals['prompt_tokens']):,} prompt tokens "
+                f"({int(totals['cached_tokens']):,} cached), {int(totals['output_tokens']):,} output tokens, "
+                f"estimated cost ${totals['cost']:.4f}")
+        if stopped is not None:
+            line += f" (stopped: {stopped})"
+        return line
+
+    def write_summary(self, path: str = None) -> str:
+        """
+        Save report() as JSON.
+
+        Args:
+            path (str, optional): Output file (default: OUTPUT_DIR/usage_summary.json)
+
+        Returns:
+            str: Path of the file written
+        """
+        path = path or os.path.join(OUTPUT_DIR, "usage_summary.json")
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.report(), f, indent=2, ensure_ascii=False)
+        return path
+
+_usage_meter = None
+_usage_meter_lock = threading.Lock()
+
+def get_usage_meter() -> UsageMeter:
+    """
+    Get the meter shared by every matcher of this process (one run).
+
+    Returns:
+        UsageMeter: Meter configured from USAGE_* in config
+    """
+    global _usage_meter
+    with _usage_meter_lock:
+        if _usage_meter is None:
+            _usage_meter = UsageMeter()
+        return _usage_meter